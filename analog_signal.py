@@ -1,3 +1,4 @@
+import argparse
 import os
 import time
 import random
@@ -5,10 +6,11 @@ import random
 # FIFO 文件路径 (与 yolo_fifo.py 中保持一致)
 fifo_path = '/home/cat/leida_test/Z_pavo2__test/send_PYTHON'
 
-def send_signal():
+def send_signal(signal_data="leida_", interval=5, burst=1, burst_interval=0.0):
     """
     向FIFO管道发送模拟信号
-    每5秒发送一次 leida_ 开头的信号
+    每 interval 秒发送一组信号，每组连续发送 burst 次，组内间隔 burst_interval 秒
+    （默认每5秒发送一次 leida_ 信号）
     """
     # 确保FIFO管道存在
     if not os.path.exists(fifo_path):
@@ -29,17 +31,19 @@ def send_signal():
                 print("FIFO管道已连接，开始发送模拟信号")
                 
                 while True:
-                    signal_data = f"leida_"
+                    for i in range(burst):
+                        # 向管道写入数据
+                        fifo.write(signal_data.encode('utf-8'))
+                        fifo.flush()  # 确保数据被写入
+                        
+                        print(f"已发送信号 #{counter}: {signal_data}")
+                        counter += 1
+                        
+                        if i < burst - 1 and burst_interval > 0:
+                            time.sleep(burst_interval)
                     
-                    # 向管道写入数据
-                    fifo.write(signal_data.encode('utf-8'))
-                    fifo.flush()  # 确保数据被写入
-                    
-                    print(f"已发送信号 #{counter}: {signal_data}")
-                    counter += 1
-                    
-                    # 等待5秒
-                    time.sleep(5)
+                    # 等待下一组
+                    time.sleep(interval)
                     
         except BrokenPipeError:
             print("FIFO管道连接断开，等待重新连接...")
@@ -49,8 +53,15 @@ def send_signal():
             time.sleep(1)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="模拟雷达信号发生器")
+    parser.add_argument("--signal", default="leida_", help="发送的信号内容")
+    parser.add_argument("--interval", type=float, default=5, help="每组信号的间隔（秒）")
+    parser.add_argument("--burst", type=int, default=1, help="每组连续发送的次数，用于模拟雷达触发风暴")
+    parser.add_argument("--burst-interval", type=float, default=0.0, help="组内两次发送的间隔（秒）")
+    args = parser.parse_args()
+
     try:
-        print("模拟信号生成器启动，每5秒发送一次信号...")
-        send_signal()
+        print(f"模拟信号生成器启动，每{args.interval}秒发送一组信号...")
+        send_signal(args.signal, args.interval, args.burst, args.burst_interval)
     except KeyboardInterrupt:
         print("程序被用户中断")
@@ -0,0 +1,2077 @@
+"""性能基准测试
+
+所有子命令都以 JSON 输出结果（日志输出到 stderr），便于脚本比对回归。
+--model stub 使用桩模型，可在任意 Linux 机器上运行；
+也可以传入 Ultralytics 模型路径（如 yolo11n.pt）在 CPU 上运行。
+
+用法:
+    python3 benchmark.py engine --cameras 2 --duration 10
+    python3 benchmark.py standby --source /dev/video1 --trials 10
+    python3 benchmark.py publish --trials 20
+    python3 benchmark.py commands --count 20000 --rate 5000
+    python3 benchmark.py triggers --rate 1000 --duration 5
+    python3 benchmark.py modes --frames 200
+    python3 benchmark.py postprocess --frames 200 --people 3
+    python3 benchmark.py allocations --frames 300
+    python3 benchmark.py motion --video recorded.mp4
+    python3 benchmark.py mjpeg --video recorded.mjpeg --cameras 2
+    python3 benchmark.py rtsp --duration 10 --outage 10
+    python3 benchmark.py roi --az 10 --roi-imgsz 480
+    python3 benchmark.py cascade --video clip1.mp4 clip2.mp4
+    python3 benchmark.py ring --readers 4 --duration 5
+    python3 benchmark.py processes --cameras 2 4 --duration 10
+    python3 benchmark.py e2e --trials 5
+    python3 benchmark.py startup --load-delay 3 --trials 3
+    python3 benchmark.py metrics --iterations 200000
+    python3 benchmark.py eventlog --events 200000
+    python3 benchmark.py clips --duration 10
+    python3 benchmark.py scaling --cameras 2 4 8
+    python3 benchmark.py timeouts --cameras 4 --load-threads 2
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from camera_process import CameraProcess
+from camera_worker import CameraWorker, START, STOP
+from clip_recorder import ClipRecorder
+from cascade import ResolutionCascade
+from deadline_scheduler import DeadlineScheduler
+from command_reader import CommandReader
+from detection_log import DetectionLogReader, DetectionLogWriter, log_files
+from detection_publisher import DetectionPublisher
+from ffmpeg_capture import FfmpegCapture, ffmpeg_file_command
+from fifo_writer import FifoWriter
+from frame_grabber import LatestFrameGrabber
+from frame_pool import FramePool
+from frame_ring import FrameRingReader, FrameRingWriter
+from inference_engine import PERSON_CLASS, InferenceEngine, person_presence
+from metrics import Metrics
+from mjpeg import REDUCED_DECODE_FLAGS, decode_jpeg, decode_scale, open_mjpeg_capture, split_jpeg_stream
+from motion_gate import MotionGate
+from presence import PresenceAggregator
+from raw_model import PersonDecoder, RawPersonModel, RawResult, TensorBackend
+from roi import crop_roi, radar_roi
+from synthetic import MjpegFileCamera, StubModel, SyntheticCamera, load_stub_model, raw_frame_timestamp
+
+
+def load_model(name, track=False):
+    """按名称加载模型，stub 为桩模型（见 synthetic.load_stub_model），.onnx/.rknn 为直接处理原始输出的 RawPersonModel
+
+    track 为测试需要调用 model.track() 时，原始输出模型（只支持 presence 模式）直接报错退出。
+    """
+    stub = load_stub_model(name)
+    if stub is not None:
+        return stub
+    if name.endswith((".onnx", ".rknn")):
+        if track:
+            raise SystemExit(f"原始输出模型 {name} 不支持 track，该测试需要 Ultralytics 模型或桩模型")
+        return RawPersonModel.load(name)
+    from ultralytics import YOLO
+    return YOLO(name)
+
+
+def open_source(spec):
+    """打开视频源，synthetic 为模拟USB摄像头（打开慢、前几帧曝光未收敛）"""
+    if spec == "synthetic":
+        return SyntheticCamera(open_delay=0.3, dark_frames=8)
+    cap = cv2.VideoCapture(spec)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    cap.set(cv2.CAP_PROP_FPS, 30)
+    return cap
+
+
+def recorded_frames(video, max_frames):
+    """读取录制素材的帧，synthetic 为按帧号推算时间的合成素材（有人/无人交替）"""
+    if video == "synthetic":
+        cap = SyntheticCamera(person_period=(4, 6), realtime=False)
+    else:
+        cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame.copy())
+    cap.release()
+    return frames, fps
+
+
+def percentile(values, q):
+    """计算百分位数（q 取 0~100）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize_latency(latencies):
+    """把延迟样本（秒）汇总为毫秒统计"""
+    return {
+        "count": len(latencies),
+        "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p95_ms": 1000 * percentile(latencies, 95),
+        "p99_ms": 1000 * percentile(latencies, 99),
+    }
+
+
+def synthetic_frames(count):
+    """预先生成若干帧，避免把采集耗时算进推理基准"""
+    camera = SyntheticCamera(fps=1000)
+    return [camera.read()[1].copy() for _ in range(count)]
+
+
+def run_camera_threads(camera_ids, duration, infer):
+    """每个摄像头一个线程循环调用 infer，返回各摄像头的延迟样本"""
+    frames = synthetic_frames(8)
+    latencies = {camera_id: [] for camera_id in camera_ids}
+    stop_time = time.monotonic() + duration
+
+    def worker(camera_id):
+        i = 0
+        while time.monotonic() < stop_time:
+            start = time.monotonic()
+            infer(camera_id, frames[i % len(frames)])
+            latencies[camera_id].append(time.monotonic() - start)
+            i += 1
+
+    threads = [threading.Thread(target=worker, args=(camera_id,)) for camera_id in camera_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def report_camera_threads(latencies, duration):
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "total_fps": total / duration,
+        "cameras": {
+            camera_id: dict(summarize_latency(v), fps=len(v) / duration)
+            for camera_id, v in latencies.items()
+        },
+    }
+
+
+def bench_engine(args):
+    """对比每摄像头独立模型与共享批量推理引擎的吞吐和延迟"""
+    camera_ids = [f"cam{i + 1}" for i in range(args.cameras)]
+
+    # 现有方式：每个摄像头一个模型实例，各自逐帧推理
+    models = {camera_id: load_model(args.model, track=True) for camera_id in camera_ids}
+    per_camera = run_camera_threads(
+        camera_ids, args.duration,
+        lambda camera_id, frame: models[camera_id].track(frame, stream=False))
+
+    # 共享引擎：一个模型实例，跨摄像头凑批
+    engine = InferenceEngine(load_model(args.model), max_batch=args.max_batch, max_wait=args.max_wait)
+    engine.start()
+    for camera_id in camera_ids:
+        engine.activate(camera_id)
+    shared = run_camera_threads(camera_ids, args.duration, engine.infer)
+
+    engine_report = report_camera_threads(shared, args.duration)
+    engine_report["mean_batch_size"] = engine.stats["frames"] / max(engine.stats["batches"], 1)
+    return {
+        "per_camera_models": report_camera_threads(per_camera, args.duration),
+        "shared_engine": engine_report,
+    }
+
+
+def bench_standby(args):
+    """对比冷启动与热备两种模式下雷达触发到首次推理完成的延迟"""
+    model = load_model(args.model, track=True)
+    dark_threshold = 20  # 平均亮度低于该值视为曝光未收敛的暗帧
+
+    def trigger_to_inference(cap, flush_frames=0):
+        for _ in range(flush_frames):
+            cap.grab()
+        ret, frame = cap.read()
+        model.track(frame, stream=False)
+        return bool(frame.mean() < dark_threshold)
+
+    # 冷启动：每次触发都重新打开摄像头
+    cold, cold_dark = [], 0
+    for _ in range(args.trials):
+        time.sleep(args.idle)
+        start = time.monotonic()
+        cap = open_source(args.source)
+        cold_dark += trigger_to_inference(cap)
+        cold.append(time.monotonic() - start)
+        cap.release()
+
+    # 热备：摄像头保持打开，空闲时低频取帧
+    cap = open_source(args.source)
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def standby():
+        while not stop.is_set():
+            with lock:
+                cap.grab()
+            time.sleep(1.0 / args.standby_fps)
+
+    standby_thread = threading.Thread(target=standby)
+    standby_thread.start()
+    warm, warm_dark = [], 0
+    for _ in range(args.trials):
+        time.sleep(args.idle)
+        start = time.monotonic()
+        with lock:
+            warm_dark += trigger_to_inference(cap, flush_frames=args.flush_frames)
+        warm.append(time.monotonic() - start)
+    stop.set()
+    standby_thread.join()
+    cap.release()
+
+    return {
+        "cold": dict(summarize_latency(cold), dark_first_frames=cold_dark),
+        "warm": dict(summarize_latency(warm), dark_first_frames=warm_dark),
+    }
+
+
+class FifoPeer:
+    """模拟雷达控制端：读取输出FIFO，记录每条消息的到达时间"""
+
+    def __init__(self, path):
+        self.path = path
+        self.messages = []  # (time.monotonic(), message)
+        self.arrived = threading.Condition()
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        with open(self.path, 'rb') as fifo:
+            buffer = b""
+            while True:
+                data = os.read(fifo.fileno(), 4096)
+                if not data:
+                    return
+                now = time.monotonic()
+                buffer += data
+                *messages, buffer = buffer.split(b"\0")
+                with self.arrived:
+                    self.messages.extend((now, m.decode('utf-8', 'ignore')) for m in messages)
+                    self.arrived.notify_all()
+
+    def wait_for(self, count, timeout):
+        """等待收到第 count 条消息，返回其到达时间，超时返回 None"""
+        with self.arrived:
+            self.arrived.wait_for(lambda: len(self.messages) >= count, timeout)
+            return self.messages[count - 1][0] if len(self.messages) >= count else None
+
+    def wait_message(self, message, after, timeout):
+        """等待 after（time.monotonic()）之后到达的第一条 message，返回其到达时间，超时返回 None"""
+        def arrival():
+            return next((t for t, m in self.messages if m == message and t >= after), None)
+
+        with self.arrived:
+            self.arrived.wait_for(lambda: arrival() is not None, timeout)
+            return arrival()
+
+
+def legacy_poll_publisher(path, flags, lock):
+    """复刻原 write_to_fifo1：每0.5秒轮询一次检测标志"""
+    last_sent = False
+    with open(path, 'wb') as fifo:
+        while True:
+            with lock:
+                detected = flags["cam1"]
+                flags["cam1"] = False
+            if detected and not last_sent:
+                fifo.write(b"person_cam1\0")
+                fifo.flush()
+                last_sent = True
+            elif not detected:
+                last_sent = False
+            time.sleep(0.5)
+
+
+def bench_publish(args):
+    """对比0.5秒轮询与事件驱动两种发布方式从检测到写入FIFO的延迟"""
+    report = {}
+    with tempfile.TemporaryDirectory(prefix="bench_publish_") as workdir:
+        for mode in ("polling", "event"):
+            path = os.path.join(workdir, f"rece_{mode}")
+            os.mkfifo(path)
+            flags, lock = {"cam1": False}, threading.Lock()
+            if mode == "polling":
+                target, publish = (lambda: legacy_poll_publisher(path, flags, lock)), None
+            else:
+                writer = FifoWriter(path)
+                publisher = DetectionPublisher(writer, rearm_interval=0.5)
+                target, publish = writer.run, publisher.publish
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            peer = FifoPeer(path)
+
+            latencies = []
+            for i in range(args.trials):
+                # 间隔超过复位时间，并随机错开轮询相位
+                time.sleep(1.2 + random.random() * 0.5)
+                start = time.monotonic()
+                if publish is None:
+                    with lock:
+                        flags["cam1"] = True
+                else:
+                    publish("cam1", start)
+                arrival = peer.wait_for(i + 1, timeout=2)
+                if arrival is not None:
+                    latencies.append(arrival - start)
+            report[mode] = dict(summarize_latency(latencies), lost=args.trials - len(latencies))
+    return report
+
+
+def bench_commands(args):
+    """命令FIFO压力测试：高速写入大量命令（分隔符随机、部分粘连），检查是否丢失或乱序"""
+    with tempfile.TemporaryDirectory(prefix="bench_commands_") as workdir:
+        return commands_round(args, os.path.join(workdir, "send_PYTHON"))
+
+
+def commands_round(args, path):
+    """在 path 上创建命令FIFO并完成一轮压力测试"""
+    os.mkfifo(path)
+    received = []
+    reader = CommandReader(path, received.append)
+    thread = threading.Thread(target=reader.run)
+    thread.daemon = True
+    thread.start()
+
+    vocabulary = ["leida_cam1", "leida_cam2", "leida_", "stop_cam1", "stop_cam2", "stop_yolo"]
+    commands = [random.choice(vocabulary) for _ in range(args.count)]
+    stream = b"".join(c.encode('utf-8') + random.choice([b"\0", b"\n", b";", b""]) for c in commands)
+
+    # 按目标速率分块写入，块边界随机落在命令中间
+    bytes_per_second = len(stream) / args.count * args.rate
+    with open(path, 'wb', buffering=0) as fifo:
+        start = time.monotonic()
+        offset = 0
+        while offset < len(stream):
+            size = random.randint(1, 64)
+            fifo.write(stream[offset:offset + size])
+            offset += size
+            ahead = offset / bytes_per_second - (time.monotonic() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+        elapsed = time.monotonic() - start
+
+    deadline = time.monotonic() + 5
+    while len(received) < len(commands) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return {
+        "sent": len(commands),
+        "received": len(received),
+        "lost": len(commands) - len(received),
+        "in_order": received == commands,
+        "commands_per_second": len(commands) / elapsed,
+    }
+
+
+class LegacyTriggerHandler:
+    """复刻原 read_from_fifo 的处理方式：每次触发创建检测线程，旧线程未退出时持锁 join"""
+
+    def __init__(self, frame_time):
+        self.frame_time = frame_time
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.threads_spawned = 0
+
+    def _detect(self):
+        while True:
+            with self.lock:
+                if not self.running:
+                    break
+            time.sleep(self.frame_time)
+
+    def __call__(self, command):
+        with self.lock:
+            if command == START:
+                if not self.running:
+                    self.running = True
+                    if self.thread is not None and self.thread.is_alive():
+                        self.thread.join(timeout=2)
+                    self.thread = threading.Thread(target=self._detect)
+                    self.thread.daemon = True
+                    self.thread.start()
+                    self.threads_spawned += 1
+            else:
+                self.running = False
+
+
+def bench_triggers(args):
+    """雷达触发风暴：高频交替发送启动/停止命令，对比每次触发创建线程与常驻状态机的命令处理耗时"""
+    legacy = LegacyTriggerHandler(args.frame_time)
+    worker = CameraWorker(
+        "cam1",
+        start_fn=lambda camera_id, trigger_time: True,
+        step_fn=lambda camera_id, confirmed: (time.sleep(args.frame_time), (False, 0, True))[1],
+        stop_fn=lambda camera_id: None,
+        release_fn=lambda camera_id: None,
+        cooldown=0.5)
+    worker.start()
+
+    report = {}
+    for mode, handle in (("spawn_per_trigger", legacy), ("state_machine", worker.post)):
+        latencies = []
+        interval = 1.0 / args.rate
+        start = time.monotonic()
+        i = 0
+        # 和 analog_signal.py 一样按固定间隔发送，只是频率高得多
+        while time.monotonic() - start < args.duration:
+            command = START if i % 2 == 0 else STOP
+            sent = time.monotonic()
+            handle(command)
+            latencies.append(time.monotonic() - sent)
+            i += 1
+            ahead = start + i * interval - time.monotonic()
+            if ahead > 0:
+                time.sleep(ahead)
+        elapsed = time.monotonic() - start
+        report[mode] = dict(summarize_latency(latencies), max_ms=1000 * max(latencies),
+                            achieved_rate=i / elapsed)
+
+    report["spawn_per_trigger"]["threads_spawned"] = legacy.threads_spawned
+    time.sleep(0.2)
+    report["state_machine"]["commands_handled"] = worker.commands_handled
+    report["state_machine"]["transitions"] = worker.transitions
+    return report
+
+
+def bench_modes(args):
+    """对比 presence 模式（只检测person、不跑跟踪器）与 track 模式的单帧延迟"""
+    model = load_model(args.model, track=True)
+    frames = synthetic_frames(8)
+
+    def track_frame(frame):
+        # 原检测循环：全类别加跟踪器，再逐框比较类别名
+        result = model.track(frame, stream=False, verbose=False)[0]
+        for box in result.boxes:
+            if result.names[int(box.cls[0])] == "person":
+                return True
+        return False
+
+    def presence_frame(frame):
+        result = model.predict(frame, classes=[PERSON_CLASS], verbose=False)[0]
+        return person_presence(result)[0]
+
+    report = {}
+    for mode, run in (("track", track_frame), ("presence", presence_frame)):
+        run(frames[0])  # 预热
+        latencies = []
+        for i in range(args.frames):
+            start = time.monotonic()
+            run(frames[i % len(frames)])
+            latencies.append(time.monotonic() - start)
+        report[mode] = summarize_latency(latencies)
+    return report
+
+
+def synthetic_raw_outputs(count, people, num_classes=80, num_anchors=8400, seed=0):
+    """合成检测头原始输出 (4 + 类别数, 锚点数)：背景锚点为低分随机框，每个人由一簇相互重叠的高分锚点组成，
+    部分锚点的最高分类别不是 person，用来检验类别过滤"""
+    rng = np.random.default_rng(seed)
+    outputs = []
+    for _ in range(count):
+        output = rng.random((4 + num_classes, num_anchors), dtype=np.float32) * 0.05
+        output[:4] = rng.random((4, num_anchors), dtype=np.float32) * np.array([[640], [640], [80], [160]], np.float32)
+        for _ in range(people):
+            anchors = rng.choice(num_anchors, 24, replace=False)
+            cx, cy = rng.uniform(60, 580), rng.uniform(100, 540)
+            w, h = rng.uniform(30, 120), rng.uniform(80, 300)
+            output[0, anchors] = cx + rng.normal(0, w * 0.05, anchors.size)
+            output[1, anchors] = cy + rng.normal(0, h * 0.05, anchors.size)
+            output[2, anchors] = w * rng.uniform(0.9, 1.1, anchors.size)
+            output[3, anchors] = h * rng.uniform(0.9, 1.1, anchors.size)
+            output[4 + PERSON_CLASS, anchors] = rng.uniform(0.1, 0.95, anchors.size)
+            # 少数锚点的其他类别分数更高
+            output[4 + rng.integers(1, num_classes), anchors[:3]] = 0.97
+        outputs.append(output)
+    return outputs
+
+
+def reference_postprocess(output, conf, iou, orig_shape):
+    """参照实现：安装了 Ultralytics 时用其 non_max_suppression（原检测路径），否则用 OpenCV 的 NMSBoxes"""
+    try:
+        import torch
+        from ultralytics.utils import ops
+    except ImportError:
+        scores = output[4 + PERSON_CLASS]
+        candidates = np.flatnonzero((scores > conf) & (scores >= output[4:].max(axis=0)))
+        cx, cy, w, h = output[:4, candidates]
+        boxes = np.stack((cx - w / 2, cy - h / 2, w, h), axis=1)
+        keep = np.asarray(cv2.dnn.NMSBoxes(boxes.tolist(), scores[candidates].tolist(), conf, iou),
+                          dtype=np.intp).reshape(-1)
+        detections = np.concatenate((boxes[keep, :2], boxes[keep, :2] + boxes[keep, 2:],
+                                     scores[candidates][keep, None]), axis=1)
+        detections[:, [0, 2]] = detections[:, [0, 2]].clip(0, orig_shape[1])
+        detections[:, [1, 3]] = detections[:, [1, 3]].clip(0, orig_shape[0])
+        return "opencv_nms", detections[np.argsort(-detections[:, 4], kind="stable")]
+    prediction = ops.non_max_suppression(torch.from_numpy(output[np.newaxis]), conf, iou, classes=[PERSON_CLASS])[0]
+    detections = prediction[:, :5].numpy()
+    detections[:, [0, 2]] = detections[:, [0, 2]].clip(0, orig_shape[1])
+    detections[:, [1, 3]] = detections[:, [1, 3]].clip(0, orig_shape[0])
+    return "ultralytics_nms", detections
+
+
+def bench_postprocess(args):
+    """原始输出的向量化人员后处理：与参照实现（Ultralytics NMS 或 OpenCV NMS）逐帧比对检测结果和每帧耗时"""
+    outputs = synthetic_raw_outputs(args.frames, args.people)
+    orig_shape = (640, 640)
+    decoder = PersonDecoder(iou=args.iou)
+
+    mismatched = 0
+    max_box_error = max_conf_error = 0.0
+    reference_name = None
+    reference_results = []
+    for output in outputs:
+        reference_name, reference = reference_postprocess(output, args.conf, args.iou, orig_shape)
+        reference_results.append(reference)
+        detections = decoder.decode(output, args.conf, orig_shape=orig_shape)
+        if detections.shape != reference.shape:
+            mismatched += 1
+            continue
+        if len(detections):
+            max_box_error = max(max_box_error, float(np.abs(detections[:, :4] - reference[:, :4]).max()))
+            max_conf_error = max(max_conf_error, float(np.abs(detections[:, 4] - reference[:, 4]).max()))
+
+    def vectorized(output):
+        return person_presence(RawResult(decoder.decode(output, args.conf, orig_shape=orig_shape), orig_shape))
+
+    report = {"reference": reference_name, "frames": len(outputs),
+              "mean_detections": sum(len(r) for r in reference_results) / len(outputs),
+              "mismatched_frames": mismatched, "max_box_error_px": max_box_error, "max_conf_error": max_conf_error}
+    timings = {"vectorized_ms": vectorized,
+               "reference_ms": lambda output: reference_postprocess(output, args.conf, args.iou, orig_shape)}
+    for name, function in timings.items():
+        for _ in range(args.repeat - 1):
+            timed_per_frame(function, outputs)
+        report[name] = timed_per_frame(function, outputs)
+    return report
+
+
+class StaticOutputBackend(TensorBackend):
+    """返回固定原始输出的后端：照常填充输入张量，只是不推理，用来单独测量推理之外的内存分配"""
+
+    def __init__(self, output, reuse_buffers=True):
+        super().__init__(reuse_buffers)
+        self.output = output[np.newaxis]
+
+    def infer(self, tensor):
+        return self.output
+
+
+def rss_bytes():
+    """当前进程的常驻内存（字节）"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def allocation_round(reuse, args, output):
+    """采集线程 + 检测循环（letterbox、输入张量、解码、归还帧）跑 args.frames 帧，
+    用 tracemalloc 统计每帧的临时分配峰值（包括采集线程读入新帧）和整轮的净增长"""
+    pool = FramePool(args.pool_size) if reuse else None
+    grabber = LatestFrameGrabber(lambda: SyntheticCamera(args.width, args.height, fps=args.fps),
+                                 name="allocations", pool=pool)
+    model = RawPersonModel(StaticOutputBackend(output, reuse_buffers=reuse), args.imgsz, reuse_buffers=reuse)
+    if not grabber.start():
+        raise SystemExit("无法启动合成视频源")
+    seq = 0
+
+    def step():
+        nonlocal seq
+        frame, _, seq = grabber.latest(newer_than=seq, timeout=1.0)
+        person_presence(model.predict(frame)[0])
+        grabber.release(frame)
+
+    for _ in range(args.warmup):
+        step()
+    tracemalloc.start()
+    start_traced = tracemalloc.get_traced_memory()[0]
+    start_rss = max_rss = rss_bytes()
+    peaks = []
+    for _ in range(args.frames):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        step()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        max_rss = max(max_rss, rss_bytes())
+    growth = tracemalloc.get_traced_memory()[0] - start_traced
+    tracemalloc.stop()
+    grabber.stop()
+
+    frame_bytes = args.width * args.height * 3
+    report = {
+        "frames": args.frames,
+        "transient_bytes_per_frame": {"mean": sum(peaks) / len(peaks), "p50": percentile(peaks, 50),
+                                      "p99": percentile(peaks, 99), "max": max(peaks)},
+        "transient_frames_per_frame": sum(peaks) / len(peaks) / frame_bytes,
+        "traced_growth_bytes": growth,
+        "rss_mb": {"start": start_rss / 1e6, "max": max_rss / 1e6, "growth": (max_rss - start_rss) / 1e6},
+        "grabber": grabber.stats(),
+    }
+    if pool is not None:
+        report["frame_pool"] = pool.stats()
+    return report
+
+
+def bench_allocations(args):
+    """采集到输入张量的内存分配：逐帧新分配（不用缓冲池，letterbox 和 blobFromImages 每帧新建数组）
+    与缓冲池 + 预分配画布和张量的对比；后端返回固定原始输出，不受推理本身的分配影响"""
+    output = synthetic_raw_outputs(1, args.people)[0]
+    return {
+        "frame_size": [args.width, args.height],
+        "frame_bytes": args.width * args.height * 3,
+        "imgsz": args.imgsz,
+        "allocating": allocation_round(False, args, output),
+        "pooled": allocation_round(True, args, output),
+    }
+
+
+def bench_motion(args):
+    """在录制素材上评估运动门限：跳过帧比例、节省的推理时间，以及沿用结果与实际推理的不一致率"""
+    model = load_model(args.model)
+    frames, fps = recorded_frames(args.video, args.max_frames)
+    gate = MotionGate(pixel_threshold=args.pixel_threshold, area_threshold=args.area_threshold,
+                      force_interval=args.force_interval)
+
+    gate_time = inference_time = 0.0
+    inferred = mismatches = 0
+    cpu_start = time.process_time()
+    last_present = False
+    for i, frame in enumerate(frames):
+        start = time.monotonic()
+        run = gate.check(frame, now=i / fps)  # 按素材时间计算强制推理间隔
+        gate_time += time.monotonic() - start
+
+        if run or args.verify:
+            start = time.monotonic()
+            present = person_presence(model.predict(frame, classes=[PERSON_CLASS], verbose=False)[0])[0]
+            elapsed = time.monotonic() - start
+            if run:
+                inference_time += elapsed
+                inferred += 1
+                last_present = present
+            elif present != last_present:
+                mismatches += 1
+
+    stats = gate.stats()
+    mean_inference = inference_time / max(inferred, 1)
+    report = dict(stats,
+                  gate_ms_per_frame=1000 * gate_time / max(len(frames), 1),
+                  inference_ms_per_frame=1000 * mean_inference,
+                  inference_time_saved_s=stats["skipped"] * mean_inference)
+    if args.verify:
+        report["skipped_result_mismatch_ratio"] = mismatches / max(stats["skipped"], 1)
+    else:
+        report["cpu_time_s"] = time.process_time() - cpu_start
+    return report
+
+
+def bgr_to_yuyv(frame):
+    """把BGR图像打包为 YUYV（YUY2）数据，模拟摄像头未压缩输出"""
+    yuv = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV)
+    height, width = frame.shape[:2]
+    yuyv = np.empty((height, width, 2), dtype=np.uint8)
+    yuyv[:, :, 0] = yuv[:, :, 0]
+    yuyv[:, 0::2, 1] = yuv[:, 0::2, 1]  # U 取偶数列
+    yuyv[:, 1::2, 1] = yuv[:, 0::2, 2]  # V 取偶数列
+    return yuyv
+
+
+def mjpeg_stream(video, max_frames, width, height, quality):
+    """取录制的 MJPEG 流（.mjpeg 文件直接拆分），或把其他素材逐帧编码为JPEG，返回JPEG数据列表"""
+    if video.endswith((".mjpeg", ".mjpg")):
+        with open(video, "rb") as f:
+            return [np.frombuffer(frame, dtype=np.uint8) for frame in split_jpeg_stream(f.read())[:max_frames]]
+    frames, _ = recorded_frames(video, max_frames)
+    return [cv2.imencode(".jpg", cv2.resize(frame, (width, height)), [cv2.IMWRITE_JPEG_QUALITY, quality])[1]
+            for frame in frames]
+
+
+def timed_per_frame(function, items):
+    """对每个输入执行 function，返回平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for item in items:
+        function(item)
+    return 1000 * (time.perf_counter() - start) / max(len(items), 1)
+
+
+def probe_capture_format(device, fourcc, width, height, fps, duration):
+    """以指定格式打开真实摄像头，统计实际协商的格式和取帧帧率"""
+    if fourcc == "MJPG":
+        cap, raw = open_mjpeg_capture(device, width, height, fps)
+    else:
+        cap, raw = cv2.VideoCapture(device, cv2.CAP_V4L2), False
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    if cap is None or not cap.isOpened():
+        return {"opened": False}
+    frames = nbytes = 0
+    start = time.monotonic()
+    while time.monotonic() - start < duration:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        nbytes += frame.nbytes
+    elapsed = time.monotonic() - start
+    negotiated = int(cap.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, "little").decode("ascii", "replace")
+    cap.release()
+    return {"opened": True, "fourcc": negotiated, "raw": raw, "fps": frames / elapsed,
+            "mb_per_s": nbytes / elapsed / 1e6}
+
+
+def bench_mjpeg(args):
+    """MJPEG 采集评估：每帧解码耗时（全尺寸、缩小解码、先解码再缩放）与 YUYV 转换耗时，
+    两种格式在给定帧率下的USB带宽，以及检测循环低于摄像头帧率时按需解码节省的解码次数"""
+    jpegs = mjpeg_stream(args.video, args.max_frames, args.width, args.height, args.quality)
+    if not jpegs:
+        raise SystemExit(f"{args.video} 中没有可用的帧")
+    first = cv2.imdecode(jpegs[0], cv2.IMREAD_COLOR)
+    height, width = first.shape[:2]
+    yuyv_frames = [bgr_to_yuyv(cv2.imdecode(jpeg, cv2.IMREAD_COLOR)) for jpeg in jpegs[:args.max_frames]]
+
+    decode_ms = {f"reduced_{scale}": timed_per_frame(lambda jpeg, s=scale: decode_jpeg(jpeg, s), jpegs)
+                 for scale in REDUCED_DECODE_FLAGS}
+    for scale in (2, 4, 8):
+        size = (width // scale, height // scale)
+        decode_ms[f"full_then_resize_{scale}"] = timed_per_frame(
+            lambda jpeg: cv2.resize(cv2.imdecode(jpeg, cv2.IMREAD_COLOR), size, interpolation=cv2.INTER_AREA), jpegs)
+    yuyv_ms = timed_per_frame(lambda yuyv: cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUYV), yuyv_frames)
+
+    mjpeg_bytes = sum(jpeg.size for jpeg in jpegs) / len(jpegs)
+    yuyv_bytes = width * height * 2
+    bus_rate = args.fps * args.cameras
+
+    # 按需解码：采集线程以摄像头帧率出帧，检测循环以推理帧率取帧，只有取走的帧才解码
+    with tempfile.TemporaryDirectory(prefix="bench_mjpeg_") as workdir:
+        stream_path = os.path.join(workdir, "stream.mjpeg")
+        with open(stream_path, "wb") as f:
+            for jpeg in jpegs:
+                f.write(jpeg.tobytes())
+        scale = decode_scale(width, height, args.imgsz)
+        grabber = LatestFrameGrabber(lambda: MjpegFileCamera(stream_path, fps=args.fps), name="mjpeg",
+                                     decode=lambda data: decode_jpeg(data, scale))
+        grabber.start()
+        seq = 0
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            _, _, seq = grabber.latest(newer_than=seq, timeout=1.0)
+            time.sleep(1.0 / args.inference_fps)
+        grabber.stop()
+        lazy = grabber.stats()
+
+    report = {
+        "frames": len(jpegs),
+        "frame_size": [width, height],
+        "decode_ms_per_frame": decode_ms,
+        "yuyv_to_bgr_ms_per_frame": yuyv_ms,
+        "bytes_per_frame": {"mjpeg": mjpeg_bytes, "yuyv": yuyv_bytes},
+        "bus_mb_per_s": {"mjpeg": mjpeg_bytes * bus_rate / 1e6, "yuyv": yuyv_bytes * bus_rate / 1e6},
+        # USB 2.0 高速同步传输每个端点每微帧最多 3 x 1024 字节
+        "usb2_isochronous_limit_mb_per_s": 3 * 1024 * 8000 / 1e6,
+        "lazy_decode": {
+            "capture_fps": args.fps,
+            "inference_fps": args.inference_fps,
+            "decode_scale": scale,
+            "captured": lazy["captured"],
+            "decoded": lazy["decoded"],
+            "decoded_ratio": lazy["decoded"] / max(lazy["captured"], 1),
+            "mean_decode_ms": lazy["mean_decode_ms"],
+        },
+    }
+    if args.device:
+        report["device"] = {fourcc: probe_capture_format(args.device, fourcc, args.width, args.height, args.fps,
+                                                         args.probe_duration)
+                            for fourcc in ("YUYV", "MJPG")}
+    return report
+
+
+def raw_stream_command(args, frames=None, down_file=None):
+    """RTSP摄像头替身的命令：--video 时用 ffmpeg 按素材帧率循环解码（本地文件代替RTSP流），
+    否则用 synthetic.py 输出带采集时间戳的合成原始帧"""
+    if args.video:
+        return ffmpeg_file_command(args.video, args.width, args.height)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "synthetic.py")
+    command = [sys.executable, script, "--width", str(args.width), "--height", str(args.height), "--fps", str(args.fps)]
+    if frames is not None:
+        command += ["--frames", str(frames)]
+    if down_file is not None:
+        command += ["--down-file", down_file]
+    return command
+
+
+def open_raw_capture(command, args):
+    """启动管道视频源，读不到第一帧时返回 None（与 ffmpeg_capture.open_rtsp_capture 一致）"""
+    cap = FfmpegCapture(command, args.width, args.height, args.read_timeout)
+    return cap if cap.isOpened() else None
+
+
+def frame_age(frame, read_time, args):
+    """帧龄：合成原始帧按帧内的采集时间戳计算，ffmpeg 解码的素材只能从读出管道时算起"""
+    return time.monotonic() - (read_time if args.video else raw_frame_timestamp(frame))
+
+
+def rtsp_consumer_ages(args, read):
+    """以 --inference-fps 的节奏取帧（sleep 模拟推理耗时），返回每帧的帧龄（秒）"""
+    ages = []
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        frame, read_time = read()
+        if frame is None:
+            continue
+        ages.append(frame_age(frame, read_time, args))
+        time.sleep(1.0 / args.inference_fps)
+    return ages
+
+
+def summarize_ages(ages, window):
+    """帧龄统计（毫秒），drift 为最后 window 帧与最初 window 帧的平均帧龄之差"""
+    report = summarize_latency(ages)
+    if ages:
+        first, last = ages[:window], ages[-window:]
+        report["max_ms"] = 1000 * max(ages)
+        report["drift_ms"] = 1000 * (sum(last) / len(last) - sum(first) / len(first))
+    return report
+
+
+def reconnect_round(args, workdir, policy, delay, max_delay):
+    """模拟一次掉线：流播放 --drop-after 秒后断开，期间摄像头离线 --outage 秒，统计重连次数和恢复时间"""
+    down_file = os.path.join(workdir, f"down_{policy}")
+    command = raw_stream_command(args, frames=int(args.drop_after * args.fps), down_file=down_file)
+    grabber = LatestFrameGrabber(lambda: open_raw_capture(command, args), name=policy,
+                                 reconnect_delay=delay, max_reconnect_delay=max_delay)
+    if not grabber.start():
+        raise SystemExit("无法启动视频流替身")
+
+    open(down_file, "w").close()  # 当前这段流结束后摄像头离线
+    went_down = time.monotonic()
+    time.sleep(args.drop_after + args.outage)
+    attempts_during_outage = grabber.stats()["reconnect_attempts"]
+    os.remove(down_file)
+    came_back = time.monotonic()
+
+    _, _, seq = grabber.latest(timeout=0)
+    recovered = None
+    while recovered is None and time.monotonic() < came_back + args.max_reconnect_delay + args.read_timeout + 5:
+        frame, timestamp, seq = grabber.latest(newer_than=seq, timeout=1.0)
+        if frame is not None and timestamp > came_back:
+            recovered = timestamp
+    grabber.stop()
+    return {
+        "reconnect_delay": delay,
+        "max_reconnect_delay": max_delay,
+        "down_s": came_back - went_down,
+        "reconnect_attempts": attempts_during_outage,
+        "attempts_per_s": attempts_during_outage / (came_back - went_down),
+        "recovery_ms": 1000 * (recovered - came_back) if recovered is not None else None,
+    }
+
+
+def bench_rtsp(args):
+    """RTSP接收评估（以管道替身代替摄像头）：
+    - 帧龄：检测循环以 --inference-fps 取帧，按顺序读管道（相当于 cv2.VideoCapture 的默认缓冲）与采集线程只保留最新帧对比
+    - 重连：摄像头离线期间固定间隔重连与指数退避的重连次数，以及摄像头恢复后重新取到帧的时间"""
+    command = raw_stream_command(args)
+    report = {"frame_size": [args.width, args.height], "fps": args.fps, "inference_fps": args.inference_fps,
+              "source": args.video or "synthetic_pipe"}
+
+    cap = open_raw_capture(command, args)
+    if cap is None:
+        raise SystemExit("无法启动视频流替身")
+    buffer = np.empty((args.height, args.width, 3), dtype=np.uint8)
+
+    def read_in_order():
+        ok, frame = cap.read(buffer)
+        return (frame if ok else None), time.monotonic()
+
+    window = max(1, int(args.inference_fps))  # 最初和最后一秒
+    report["sequential_age"] = summarize_ages(rtsp_consumer_ages(args, read_in_order), window)
+    cap.release()
+
+    pool = FramePool(4)
+    grabber = LatestFrameGrabber(lambda: open_raw_capture(command, args), name="rtsp", pool=pool)
+    if not grabber.start():
+        raise SystemExit("无法启动视频流替身")
+    seq = 0
+    held = None
+
+    def read_latest():
+        nonlocal seq, held
+        grabber.release(held)
+        held, timestamp, seq = grabber.latest(newer_than=seq, timeout=1.0)
+        return held, timestamp
+
+    report["latest_frame_age"] = summarize_ages(rtsp_consumer_ages(args, read_latest), window)
+    grabber.stop()
+    report["latest_frame_grabber"] = grabber.stats()
+    report["frame_pool"] = pool.stats()
+
+    if args.outage > 0:
+        with tempfile.TemporaryDirectory(prefix="bench_rtsp_") as workdir:
+            report["reconnect"] = {
+                "fixed": reconnect_round(args, workdir, "fixed", args.fixed_delay, None),
+                "backoff": reconnect_round(args, workdir, "backoff", args.reconnect_delay, args.max_reconnect_delay),
+            }
+    return report
+
+
+def bench_roi(args):
+    """对比雷达引导的区域推理与全画面推理的单帧耗时"""
+    model = load_model(args.model)
+    frames = synthetic_frames(8)
+    height, width = frames[0].shape[:2]
+    calibration = {"az_range": (-30, 30), "roi_width": args.roi_width}
+    roi = radar_roi(calibration, {"az": str(args.az)}, width, height)
+
+    def full_frame(frame):
+        return model.predict(frame, classes=[PERSON_CLASS], verbose=False, imgsz=args.imgsz)[0]
+
+    def roi_frame(frame):
+        return model.predict(crop_roi(frame, roi), classes=[PERSON_CLASS], verbose=False,
+                             imgsz=args.roi_imgsz)[0]
+
+    report = {"roi": list(roi)}
+    for mode, run in (("full_frame", full_frame), ("roi", roi_frame)):
+        run(frames[0])  # 预热
+        latencies = []
+        for i in range(args.frames):
+            start = time.monotonic()
+            run(frames[i % len(frames)])
+            latencies.append(time.monotonic() - start)
+        report[mode] = summarize_latency(latencies)
+    return report
+
+
+def bench_cascade(args):
+    """在录制素材上对比分辨率级联与只做全分辨率推理：单帧平均推理耗时和相对全分辨率的漏检率"""
+    model = load_model(args.model)
+
+    def infer(frame, imgsz, conf):
+        kwargs = {"imgsz": args.imgsz if imgsz is None else imgsz}
+        if conf is not None:
+            kwargs["conf"] = conf
+        return model.predict(frame, classes=[PERSON_CLASS], verbose=False, **kwargs)[0]
+
+    def evaluate(video):
+        frames, _ = recorded_frames(video, args.max_frames)
+        cascade = ResolutionCascade(args.screen_imgsz, args.screen_conf, args.confirm_conf)
+        full_time = cascade_time = 0.0
+        full_positives = misses = extra = 0
+        for frame in frames:
+            start = time.monotonic()
+            full_present = person_presence(infer(frame, None, args.confirm_conf))[0]
+            full_time += time.monotonic() - start
+
+            start = time.monotonic()
+            cascade_present = person_presence(cascade.detect(infer, frame))[0]
+            cascade_time += time.monotonic() - start
+
+            full_positives += full_present
+            misses += full_present and not cascade_present
+            extra += cascade_present and not full_present
+        return dict(cascade.stats(),
+                    full_ms_per_frame=1000 * full_time / max(len(frames), 1),
+                    cascade_ms_per_frame=1000 * cascade_time / max(len(frames), 1),
+                    full_positive_frames=full_positives,
+                    missed_frames=misses,
+                    miss_rate=misses / max(full_positives, 1),
+                    extra_frames=extra)
+
+    clips = {video: evaluate(video) for video in args.video}
+    frames = sum(clip["frames"] for clip in clips.values())
+    positives = sum(clip["full_positive_frames"] for clip in clips.values())
+    missed = sum(clip["missed_frames"] for clip in clips.values())
+    total = {
+        "frames": frames,
+        "full_ms_per_frame": sum(c["full_ms_per_frame"] * c["frames"] for c in clips.values()) / max(frames, 1),
+        "cascade_ms_per_frame": sum(c["cascade_ms_per_frame"] * c["frames"] for c in clips.values()) / max(frames, 1),
+        "miss_rate": missed / max(positives, 1),
+    }
+    return {"clips": clips, "total": total}
+
+
+def ring_reader(name, duration, copy, results):
+    """帧环读者进程：持续读取最新帧，记录收到的帧数、帧龄和重试次数"""
+    reader = FrameRingReader(name)
+    seq = reader.latest_seq()
+    ages = []
+    frames = skipped = 0
+    checksum = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame, timestamp, new_seq = reader.wait(newer_than=seq, timeout=0.1, copy=copy)
+        if frame is None:
+            continue
+        checksum += int(frame[::32, ::32].sum())  # 模拟读者访问像素
+        ages.append(time.monotonic() - timestamp)
+        skipped += new_seq - seq - 1 if seq else 0
+        seq = new_seq
+        frames += 1
+    frame = None
+    reader.close()
+    results.put(dict(summarize_latency(ages), frames=frames, fps=frames / duration, skipped=skipped,
+                     torn_reads=reader.torn_reads))
+
+
+def bench_ring(args):
+    """共享内存帧环吞吐：一个写者按设定帧率发布帧，多个读者进程同时零拷贝读取"""
+    name = f"bench_ring_{os.getpid()}"
+    writer = FrameRingWriter(name, slots=args.slots)
+    frames = synthetic_frames(8)
+    writer.publish(frames[0])
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    readers = [context.Process(target=ring_reader, args=(name, args.duration, args.copy, results))
+               for _ in range(args.readers)]
+    for process in readers:
+        process.start()
+    time.sleep(1.0)  # 等待读者进程启动并映射
+
+    publish_times = []
+    interval = 1.0 / args.fps if args.fps else 0.0
+    next_frame = start = time.monotonic()
+    while time.monotonic() - start < args.duration:
+        t0 = time.monotonic()
+        writer.publish(frames[len(publish_times) % len(frames)], t0)
+        publish_times.append(time.monotonic() - t0)
+        next_frame += interval
+        delay = next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.monotonic() - start
+
+    reader_reports = [results.get() for _ in readers]
+    for process in readers:
+        process.join()
+    writer.close()
+    return {
+        "frame_shape": list(frames[0].shape),
+        "writer_fps": len(publish_times) / elapsed,
+        "publish": summarize_latency(publish_times),
+        "readers": reader_reports,
+    }
+
+
+def python_work(iterations):
+    """持有GIL的纯Python计算，模拟结果对象构造、逐框遍历和跟踪器更新等后处理"""
+    total = 0
+    for i in range(iterations):
+        total += i & 7
+    return total
+
+
+def calibrate_python_work(ms):
+    """估算单线程执行 ms 毫秒纯Python计算所需的迭代次数"""
+    iterations = 100000
+    start = time.perf_counter()
+    python_work(iterations)
+    return int(iterations * ms / 1000 / (time.perf_counter() - start))
+
+
+def camera_loop(camera_id, model, duration, iterations, fps):
+    """单个摄像头的采集、推理、后处理循环，返回处理的帧数"""
+    grabber = LatestFrameGrabber(lambda: SyntheticCamera(fps=fps, person_period=(2, 2)), name=camera_id)
+    grabber.start()
+    seq = frames = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame, _, seq = grabber.latest(newer_than=seq, timeout=1.0)
+        if frame is None:
+            continue
+        person_presence(model.predict(frame, classes=[PERSON_CLASS], verbose=False)[0])
+        python_work(iterations)
+        frames += 1
+    grabber.stop()
+    return frames
+
+
+def camera_process_loop(camera_id, conn, model_name, duration, iterations, fps):
+    """多进程模式下的摄像头进程入口：跑完后把处理帧数回报给协调者"""
+    frames = camera_loop(camera_id, load_model(model_name), duration, iterations, fps)
+    conn.send((camera_id, frames))
+
+
+def bench_processes(args):
+    """对比线程模式与每摄像头一个进程的多进程模式在 N 个合成摄像头下的总帧率
+
+    桩模型每个摄像头使用独立的设备锁（模拟多核NPU各占一个核），
+    两种模式的差别只在Python后处理是否在同一个解释器里争用GIL。
+    """
+    iterations = calibrate_python_work(args.postprocess_ms)
+    report = {"postprocess_iterations": iterations}
+    for count in args.cameras:
+        camera_ids = [f"cam{i + 1}" for i in range(count)]
+
+        # 线程模式：所有摄像头在同一个进程里
+        results = {}
+
+        def run_thread(camera_id):
+            model = load_model(args.model)
+            if isinstance(model, StubModel):
+                model._device_lock = threading.Lock()
+            results[camera_id] = camera_loop(camera_id, model, args.duration, iterations, args.fps)
+
+        threads = [threading.Thread(target=run_thread, args=(camera_id,)) for camera_id in camera_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        threaded = {camera_id: frames / args.duration for camera_id, frames in results.items()}
+
+        # 多进程模式：每个摄像头一个进程，通过管道回报结果
+        processes = {camera_id: CameraProcess(camera_id, camera_process_loop,
+                                              args=(args.model, args.duration, iterations, args.fps))
+                     for camera_id in camera_ids}
+        for camera_process in processes.values():
+            camera_process.start()
+        per_process = {}
+        for camera_id, camera_process in processes.items():
+            _, frames = camera_process.conn.recv()
+            per_process[camera_id] = frames / args.duration
+            camera_process.stop()
+
+        report[f"{count}_cameras"] = {
+            "threaded": {"total_fps": sum(threaded.values()), "cameras": threaded},
+            "processes": {"total_fps": sum(per_process.values()), "cameras": per_process},
+        }
+    return report
+
+
+def wait_marker(path, after, timeout):
+    """等待场景目录中的 opened/released 标记写入 after 之后的时间，返回该时间，超时返回 None"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(path) as f:
+                value = float(f.read())
+            if value >= after:
+                return value
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.002)
+    return None
+
+
+def process_cpu_time(pid):
+    """进程及其已回收子进程的累计CPU时间（秒），读取 /proc/<pid>/stat"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    utime, stime, cutime, cstime = (int(v) for v in fields[11:15])
+    return (utime + stime + cutime + cstime) / os.sysconf("SC_CLK_TCK")
+
+
+def child_pids(pid):
+    """pid 的直接子进程"""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return children
+
+
+class AppUnderTest:
+    """以子进程运行 yolo_fifo_2cam.py：摄像头为场景目录控制的合成摄像头（见 synthetic.SceneCamera），
+    本进程充当雷达端，向命令FIFO发送命令并记录输出FIFO的回复"""
+
+    def __init__(self, camera_ids, model, process_mode=False, startup_timeout=60.0):
+        self.camera_ids = camera_ids
+        self.process_mode = process_mode
+        self.workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+        self.scenes = {camera_id: os.path.join(self.workdir, camera_id) for camera_id in camera_ids}
+        for scene in self.scenes.values():
+            os.makedirs(scene)
+        config_path = os.path.join(self.workdir, "cameras.json")
+        with open(config_path, "w") as f:
+            json.dump({"cameras": {c: {"source": f"scene:{self.scenes[c]}"} for c in camera_ids}}, f)
+        send_path = os.path.join(self.workdir, "send_PYTHON")
+        rece_path = os.path.join(self.workdir, "rece_PYTHON")
+        self.session_log = os.path.join(self.workdir, "sessions.jsonl")
+        self.sessions = []
+        os.mkfifo(rece_path)
+
+        env = dict(os.environ,
+                   RADAR_CAM_CONFIG=config_path,
+                   RADAR_CAM_SEND_FIFO=send_path,
+                   RADAR_CAM_RECE_FIFO=rece_path,
+                   RADAR_CAM_MODEL=model,
+                   RADAR_CAM_PROCESS_MODE="1" if process_mode else "0",
+                   RADAR_CAM_SESSION_LOG=self.session_log,
+                   RADAR_CAM_STATS_JSON=os.path.join(self.workdir, "stats.json"),
+                   RADAR_CAM_METRICS_TEXTFILE=os.path.join(self.workdir, "metrics.prom"),
+                   RADAR_CAM_DETECTION_LOG=os.path.join(self.workdir, "detection_log"),
+                   RADAR_CAM_CLIP_DIR=os.path.join(self.workdir, "clips"))
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "yolo_fifo_2cam.py")
+        self.log = open(os.path.join(self.workdir, "app.log"), "w")
+        self.spawn_time = time.monotonic()
+        self.app = subprocess.Popen([sys.executable, script], env=env, stdout=self.log, stderr=subprocess.STDOUT,
+                                    cwd=os.path.dirname(script))
+        print(f"被测程序 PID {self.app.pid}，日志 {self.log.name}")
+
+        self.peer = FifoPeer(rece_path)
+        deadline = time.monotonic() + startup_timeout
+        while not os.path.exists(send_path):
+            if time.monotonic() > deadline or self.app.poll() is not None:
+                self.app.kill()
+                self.app.wait()
+                self.log.close()
+                with open(self.log.name) as f:
+                    output = f.read()[-4000:]
+                shutil.rmtree(self.workdir, ignore_errors=True)
+                raise RuntimeError(f"被测程序未能启动，输出：\n{output}")
+            time.sleep(0.05)
+        self._command_fd = os.open(send_path, os.O_WRONLY)
+
+    def send(self, command):
+        """发送一条命令，返回发送时间"""
+        now = time.monotonic()
+        os.write(self._command_fd, f"{command}\n".encode())
+        return now
+
+    def set_person(self, camera_id, present):
+        """让人进入或离开某摄像头的画面，返回操作时间"""
+        path = os.path.join(self.scenes[camera_id], "person")
+        if present:
+            open(path, "w").close()
+        elif os.path.exists(path):
+            os.remove(path)
+        return time.monotonic()
+
+    def marker(self, camera_id, name):
+        """摄像头打开/释放标记文件的路径"""
+        return os.path.join(self.scenes[camera_id], name)
+
+    def cpu_times(self):
+        """被测进程的累计CPU时间，多进程模式下各摄像头进程单独统计"""
+        times = {"app": process_cpu_time(self.app.pid)}
+        if self.process_mode:
+            for pid in child_pids(self.app.pid):
+                try:
+                    times[f"child_{pid}"] = process_cpu_time(pid)
+                except OSError:
+                    pass
+        return times
+
+    def stop(self):
+        """中断被测程序，等待其退出，读取会话统计后删除工作目录"""
+        os.close(self._command_fd)
+        self.app.send_signal(signal.SIGINT)
+        try:
+            self.app.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.app.kill()
+            self.app.wait()
+        self.log.close()
+        if os.path.exists(self.session_log):
+            with open(self.session_log) as f:
+                self.sessions = [json.loads(line) for line in f]
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def camera_sessions(self):
+        """按摄像头汇总被测程序写入的会话统计（stop() 之后调用）：帧率、推理帧率和检测线程CPU占用"""
+        cameras = {}
+        for session in self.sessions:
+            totals = cameras.setdefault(session["camera"], {"sessions": 0, "duration_s": 0.0, "frames": 0,
+                                                            "inferences": 0, "thread_cpu_s": 0.0})
+            totals["sessions"] += 1
+            for key in ("duration_s", "frames", "inferences", "thread_cpu_s"):
+                totals[key] += session[key]
+        for totals in cameras.values():
+            duration = max(totals["duration_s"], 1e-9)
+            totals["fps"] = totals["frames"] / duration
+            totals["inference_fps"] = totals["inferences"] / duration
+            totals["thread_cpu_ratio"] = totals["thread_cpu_s"] / duration
+        return dict(sorted(cameras.items(), key=lambda item: int(item[0][3:])))
+
+
+def cpu_report(cpu_start, cpu_end, elapsed):
+    """CPU时间差和占用比例"""
+    process_cpu = {name: value - cpu_start.get(name, 0.0) for name, value in cpu_end.items()}
+    return {"elapsed_s": elapsed, "process_cpu_s": process_cpu,
+            "process_cpu_ratio": {name: value / elapsed for name, value in process_cpu.items()}}
+
+
+def bench_e2e(args):
+    """端到端基准：以合成摄像头和桩模型运行 yolo_fifo_2cam.py，由模拟雷达端按脚本发送命令并记录回复时间
+
+    每轮对一个摄像头依次测量：
+    - trigger_to_first_detection：画面中已有人时发送 leida_camX，到收到 person_camX
+    - absence_to_nono：人离开画面，到收到 person_NONO（包含无人超时时间）
+    - appearance_to_notification：检测运行中人进入画面，到收到 person_camX（包含等待下一帧和推理）
+    - stop_to_release：发送 stop_camX，到摄像头被释放（包含冷却时间）
+    """
+    camera_ids = [f"cam{i + 1}" for i in range(args.cameras)]
+    app = AppUnderTest(camera_ids, args.model, args.process_mode, args.startup_timeout)
+    samples = {key: [] for key in ("trigger_to_first_detection", "absence_to_nono",
+                                   "appearance_to_notification", "stop_to_release")}
+    failures = 0
+    timeout = args.step_timeout
+
+    def record(key, start, end):
+        nonlocal failures
+        if end is None:
+            failures += 1
+            print(f"{key} 超时")
+        else:
+            samples[key].append(end - start)
+
+    time.sleep(args.settle)  # 多进程模式下等摄像头进程启动
+    cpu_start = app.cpu_times()
+    run_start = time.monotonic()
+    for trial in range(args.trials):
+        camera_id = camera_ids[trial % len(camera_ids)]
+        message = f"person_{camera_id}"
+        released = app.marker(camera_id, "released")
+
+        app.set_person(camera_id, True)
+        start = app.send(f"leida_{camera_id}")
+        record("trigger_to_first_detection", start, app.peer.wait_message(message, start, timeout))
+
+        start = app.set_person(camera_id, False)
+        record("absence_to_nono", start, app.peer.wait_message("person_NONO", start, timeout))
+        wait_marker(released, start, timeout)
+
+        app.send(f"leida_{camera_id}")
+        time.sleep(args.settle)  # 等摄像头打开、进入搜索
+        start = app.set_person(camera_id, True)
+        record("appearance_to_notification", start, app.peer.wait_message(message, start, timeout))
+
+        start = app.send(f"stop_{camera_id}")
+        record("stop_to_release", start, wait_marker(released, start, timeout))
+        app.set_person(camera_id, False)
+
+    cpu = cpu_report(cpu_start, app.cpu_times(), time.monotonic() - run_start)
+    app.stop()
+    return {
+        "mode": "process" if args.process_mode else "thread",
+        "trials": args.trials,
+        "failures": failures,
+        "latency": {key: summarize_latency(values) for key, values in samples.items()},
+        "cameras": app.camera_sessions(),
+        "cpu": cpu,
+    }
+
+
+def bench_startup(args):
+    """重启后的启动耗时：被测程序以加载耗时 --load-delay 秒、首次推理额外 --init-latency 秒的桩模型启动，
+    命令FIFO一出现就发送触发命令（画面中已有人），测量：
+    - fifo_ready：启动到命令FIFO可写
+    - trigger_to_first_detection：加载期间发送的 leida_cam1 到收到 person_cam1（命令排队到模型就绪）
+    - spawn_to_first_detection：启动到收到 person_cam1
+    以及被测程序自报的 startup 指标（stats 命令写入的JSON）"""
+    model = f"stub:{args.load_delay},{args.init_latency}"
+    samples = {key: [] for key in ("fifo_ready", "trigger_to_first_detection", "spawn_to_first_detection")}
+    reported = []
+    failures = 0
+    for _ in range(args.trials):
+        app = AppUnderTest(["cam1"], model, startup_timeout=args.step_timeout)
+        samples["fifo_ready"].append(time.monotonic() - app.spawn_time)
+        app.set_person("cam1", True)
+        start = app.send("leida_cam1")
+        detected = app.peer.wait_message("person_cam1", start, args.load_delay + args.step_timeout)
+        if detected is None:
+            failures += 1
+            print("等待 person_cam1 超时")
+        else:
+            samples["trigger_to_first_detection"].append(detected - start)
+            samples["spawn_to_first_detection"].append(detected - app.spawn_time)
+
+        stats_path = os.path.join(app.workdir, "stats.json")
+        requested = time.time()
+        app.send("stats")
+        deadline = time.monotonic() + args.step_timeout
+        while time.monotonic() < deadline and not (os.path.exists(stats_path)
+                                                     and os.path.getmtime(stats_path) >= requested - 1):
+            time.sleep(0.02)
+        try:
+            with open(stats_path) as f:
+                startup = json.load(f).get("startup", {})
+            reported.append({"stages": {stage: values["mean_ms"] for stage, values in startup["stages"].items()},
+                             "counters": startup["counters"]})
+        except (OSError, ValueError, KeyError):
+            print("未能读取被测程序的启动指标")
+        app.stop()
+
+    return {
+        "model": model,
+        "trials": args.trials,
+        "failures": failures,
+        "latency": {key: summarize_latency(values) for key, values in samples.items()},
+        "reported_ms": reported,
+    }
+
+
+def presence_decision_cost(count, iterations=20000):
+    """无人判断的单次耗时（微秒）：全局在场计数 vs 逐个摄像头加锁扫描；
+    取需要发送 person_NONO 的情形，即其他摄像头都没有检测到人，扫描不能提前结束"""
+    aggregator = PresenceAggregator()
+    camera_ids = [f"cam{i + 1}" for i in range(count)]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        aggregator.enter("cam1")
+        aggregator.leave("cam1")
+    aggregated = 1e6 * (time.perf_counter() - start) / iterations
+
+    # 原方式：每个其他摄像头加锁检查运行状态和最后检测时间
+    locks = {camera_id: threading.Lock() for camera_id in camera_ids}
+    status = {camera_id: {"running": True, "last_detection_time": 0.0} for camera_id in camera_ids}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for camera_id in camera_ids[1:]:
+            with locks[camera_id]:
+                if status[camera_id]["running"] and time.time() - status[camera_id]["last_detection_time"] <= 3:
+                    break
+    scanned = 1e6 * (time.perf_counter() - start) / iterations
+    return {"aggregator_us": aggregated, "lock_scan_us": scanned}
+
+
+def bench_scaling(args):
+    """多摄像头扩展测试：N 个合成摄像头同时被 leida_ 触发，统计各摄像头首次检测延迟、帧率，
+    以及所有人离开后 person_NONO 只发送一次"""
+    report = {}
+    for count in args.cameras:
+        camera_ids = [f"cam{i + 1}" for i in range(count)]
+        app = AppUnderTest(camera_ids, args.model, args.process_mode, args.startup_timeout)
+        time.sleep(args.settle)
+        for camera_id in camera_ids:
+            app.set_person(camera_id, True)
+
+        cpu_start = app.cpu_times()
+        run_start = time.monotonic()
+        start = app.send("leida_")
+        first_detection = []
+        missing = []
+        for camera_id in camera_ids:
+            arrival = app.peer.wait_message(f"person_{camera_id}", start, args.step_timeout)
+            if arrival is None:
+                missing.append(camera_id)
+            else:
+                first_detection.append(arrival - start)
+
+        time.sleep(args.duration)
+        absent = time.monotonic()
+        for camera_id in camera_ids:
+            app.set_person(camera_id, False)
+        first_nono = app.peer.wait_message("person_NONO", absent, args.step_timeout)
+        for camera_id in camera_ids:
+            wait_marker(app.marker(camera_id, "released"), absent, args.step_timeout)
+        time.sleep(1.0)  # 留出时间捕获重复的 person_NONO
+        nono_count = sum(1 for t, m in list(app.peer.messages) if m == "person_NONO" and t >= absent)
+
+        cpu = cpu_report(cpu_start, app.cpu_times(), time.monotonic() - run_start)
+        app.stop()
+        cameras = app.camera_sessions()
+        report[f"{count}_cameras"] = {
+            "trigger_to_first_detection": summarize_latency(first_detection),
+            "missing_detections": missing,
+            "absence_to_nono_ms": 1000 * (first_nono - absent) if first_nono is not None else None,
+            "nono_count": nono_count,
+            "total_inference_fps": sum(c["inference_fps"] for c in cameras.values()),
+            "min_camera_fps": min((c["fps"] for c in cameras.values()), default=0.0),
+            "cameras": cameras,
+            "cpu": cpu,
+            "nono_decision": presence_decision_cost(count),
+        }
+    return report
+
+
+def bench_metrics(args):
+    """分阶段计时指标的开销：单次记录耗时，以及按检测循环的埋点数量折算的每帧开销"""
+    metrics = Metrics()
+    n = args.iterations
+
+    start = time.perf_counter()
+    for _ in range(n):
+        time.monotonic()
+    clock_ns = 1e9 * (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        metrics.observe("cam1", "inference", time.monotonic())
+    observe_ns = 1e9 * (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        metrics.increment("cam1", "frames")
+    increment_ns = 1e9 * (time.perf_counter() - start) / n
+
+    # 每个组件若干阶段都填满滚动窗口后，导出一次的耗时
+    for component in ("cam1", "cam2", "fifo_writer", "command_reader", "inference_engine"):
+        for stage in ("capture", "motion_gate", "preprocess", "inference", "postprocess", "publish", "frame"):
+            for _ in range(metrics.window):
+                metrics.observe(component, stage, time.monotonic())
+    start = time.perf_counter()
+    metrics.snapshot()
+    snapshot_ms = 1000 * (time.perf_counter() - start)
+    start = time.perf_counter()
+    metrics.prometheus_text()
+    export_ms = 1000 * (time.perf_counter() - start)
+
+    # detect_once 每帧最多 7 次计时、4 次计数，各阶段起点另有 7 次取时
+    per_frame_us = (7 * observe_ns + 4 * increment_ns + 7 * clock_ns) / 1000
+    return {
+        "monotonic_ns": clock_ns,
+        "observe_ns": observe_ns,
+        "increment_ns": increment_ns,
+        "per_frame_overhead_us": per_frame_us,
+        "overhead_ratio_at_30fps": per_frame_us / (1e6 / 30),
+        "snapshot_ms": snapshot_ms,
+        "prometheus_text_ms": export_ms,
+    }
+
+
+def bench_eventlog(args):
+    """检测事件日志：检测线程上每次 log() 的耗时（对比向管道 print 一行检测文本，相当于输出到 journald），
+    写入线程的吞吐、丢弃和轮转，以及内存映射查询“最近一小时 cam2 的有人记录”的耗时
+
+    事件的墙上时间均匀分布在最近 --span-hours 小时内，查询只命中其中一部分。"""
+    rng = np.random.default_rng(0)
+    cameras = [f"cam{i + 1}" for i in range(args.cameras)]
+    samples = []
+    for _ in range(64):
+        count = int(rng.integers(0, 4))
+        boxes = np.column_stack((rng.uniform(0, 600, (count, 4)), rng.uniform(0.3, 0.95, count))).astype(np.float32)
+        samples.append((count, float(boxes[:, 4].max()) if count else 0.0, boxes))
+
+    with tempfile.TemporaryDirectory(prefix="bench_eventlog_") as workdir:
+        writer = DetectionLogWriter(workdir, max_bytes=args.max_mb * 1024 * 1024, max_files=args.max_files,
+                                    max_queue=args.max_queue)
+        writer.start()
+        now = time.time()
+        span = args.span_hours * 3600
+        durations = []
+        write_start = time.perf_counter()
+        for i in range(args.events):
+            count, max_conf, boxes = samples[i % len(samples)]
+            wall_time = now - span * (1 - i / args.events)
+            start = time.perf_counter()
+            writer.log(cameras[i % len(cameras)], count, max_conf, boxes, wall_time=wall_time)
+            durations.append(time.perf_counter() - start)
+            if i % args.burst == args.burst - 1:
+                time.sleep(args.pause_ms / 1000)  # 推理之间的间隔，写入线程在这时运行
+        writer.close()
+        write_elapsed = time.perf_counter() - write_start
+
+        # 对照：每个事件向管道 print 一行文本
+        sink = subprocess.Popen(["cat"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+        pipe = open(sink.stdin.fileno(), "w", closefd=False)
+        print_durations = []
+        for i in range(min(args.events, args.print_events)):
+            count, max_conf, _ = samples[i % len(samples)]
+            start = time.perf_counter()
+            print(f"摄像头 {cameras[i % len(cameras)]} 检测到人！（{count}人，最高置信度 {max_conf:.2f}）", file=pipe, flush=True)
+            print_durations.append(time.perf_counter() - start)
+        pipe.close()
+        sink.stdin.close()
+        sink.wait()
+
+        reader = DetectionLogReader(workdir)
+        files = log_files(workdir)
+        stored = sum((os.path.getsize(path) - 64) // 192 for path in files)
+        query_times = []
+        for _ in range(args.query_repeat):
+            start = time.perf_counter()
+            events = reader.query(camera="cam2", since=now - 3600, persons_only=True)
+            query_times.append(time.perf_counter() - start)
+
+    def micros(values):
+        return {"mean_us": 1e6 * sum(values) / len(values), "p50_us": 1e6 * percentile(values, 50),
+                "p99_us": 1e6 * percentile(values, 99), "max_us": 1e6 * max(values)}
+
+    return {
+        "events": args.events,
+        "log_call": micros(durations),
+        "print_line_to_pipe": micros(print_durations),
+        "writer": dict(writer.stats(), events_per_s=writer.written / write_elapsed),
+        "files": len(files),
+        "stored_records": stored,
+        "query_last_hour_cam2_persons": {"matched": len(events), "scanned": stored,
+                                         "best_ms": 1000 * min(query_times),
+                                         "records_per_s": stored / min(query_times)},
+    }
+
+
+def clip_round(source, recorder_enabled, args, output, workdir):
+    """采集线程 + 检测循环（letterbox、输入张量、解码，后端返回固定原始输出）全速跑 args.duration 秒，
+    每 args.trigger_interval 秒触发一次片段录制；返回检测帧率、采集帧率、CPU占用、录制统计和录制内存峰值
+
+    检测循环比摄像头快时帧率受摄像头限制，录制的开销主要体现在CPU占用上。"""
+    recorder = None
+    if recorder_enabled:
+        recorder = ClipRecorder("bench", workdir, pre_seconds=args.pre_seconds, post_seconds=args.post_seconds,
+                                fps=args.clip_fps, max_bytes=int(args.max_mb * 1024 * 1024), quality=args.quality)
+        recorder.start()
+    if source == "mjpeg":
+        scale = decode_scale(args.width, args.height, args.imgsz)
+        grabber = LatestFrameGrabber(lambda: MjpegFileCamera(os.path.join(workdir, "stream.mjpeg"), fps=args.fps),
+                                     name="clips", decode=lambda data: decode_jpeg(data, scale),
+                                     on_capture=recorder.push if recorder is not None else None)
+    else:
+        grabber = LatestFrameGrabber(lambda: SyntheticCamera(args.width, args.height, fps=args.fps), name="clips",
+                                     pool=FramePool(4), on_capture=recorder.push if recorder is not None else None)
+    model = RawPersonModel(StaticOutputBackend(output), args.imgsz)
+    if not grabber.start():
+        raise SystemExit("无法启动视频源")
+    seq = frames = 0
+    peak_bytes = 0
+    start = time.monotonic()
+    cpu_start = time.process_time()
+    next_trigger = start + args.trigger_interval
+    next_sample = start
+    while time.monotonic() - start < args.duration:
+        frame, _, seq = grabber.latest(newer_than=seq, timeout=1.0)
+        if frame is None:
+            continue
+        person_presence(model.predict(frame)[0])
+        grabber.release(frame)
+        frames += 1
+        now = time.monotonic()
+        if recorder is not None:
+            if now >= next_trigger:
+                recorder.trigger("person")
+                next_trigger += args.trigger_interval
+            if now >= next_sample:
+                stats = recorder.stats()
+                peak_bytes = max(peak_bytes, stats["buffered_bytes"] + stats["writing_bytes"])
+                next_sample = now + 0.1
+    elapsed = time.monotonic() - start
+    cpu = time.process_time() - cpu_start
+    captured = grabber.stats()["captured"]
+    grabber.stop()
+    result = {"detection_fps": frames / elapsed, "capture_fps": captured / elapsed, "cpu_percent": 100 * cpu / elapsed}
+    if recorder is not None:
+        recorder.close()
+        result["recorder"] = recorder.stats()
+        result["peak_memory_bytes"] = peak_bytes
+    return result
+
+
+def bench_clips(args):
+    """触发前后的片段录制：JPEG编码耗时和每帧大小、预录所需内存，
+    以及录制对检测帧率的影响（合成原始帧需要编码，MJPEG 采集直接保存摄像头的JPEG数据）"""
+    frames, _ = recorded_frames(args.video, args.max_frames)
+    frames = [cv2.resize(frame, (args.width, args.height)) for frame in frames]
+    params = [cv2.IMWRITE_JPEG_QUALITY, args.quality]
+    encode_times, jpegs = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        jpegs.append(cv2.imencode(".jpg", frame, params)[1])
+        encode_times.append(time.perf_counter() - start)
+    frame_bytes = sum(jpeg.size for jpeg in jpegs) / len(jpegs)
+
+    output = synthetic_raw_outputs(1, args.people)[0]
+    rounds = {}
+    with tempfile.TemporaryDirectory(prefix="bench_clips_") as workdir:
+        with open(os.path.join(workdir, "stream.mjpeg"), "wb") as f:
+            for jpeg in jpegs:
+                f.write(jpeg.tobytes())
+        for source in ("raw", "mjpeg"):
+            for enabled in (False, True):
+                name = f"{source}_{'recording' if enabled else 'off'}"
+                print(f"运行 {name}", file=sys.stderr)
+                rounds[name] = clip_round(source, enabled, args, output, workdir)
+
+    return {
+        "frame_size": [args.width, args.height],
+        "quality": args.quality,
+        "encode_ms": {"mean": 1000 * sum(encode_times) / len(encode_times), "p50": 1000 * percentile(encode_times, 50),
+                      "p99": 1000 * percentile(encode_times, 99)},
+        "jpeg_bytes_per_frame": frame_bytes,
+        "raw_bytes_per_frame": args.width * args.height * 3,
+        # 预录 pre_seconds 秒、片段最长 30 秒（默认）时内存中的帧
+        "pre_roll_bytes": frame_bytes * args.clip_fps * args.pre_seconds,
+        "max_clip_bytes": frame_bytes * args.clip_fps * 30,
+        "encode_cpu_share": sum(encode_times) / len(encode_times) * args.clip_fps,
+        "rounds": rounds,
+    }
+
+
+class TimeoutRound:
+    """一轮无人超时测试：各摄像头按帧率刷新“检测到人”，在随机时刻之后不再有人，记录超时判定的时间和次数
+
+    legacy=True 按原实现判定：检测循环每帧检查超时，另有线程每秒轮询一次，
+    是否发送无人检测信号由逐个摄像头检查其他摄像头的状态决定；
+    legacy=False 由 DeadlineScheduler 在截止时间触发，无人判断使用 PresenceAggregator。
+    """
+
+    def __init__(self, round_id, camera_ids, timeout, fps, spread, legacy, scheduler=None):
+        self.round_id = round_id
+        self.camera_ids = camera_ids
+        self.timeout = timeout
+        self.fps = fps
+        self.legacy = legacy
+        self.scheduler = scheduler
+        self.locks = {c: threading.Lock() for c in camera_ids}
+        self.status = {c: {"running": True, "last_detection_time": time.time()} for c in camera_ids}
+        now = time.monotonic()
+        self.person_until = {c: now + random.uniform(0, spread) for c in camera_ids}
+        self.expected = {c: now + timeout for c in camera_ids}  # 最后一次检测到人 + timeout
+        self.presence = PresenceAggregator()
+        self.reports = []  # (摄像头, 迟到秒数)
+        self.nono = 0
+        self._report_lock = threading.Lock()
+        if not legacy:
+            # 对应 begin_detection：触发时登记截止时间
+            for camera_id in camera_ids:
+                self.presence.enter(camera_id)
+                scheduler.schedule((round_id, camera_id), now + timeout)
+
+    def report(self, camera_id):
+        """超时判定，对应 report_person_timeout"""
+        lateness = time.monotonic() - self.expected[camera_id]
+        if self.legacy:
+            others_detecting = False
+            for other in self.camera_ids:
+                if other == camera_id:
+                    continue
+                with self.locks[other]:
+                    status = self.status[other]
+                    if status["running"] and time.time() - status["last_detection_time"] <= self.timeout:
+                        others_detecting = True
+                        break
+            send = not others_detecting
+        else:
+            send = self.presence.leave(camera_id) == 0
+        with self._report_lock:
+            self.reports.append((camera_id, lateness))
+            self.nono += send
+
+    def expire(self, key):
+        """调度器回调，对应 expire_detection"""
+        camera_id = key[1]
+        with self.locks[camera_id]:
+            if not self.status[camera_id]["running"]:
+                return
+            self.status[camera_id]["running"] = False
+        self.report(camera_id)
+
+    def frame_loop(self, camera_id):
+        """模拟检测循环"""
+        status = self.status[camera_id]
+        interval = 1.0 / self.fps
+        while True:
+            frame_start = time.monotonic()
+            if frame_start < self.person_until[camera_id]:
+                with self.locks[camera_id]:
+                    status["last_detection_time"] = time.time()
+                self.expected[camera_id] = frame_start + self.timeout
+                if not self.legacy:
+                    self.presence.enter(camera_id)
+                    self.scheduler.schedule((self.round_id, camera_id), frame_start + self.timeout)
+            elif self.legacy and time.time() - status["last_detection_time"] > self.timeout:
+                # 原实现的逐帧检查：不持锁读取检测时间，判定后再加锁停止
+                self.report(camera_id)
+                with self.locks[camera_id]:
+                    status["running"] = False
+            with self.locks[camera_id]:
+                if not status["running"]:
+                    return
+            time.sleep(max(0.0, interval - (time.monotonic() - frame_start)))
+
+    def poll_loop(self, done):
+        """原实现的 check_yolo_timeout：每秒轮询一次"""
+        while not done.wait(1.0):
+            for camera_id in self.camera_ids:
+                with self.locks[camera_id]:
+                    status = self.status[camera_id]
+                    if status["running"] and time.time() - status["last_detection_time"] > self.timeout:
+                        self.report(camera_id)
+                        status["running"] = False
+
+    def run(self):
+        done = threading.Event()
+        threads = [threading.Thread(target=self.frame_loop, args=(c,), daemon=True) for c in self.camera_ids]
+        if self.legacy:
+            threads.append(threading.Thread(target=self.poll_loop, args=(done,), daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads[:len(self.camera_ids)]:
+            thread.join()
+        time.sleep(1.5)  # 留出时间捕获重复的超时判定
+        done.set()
+
+
+def bench_timeouts(args):
+    """无人超时判定：原实现（逐帧检查 + 每秒轮询）vs 截止时间调度器，在持有GIL的后台负载下
+    统计超时判定相对截止时间的迟到、重复判定次数和无人检测信号次数（每轮应恰好一次）"""
+    camera_ids = [f"cam{i + 1}" for i in range(args.cameras)]
+    iterations = calibrate_python_work(5)
+    stop = threading.Event()
+
+    def load_loop():
+        while not stop.is_set():
+            python_work(iterations)
+
+    for _ in range(args.load_threads):
+        threading.Thread(target=load_loop, daemon=True).start()
+
+    current = {}
+    scheduler = DeadlineScheduler(lambda key: current[key[0]].expire(key))
+    threading.Thread(target=scheduler.run, daemon=True).start()
+
+    report = {}
+    for name, legacy in (("legacy", True), ("scheduler", False)):
+        lateness = []
+        duplicates = missing = nono = 0
+        for round_id in range(args.rounds):
+            timeout_round = TimeoutRound((name, round_id), camera_ids, args.timeout, args.fps, args.spread,
+                                         legacy, scheduler)
+            current[(name, round_id)] = timeout_round
+            timeout_round.run()
+            reported = [camera_id for camera_id, _ in timeout_round.reports]
+            duplicates += len(reported) - len(set(reported))
+            missing += len(set(camera_ids) - set(reported))
+            nono += timeout_round.nono
+            lateness += [late for _, late in timeout_round.reports]
+            print(f"{name} 第 {round_id + 1} 轮：{len(reported)} 次超时判定，{timeout_round.nono} 次无人检测信号",
+                  file=sys.stderr)
+        report[name] = {
+            "rounds": args.rounds,
+            "lateness": summarize_latency(lateness),
+            "max_lateness_ms": 1000 * max(lateness, default=0.0),
+            "duplicate_timeouts": duplicates,
+            "missing_timeouts": missing,
+            "nono_sent": nono,
+            "duplicate_nono": max(0, nono - args.rounds),
+        }
+    stop.set()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO FIFO 检测系统性能基准测试")
+    parser.add_argument("--model", default="stub", help="模型路径，stub 表示使用桩模型")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    engine_parser = subparsers.add_parser("engine", help="共享推理引擎 vs 每摄像头独立模型")
+    engine_parser.add_argument("--cameras", type=int, default=2)
+    engine_parser.add_argument("--duration", type=float, default=5.0)
+    engine_parser.add_argument("--max-batch", type=int, default=2)
+    engine_parser.add_argument("--max-wait", type=float, default=0.02)
+    engine_parser.set_defaults(func=bench_engine)
+
+    standby_parser = subparsers.add_parser("standby", help="冷启动 vs 热备的触发到首次推理延迟")
+    standby_parser.add_argument("--source", default="synthetic", help="视频源，如 /dev/video1")
+    standby_parser.add_argument("--trials", type=int, default=10)
+    standby_parser.add_argument("--idle", type=float, default=1.0, help="两次触发间的空闲时间（秒）")
+    standby_parser.add_argument("--standby-fps", type=float, default=2)
+    standby_parser.add_argument("--flush-frames", type=int, default=4)
+    standby_parser.set_defaults(func=bench_standby)
+
+    publish_parser = subparsers.add_parser("publish", help="轮询 vs 事件驱动的检测到FIFO写入延迟")
+    publish_parser.add_argument("--trials", type=int, default=10)
+    publish_parser.set_defaults(func=bench_publish)
+
+    commands_parser = subparsers.add_parser("commands", help="命令FIFO压力测试")
+    commands_parser.add_argument("--count", type=int, default=20000)
+    commands_parser.add_argument("--rate", type=float, default=5000, help="每秒写入命令数")
+    commands_parser.set_defaults(func=bench_commands)
+
+    triggers_parser = subparsers.add_parser("triggers", help="雷达触发风暴下的命令处理耗时")
+    triggers_parser.add_argument("--rate", type=float, default=1000, help="每秒命令数")
+    triggers_parser.add_argument("--duration", type=float, default=5.0)
+    triggers_parser.add_argument("--frame-time", type=float, default=0.033, help="模拟每帧检测耗时（秒）")
+    triggers_parser.set_defaults(func=bench_triggers)
+
+    modes_parser = subparsers.add_parser("modes", help="presence 模式 vs track 模式的单帧延迟")
+    modes_parser.add_argument("--frames", type=int, default=200)
+    modes_parser.set_defaults(func=bench_modes)
+
+    postprocess_parser = subparsers.add_parser("postprocess", help="原始输出的向量化人员后处理：精度比对和每帧耗时")
+    postprocess_parser.add_argument("--frames", type=int, default=200)
+    postprocess_parser.add_argument("--people", type=int, default=3, help="每帧合成的人数")
+    postprocess_parser.add_argument("--conf", type=float, default=0.25)
+    postprocess_parser.add_argument("--iou", type=float, default=0.7)
+    postprocess_parser.add_argument("--repeat", type=int, default=3, help="重复计时次数，取最后一次")
+    postprocess_parser.set_defaults(func=bench_postprocess)
+
+    allocations_parser = subparsers.add_parser("allocations", help="采集到输入张量的逐帧内存分配：缓冲池 vs 逐帧新分配")
+    allocations_parser.add_argument("--frames", type=int, default=300)
+    allocations_parser.add_argument("--warmup", type=int, default=30)
+    allocations_parser.add_argument("--fps", type=float, default=100, help="合成视频源帧率")
+    allocations_parser.add_argument("--width", type=int, default=640)
+    allocations_parser.add_argument("--height", type=int, default=480)
+    allocations_parser.add_argument("--imgsz", type=int, default=640)
+    allocations_parser.add_argument("--pool-size", type=int, default=4)
+    allocations_parser.add_argument("--people", type=int, default=3, help="固定原始输出中合成的人数")
+    allocations_parser.set_defaults(func=bench_allocations)
+
+    motion_parser = subparsers.add_parser("motion", help="录制素材上的运动门限评估")
+    motion_parser.add_argument("--video", default="synthetic", help="录制素材路径，synthetic 为合成素材")
+    motion_parser.add_argument("--max-frames", type=int, default=600)
+    motion_parser.add_argument("--pixel-threshold", type=int, default=25)
+    motion_parser.add_argument("--area-threshold", type=float, default=0.002)
+    motion_parser.add_argument("--force-interval", type=float, default=1.0)
+    motion_parser.add_argument("--verify", action="store_true", help="对跳过的帧也推理，统计沿用结果的不一致率")
+    motion_parser.set_defaults(func=bench_motion)
+
+    mjpeg_parser = subparsers.add_parser("mjpeg", help="MJPEG 与 YUYV 采集的解码耗时和USB带宽")
+    mjpeg_parser.add_argument("--video", default="synthetic",
+                              help="录制的 MJPEG 流（.mjpeg）或其他素材（逐帧编码为JPEG），synthetic 为合成素材")
+    mjpeg_parser.add_argument("--max-frames", type=int, default=300)
+    mjpeg_parser.add_argument("--width", type=int, default=640, help="非 MJPEG 素材编码前缩放到的宽度")
+    mjpeg_parser.add_argument("--height", type=int, default=480)
+    mjpeg_parser.add_argument("--quality", type=int, default=80, help="非 MJPEG 素材的JPEG编码质量")
+    mjpeg_parser.add_argument("--fps", type=int, default=30, help="摄像头帧率")
+    mjpeg_parser.add_argument("--cameras", type=int, default=2, help="共用USB控制器的摄像头数量")
+    mjpeg_parser.add_argument("--imgsz", type=int, default=640, help="模型输入尺寸，决定缩小解码倍数")
+    mjpeg_parser.add_argument("--inference-fps", type=float, default=2.0, help="按需解码测试中检测循环的取帧频率")
+    mjpeg_parser.add_argument("--duration", type=float, default=5.0)
+    mjpeg_parser.add_argument("--device", help="真实摄像头设备（如 /dev/video1），分别以 YUYV 和 MJPG 打开测量帧率")
+    mjpeg_parser.add_argument("--probe-duration", type=float, default=5.0)
+    mjpeg_parser.set_defaults(func=bench_mjpeg)
+
+    rtsp_parser = subparsers.add_parser("rtsp", help="RTSP接收：按顺序读 vs 只保留最新帧的帧龄，固定间隔 vs 指数退避重连")
+    rtsp_parser.add_argument("--video", default=None, help="用 ffmpeg 循环解码的本地视频代替RTSP流，缺省为合成原始帧管道")
+    rtsp_parser.add_argument("--width", type=int, default=640)
+    rtsp_parser.add_argument("--height", type=int, default=480)
+    rtsp_parser.add_argument("--fps", type=float, default=25, help="摄像头帧率")
+    rtsp_parser.add_argument("--inference-fps", type=float, default=10, help="检测循环取帧的频率")
+    rtsp_parser.add_argument("--duration", type=float, default=10.0)
+    rtsp_parser.add_argument("--read-timeout", type=float, default=2.0)
+    rtsp_parser.add_argument("--drop-after", type=float, default=1.0, help="重连测试中流播放多少秒后断开")
+    rtsp_parser.add_argument("--outage", type=float, default=10.0, help="摄像头离线秒数，0 为跳过重连测试")
+    rtsp_parser.add_argument("--fixed-delay", type=float, default=0.05, help="固定重连间隔（原实现失败后立即重连）")
+    rtsp_parser.add_argument("--reconnect-delay", type=float, default=0.5)
+    rtsp_parser.add_argument("--max-reconnect-delay", type=float, default=4.0)
+    rtsp_parser.set_defaults(func=bench_rtsp)
+
+    roi_parser = subparsers.add_parser("roi", help="雷达引导区域推理 vs 全画面推理的单帧耗时")
+    roi_parser.add_argument("--frames", type=int, default=200)
+    roi_parser.add_argument("--az", type=float, default=0.0, help="雷达方位角（度）")
+    roi_parser.add_argument("--roi-width", type=int, default=320)
+    roi_parser.add_argument("--imgsz", type=int, default=640, help="全画面推理输入尺寸")
+    roi_parser.add_argument("--roi-imgsz", type=int, default=480, help="区域推理输入尺寸")
+    roi_parser.set_defaults(func=bench_roi)
+
+    cascade_parser = subparsers.add_parser("cascade", help="录制素材上的分辨率级联 vs 全分辨率推理评估")
+    cascade_parser.add_argument("--video", nargs="+", default=["synthetic"],
+                                help="录制素材路径（可多个），synthetic 为合成素材")
+    cascade_parser.add_argument("--max-frames", type=int, default=600)
+    cascade_parser.add_argument("--imgsz", type=int, default=640, help="全分辨率推理输入尺寸")
+    cascade_parser.add_argument("--screen-imgsz", type=int, default=320, help="粗筛输入尺寸")
+    cascade_parser.add_argument("--screen-conf", type=float, default=0.1, help="粗筛置信度阈值")
+    cascade_parser.add_argument("--confirm-conf", type=float, default=0.25, help="复核置信度阈值")
+    cascade_parser.set_defaults(func=bench_cascade)
+
+    ring_parser = subparsers.add_parser("ring", help="共享内存帧环的多读者吞吐测试")
+    ring_parser.add_argument("--readers", type=int, default=4)
+    ring_parser.add_argument("--duration", type=float, default=5.0)
+    ring_parser.add_argument("--fps", type=float, default=30, help="写者发布帧率，0 为不限速")
+    ring_parser.add_argument("--slots", type=int, default=4)
+    ring_parser.add_argument("--copy", action="store_true", help="读者拷贝帧而不是零拷贝读取")
+    ring_parser.set_defaults(func=bench_ring)
+
+    processes_parser = subparsers.add_parser("processes", help="线程模式 vs 每摄像头一个进程的总帧率")
+    processes_parser.add_argument("--cameras", type=int, nargs="+", default=[2, 4], help="摄像头数量（可多个）")
+    processes_parser.add_argument("--duration", type=float, default=10.0)
+    processes_parser.add_argument("--fps", type=int, default=30, help="合成摄像头帧率")
+    processes_parser.add_argument("--postprocess-ms", type=float, default=10.0,
+                                  help="每帧持有GIL的Python后处理耗时（单线程毫秒数）")
+    processes_parser.set_defaults(func=bench_processes)
+
+    e2e_parser = subparsers.add_parser("e2e", help="端到端：模拟雷达端驱动 yolo_fifo_2cam.py，测量各阶段延迟、帧率和CPU")
+    e2e_parser.add_argument("--trials", type=int, default=4, help="测量轮数（各摄像头轮流）")
+    e2e_parser.add_argument("--cameras", type=int, default=2)
+    e2e_parser.add_argument("--process-mode", action="store_true", help="以多进程模式运行被测程序")
+    e2e_parser.add_argument("--settle", type=float, default=1.0, help="触发后等待多少秒再让人进入画面")
+    e2e_parser.add_argument("--step-timeout", type=float, default=15.0, help="每一步等待回复的最长秒数")
+    e2e_parser.add_argument("--startup-timeout", type=float, default=60.0)
+    e2e_parser.set_defaults(func=bench_e2e)
+
+    startup_parser = subparsers.add_parser("startup", help="启动耗时：命令FIFO就绪、加载期间的触发命令排队到首次检测")
+    startup_parser.add_argument("--load-delay", type=float, default=3.0, help="桩模型的加载耗时（秒）")
+    startup_parser.add_argument("--init-latency", type=float, default=0.5, help="桩模型第一次推理的额外耗时（秒）")
+    startup_parser.add_argument("--trials", type=int, default=3)
+    startup_parser.add_argument("--step-timeout", type=float, default=20.0)
+    startup_parser.set_defaults(func=bench_startup)
+
+    scaling_parser = subparsers.add_parser("scaling", help="多摄像头扩展：同时触发 N 个合成摄像头")
+    scaling_parser.add_argument("--cameras", type=int, nargs="+", default=[2, 4, 8], help="摄像头数量（可多个）")
+    scaling_parser.add_argument("--duration", type=float, default=5.0, help="所有摄像头检测到人后持续多少秒")
+    scaling_parser.add_argument("--process-mode", action="store_true", help="以多进程模式运行被测程序")
+    scaling_parser.add_argument("--settle", type=float, default=1.0)
+    scaling_parser.add_argument("--step-timeout", type=float, default=20.0)
+    scaling_parser.add_argument("--startup-timeout", type=float, default=60.0)
+    scaling_parser.set_defaults(func=bench_scaling)
+
+    timeouts_parser = subparsers.add_parser("timeouts", help="无人超时判定的精度和重复信号")
+    timeouts_parser.add_argument("--cameras", type=int, default=4)
+    timeouts_parser.add_argument("--rounds", type=int, default=5)
+    timeouts_parser.add_argument("--timeout", type=float, default=1.0, help="无人超时（秒）")
+    timeouts_parser.add_argument("--fps", type=float, default=2.0, help="检测循环帧率（确认有人后的保活帧率）")
+    timeouts_parser.add_argument("--spread", type=float, default=0.2, help="各摄像头的人在多少秒内先后离开")
+    timeouts_parser.add_argument("--load-threads", type=int, default=2, help="持有GIL的后台负载线程数")
+    timeouts_parser.set_defaults(func=bench_timeouts)
+
+    eventlog_parser = subparsers.add_parser("eventlog", help="检测事件日志：热路径开销、写入吞吐和内存映射查询")
+    eventlog_parser.add_argument("--events", type=int, default=200000)
+    eventlog_parser.add_argument("--cameras", type=int, default=2)
+    eventlog_parser.add_argument("--burst", type=int, default=256, help="每记录多少个事件暂停一次")
+    eventlog_parser.add_argument("--pause-ms", type=float, default=2.0, help="每次暂停的毫秒数")
+    eventlog_parser.add_argument("--span-hours", type=float, default=24.0, help="事件时间分布在最近多少小时内")
+    eventlog_parser.add_argument("--max-mb", type=float, default=8, help="单个日志文件的大小上限（MB）")
+    eventlog_parser.add_argument("--max-files", type=int, default=16)
+    eventlog_parser.add_argument("--max-queue", type=int, default=4096)
+    eventlog_parser.add_argument("--print-events", type=int, default=20000, help="对照组 print 的事件数")
+    eventlog_parser.add_argument("--query-repeat", type=int, default=5)
+    eventlog_parser.set_defaults(func=bench_eventlog)
+
+    clips_parser = subparsers.add_parser("clips", help="触发前后片段录制：编码耗时、内存占用和对检测帧率的影响")
+    clips_parser.add_argument("--video", default="synthetic", help="录制素材路径，synthetic 为合成素材")
+    clips_parser.add_argument("--max-frames", type=int, default=150)
+    clips_parser.add_argument("--width", type=int, default=640)
+    clips_parser.add_argument("--height", type=int, default=480)
+    clips_parser.add_argument("--fps", type=int, default=30, help="摄像头帧率")
+    clips_parser.add_argument("--imgsz", type=int, default=640)
+    clips_parser.add_argument("--people", type=int, default=3)
+    clips_parser.add_argument("--quality", type=int, default=80)
+    clips_parser.add_argument("--clip-fps", type=int, default=10)
+    clips_parser.add_argument("--pre-seconds", type=float, default=5.0)
+    clips_parser.add_argument("--post-seconds", type=float, default=5.0)
+    clips_parser.add_argument("--max-mb", type=float, default=16)
+    clips_parser.add_argument("--duration", type=float, default=10.0, help="每轮秒数")
+    clips_parser.add_argument("--trigger-interval", type=float, default=3.0, help="每隔多少秒触发一次录制")
+    clips_parser.set_defaults(func=bench_clips)
+
+    metrics_parser = subparsers.add_parser("metrics", help="分阶段计时指标的开销")
+    metrics_parser.add_argument("--iterations", type=int, default=200000)
+    metrics_parser.set_defaults(func=bench_metrics)
+
+    args = parser.parse_args()
+    # 被测模块的日志转到 stderr，stdout 只输出 JSON 结果
+    with contextlib.redirect_stdout(sys.stderr):
+        result = args.func(args)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
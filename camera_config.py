@@ -0,0 +1,35 @@
+import json
+import os
+import re
+
+# 摄像头编号：cam 加数字，对应命令 leida_camN / stop_camN
+CAMERA_ID_PATTERN = re.compile(r"^cam\d+$")
+
+# 没有配置文件时使用的默认摄像头
+DEFAULT_CAMERAS = {
+    "cam1": {"source": "/dev/video1"},
+    "cam2": {"source": "/dev/video3"}
+}
+
+
+def load_camera_config(path):
+    """读取摄像头配置文件（JSON），返回 {摄像头编号: 配置}，按编号中的数字排序
+
+    每个摄像头至少要有 source；calibration（雷达区域标定）和 frame_ring（共享内存帧环名称）可选。
+    文件不存在时使用 DEFAULT_CAMERAS，格式错误时抛出 ValueError。
+    """
+    if not os.path.exists(path):
+        print(f"摄像头配置文件 {path} 不存在，使用默认的 cam1/cam2")
+        return {cam_id: dict(settings) for cam_id, settings in DEFAULT_CAMERAS.items()}
+
+    with open(path) as f:
+        config = json.load(f)
+    cameras = config.get("cameras")
+    if not isinstance(cameras, dict) or not cameras:
+        raise ValueError(f"{path} 中没有 cameras 配置")
+    for cam_id, settings in cameras.items():
+        if not CAMERA_ID_PATTERN.match(cam_id):
+            raise ValueError(f"{path} 中的摄像头编号 {cam_id} 不是 camN 格式")
+        if not isinstance(settings, dict) or not settings.get("source"):
+            raise ValueError(f"{path} 中摄像头 {cam_id} 缺少 source")
+    return dict(sorted(cameras.items(), key=lambda item: int(item[0][3:])))
@@ -0,0 +1,100 @@
+import multiprocessing
+import threading
+import time
+from multiprocessing.connection import wait
+
+
+class CameraProcess:
+    """在独立进程中运行一个摄像头的采集和推理循环
+
+    协调者通过双向管道下发控制消息，摄像头进程通过同一管道回报紧凑的检测事件；
+    进程退出后由 supervise() 按 restart_delay 自动重启。
+    target(camera_id, conn, *args) 为进程入口，conn.recv() 读到 EOFError 表示协调者已退出。
+    """
+
+    def __init__(self, camera_id, target, args=(), restart_delay=1.0):
+        self.camera_id = camera_id
+        self.target = target
+        self.args = args
+        self.restart_delay = restart_delay
+        # spawn 启动：协调者已有多个线程在运行，fork 可能继承被锁住的锁
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()  # 命令读取线程和监控线程都会发送消息
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        self.died_at = None  # 发现进程退出的 time.monotonic()
+
+    def start(self):
+        """启动摄像头进程"""
+        with self._lock:
+            parent_conn, child_conn = self._context.Pipe()
+            self.process = self._context.Process(target=self.target, args=(self.camera_id, child_conn) + self.args,
+                                                 name=f"camera-{self.camera_id}")
+            self.process.daemon = True
+            self.process.start()
+            child_conn.close()
+            self.conn = parent_conn
+            self.died_at = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def send(self, message):
+        """向摄像头进程发送控制消息，进程不在运行时返回 False"""
+        with self._lock:
+            if self.conn is None:
+                return False
+            try:
+                self.conn.send(message)
+                return True
+            except (BrokenPipeError, ConnectionResetError, OSError):
+                return False
+
+    def stop(self):
+        """关闭管道并结束摄像头进程"""
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+        if self.process is not None:
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
+
+
+def supervise(processes, handle_event, on_restart=None, poll_interval=0.5):
+    """协调者循环：接收各摄像头进程的事件交给 handle_event(event)，
+    发现进程退出后等待 restart_delay 再重启，并调用 on_restart(camera_id)"""
+    while True:
+        connections = {p.conn: p for p in processes.values() if p.conn is not None}
+        for conn in wait(list(connections), timeout=poll_interval):
+            try:
+                event = conn.recv()
+            except (EOFError, OSError):
+                # 进程已退出，关闭管道，由下面的存活检查负责重启
+                camera_process = connections[conn]
+                with camera_process._lock:
+                    camera_process.conn = None
+                conn.close()
+                continue
+            try:
+                handle_event(event)
+            except Exception as e:
+                print(f"处理摄像头事件 {event} 时发生错误: {e}")
+
+        now = time.monotonic()
+        for camera_id, camera_process in processes.items():
+            if camera_process.is_alive():
+                continue
+            if camera_process.died_at is None:
+                camera_process.died_at = now
+                print(f"摄像头 {camera_id} 进程已退出（退出码 {camera_process.process.exitcode}），"
+                      f"{camera_process.restart_delay} 秒后重启")
+            elif now - camera_process.died_at >= camera_process.restart_delay:
+                camera_process.stop()
+                camera_process.start()
+                camera_process.restarts += 1
+                print(f"摄像头 {camera_id} 进程已重启（第 {camera_process.restarts} 次）")
+                if on_restart is not None:
+                    on_restart(camera_id)
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+
+# 工作线程状态
+IDLE = "IDLE"  # 摄像头关闭（或热备），等待雷达触发
+SEARCHING = "SEARCHING"  # 已触发，全速搜索人员
+CONFIRMED = "CONFIRMED"  # 已确认有人，持续检测直到超时
+COOLDOWN = "COOLDOWN"  # 检测已停止，摄像头暂时保持打开，期间再次触发无需重新打开
+
+# 控制消息
+START = "start"
+STOP = "stop"
+TIMEOUT = "timeout"  # 无人超时，由超时调度器投递
+
+
+class CameraWorker:
+    """每个摄像头一个常驻工作线程，用显式状态机响应启动/停止消息
+
+    再次触发只是一次状态转换，不再创建和 join 线程。具体工作由回调完成：
+    - start_fn(camera_id, trigger_time) -> bool：进入检测（打开视频流等），失败返回 False
+    - step_fn(camera_id, confirmed) -> (person_found, delay, keep_running)：执行一帧检测
+    - stop_fn(camera_id)：离开检测状态
+    - release_fn(camera_id)：冷却结束，释放摄像头
+    """
+
+    def __init__(self, camera_id, start_fn, step_fn, stop_fn, release_fn, cooldown=2.0):
+        self.camera_id = camera_id
+        self.start_fn = start_fn
+        self.step_fn = step_fn
+        self.stop_fn = stop_fn
+        self.release_fn = release_fn
+        self.cooldown = cooldown
+        self.state = IDLE
+        self._messages = queue.Queue()
+        self._next_step = 0.0  # 下一帧检测的 time.monotonic()
+        self._cooldown_end = 0.0
+        self._thread = None
+        self.commands_handled = 0
+        self.transitions = 0
+
+    def start(self):
+        """启动工作线程"""
+        self._thread = threading.Thread(target=self._run, name=f"worker-{self.camera_id}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def post(self, command, timestamp=None):
+        """投递控制消息，立即返回"""
+        self._messages.put((command, time.monotonic() if timestamp is None else timestamp))
+
+    def _transition(self, state):
+        print(f"摄像头 {self.camera_id} 状态: {self.state} -> {state}")
+        self.state = state
+        self.transitions += 1
+
+    def _enter_cooldown(self):
+        self.stop_fn(self.camera_id)
+        self._cooldown_end = time.monotonic() + self.cooldown
+        self._transition(COOLDOWN)
+
+    def _handle(self, command, timestamp):
+        self.commands_handled += 1
+        if command == START:
+            if self.state in (SEARCHING, CONFIRMED):
+                print(f"摄像头{self.camera_id}的YOLO识别已在运行中")
+                return
+            if not self.start_fn(self.camera_id, timestamp):
+                print(f"无法初始化摄像头 {self.camera_id}，YOLO识别终止")
+                self.release_fn(self.camera_id)
+                self._transition(IDLE)
+                return
+            self._next_step = time.monotonic()
+            self._transition(SEARCHING)
+        elif command == STOP:
+            if self.state in (SEARCHING, CONFIRMED):
+                print(f"手动停止摄像头{self.camera_id}的YOLO识别")
+                self._enter_cooldown()
+        elif command == TIMEOUT:
+            if self.state in (SEARCHING, CONFIRMED):
+                print(f"摄像头{self.camera_id}无人超时，停止YOLO识别")
+                self._enter_cooldown()
+
+    def _timeout(self):
+        """距离下一次需要做的事（检测一帧或冷却结束）的秒数，None 表示无限等待"""
+        if self.state in (SEARCHING, CONFIRMED):
+            return max(0.0, self._next_step - time.monotonic())
+        if self.state == COOLDOWN:
+            return max(0.0, self._cooldown_end - time.monotonic())
+        return None
+
+    def _run(self):
+        while True:
+            # 等待控制消息，最多等到下一帧检测或冷却结束；收到消息后把积压的消息一并处理
+            try:
+                self._handle(*self._messages.get(timeout=self._timeout()))
+                while True:
+                    self._handle(*self._messages.get_nowait())
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            if self.state == COOLDOWN and now >= self._cooldown_end:
+                self.release_fn(self.camera_id)
+                self._transition(IDLE)
+            elif self.state in (SEARCHING, CONFIRMED) and now >= self._next_step:
+                person_found, delay, keep_running = self.step_fn(self.camera_id, self.state == CONFIRMED)
+                if not keep_running:
+                    self._enter_cooldown()
+                    continue
+                if person_found and self.state == SEARCHING:
+                    self._transition(CONFIRMED)
+                self._next_step = time.monotonic() + delay
@@ -0,0 +1,43 @@
+from inference_engine import person_presence
+
+
+class ResolutionCascade:
+    """两级分辨率级联：先以小输入尺寸、低置信度阈值粗筛每一帧，
+    只有粗筛发现候选人员的帧才以全分辨率、正常阈值复核。
+
+    大部分无人帧只付出小尺寸推理的开销；有人时多付出一次粗筛的开销。
+    """
+
+    def __init__(self, screen_imgsz=320, screen_conf=0.1, confirm_conf=0.25):
+        self.screen_imgsz = screen_imgsz
+        self.screen_conf = screen_conf
+        self.confirm_conf = confirm_conf
+        self.frames = 0
+        self.screened_out = 0  # 粗筛未发现候选、直接判定无人的帧数
+        self.confirmed = 0  # 复核确认有人的帧数
+        self.rejected = 0  # 粗筛有候选但复核未确认的帧数
+
+    def detect(self, infer, frame, confirm_imgsz=None):
+        """infer(frame, imgsz, conf) 执行一次推理；返回最终采用的单帧结果"""
+        self.frames += 1
+        result = infer(frame, self.screen_imgsz, self.screen_conf)
+        if not person_presence(result)[0]:
+            self.screened_out += 1
+            return result
+
+        result = infer(frame, confirm_imgsz, self.confirm_conf)
+        if person_presence(result)[0]:
+            self.confirmed += 1
+        else:
+            self.rejected += 1
+        return result
+
+    def stats(self):
+        """级联统计：处理帧数、粗筛直接排除的帧数和比例、复核确认/否决次数"""
+        return {
+            "frames": self.frames,
+            "screened_out": self.screened_out,
+            "screened_out_ratio": self.screened_out / self.frames if self.frames else 0.0,
+            "confirmed": self.confirmed,
+            "rejected": self.rejected,
+        }
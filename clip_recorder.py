@@ -0,0 +1,231 @@
+"""触发前后的视频片段录制：每个摄像头在内存中保留最近几秒的JPEG帧，检测事件（person_camX、person_NONO）到来时，
+由后台线程把触发前 pre_seconds 秒和触发后 post_seconds 秒的帧写成片段文件
+
+采集线程只做限速和拷贝：MJPEG 采集时直接保存摄像头输出的JPEG数据（不解码也不重新编码）；
+其他视频源把帧拷贝到暂存缓冲，由编码线程压缩为JPEG，编码跟不上时跳过该帧并计数，不排队。
+内存中的帧和正在写盘的片段合计超过 max_bytes 时丢弃最旧的帧。
+
+片段为首尾相接的JPEG（<摄像头>_<日期>_<时间>_<毫秒>_<原因>.mjpeg，可以用 ffplay -f mjpeg 播放，
+或用 mjpeg.split_jpeg_stream 拆分），同名 .json 记录触发原因和各帧的时间。
+"""
+import collections
+import glob
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from mjpeg import is_jpeg
+
+
+class ClipRecorder:
+    """单个摄像头的片段录制器
+
+    push(frame, timestamp) 在采集线程中调用（LatestFrameGrabber 的 on_capture），按 fps 限速；
+    trigger(reason) 在检测线程等处调用：没有打开的片段时以触发前 pre_seconds 秒为起点打开片段
+    （不与上一个片段重叠），已打开时把结束时间推迟到 post_seconds 秒后，片段最长 max_clip_seconds 秒。
+    写入线程在结束时间到达后把片段写盘，目录中只保留本摄像头最近 max_files 个片段。
+    """
+
+    def __init__(self, camera_id, directory, pre_seconds=5.0, post_seconds=5.0, fps=10, max_bytes=16 * 1024 * 1024,
+                 quality=80, max_clip_seconds=30.0, max_files=200):
+        self.camera_id = camera_id
+        self.directory = directory
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.interval = 1.0 / fps if fps else 0.0
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.max_clip_seconds = max_clip_seconds
+        self.max_files = max_files
+        self._cond = threading.Condition()
+        self._frames = collections.deque()  # (time.monotonic(), time.time(), JPEG字节串)
+        self._bytes = 0
+        self._writing_bytes = 0  # 正在写盘的片段字节数（帧可能已从环中移出，内存仍被占用）
+        self._clip = None  # 打开的片段
+        self._last_clip_end = 0.0
+        self._last_push = 0.0
+        self._staging = None  # 等待编码的帧拷贝
+        self._staging_time = None
+        self._running = False
+        self._threads = []
+        self.frames_stored = 0
+        self.frames_skipped = 0  # 编码线程忙，跳过的帧
+        self.frames_evicted = 0  # 超过内存上限丢弃的帧（不含正常过期的帧）
+        self.frames_encoded = 0
+        self.encode_time = 0.0
+        self.triggers = 0
+        self.clips_written = 0
+        self.write_failures = 0
+        self.last_clip = None
+
+    def start(self):
+        """启动编码线程和写入线程"""
+        self._running = True
+        for target, name in ((self._encode_loop, "encode"), (self._write_loop, "write")):
+            thread = threading.Thread(target=target, name=f"clip-{name}-{self.camera_id}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """停止录制，已打开的片段按已有的帧立即写盘"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def is_alive(self):
+        return self._running
+
+    def push(self, frame, timestamp):
+        """采集线程调用：frame 为图像或 MJPEG 原始数据，timestamp 为 time.monotonic() 采集时间
+
+        帧缓冲可能在返回后被采集线程复用，需要保存的数据在返回前拷贝。
+        """
+        if not self._running or timestamp - self._last_push < self.interval:
+            return
+        self._last_push = timestamp
+        wall_time = time.time() - (time.monotonic() - timestamp)
+        if is_jpeg(frame):
+            data = frame.tobytes()
+            with self._cond:
+                self._store(timestamp, wall_time, data)
+            return
+        with self._cond:
+            if self._staging_time is not None:
+                self.frames_skipped += 1
+                return
+            if self._staging is None or self._staging.shape != frame.shape or self._staging.dtype != frame.dtype:
+                self._staging = np.empty_like(frame)
+            np.copyto(self._staging, frame)
+            self._staging_time = (timestamp, wall_time)
+            self._cond.notify_all()
+
+    def trigger(self, reason, timestamp=None):
+        """打开片段或推迟已打开片段的结束时间；reason 写入文件名，如 person、nono"""
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._cond:
+            if not self._running:
+                return
+            self.triggers += 1
+            clip = self._clip
+            if clip is None:
+                self._clip = {"reason": reason, "trigger": now, "wall_time": time.time(),
+                              "start": max(now - self.pre_seconds, self._last_clip_end),
+                              "end": now + self.post_seconds}
+            else:
+                clip["end"] = min(max(clip["end"], now + self.post_seconds), clip["start"] + self.max_clip_seconds)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "buffered_frames": len(self._frames),
+                "buffered_bytes": self._bytes,
+                "writing_bytes": self._writing_bytes,
+                "stored": self.frames_stored,
+                "skipped": self.frames_skipped,
+                "evicted": self.frames_evicted,
+                "encoded": self.frames_encoded,
+                "mean_encode_ms": 1000 * self.encode_time / self.frames_encoded if self.frames_encoded else 0.0,
+                "triggers": self.triggers,
+                "clips_written": self.clips_written,
+                "write_failures": self.write_failures,
+                "last_clip": self.last_clip,
+            }
+
+    def _store(self, timestamp, wall_time, data):
+        """把一帧JPEG放入环中并移出过期的帧（调用方持有锁）"""
+        self._frames.append((timestamp, wall_time, data))
+        self._bytes += len(data)
+        self.frames_stored += 1
+        self._evict(timestamp)
+
+    def _evict(self, now):
+        keep_from = now - self.pre_seconds
+        if self._clip is not None:
+            keep_from = min(keep_from, self._clip["start"])
+        frames = self._frames
+        while len(frames) > 1:
+            over_limit = self._bytes + self._writing_bytes > self.max_bytes
+            if frames[0][0] >= keep_from and not over_limit:
+                break
+            self._bytes -= len(frames.popleft()[2])
+            if over_limit:
+                self.frames_evicted += 1
+
+    def _encode_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while True:
+            with self._cond:
+                while self._running and self._staging_time is None:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                timestamp, wall_time = self._staging_time
+            # 暂存缓冲在 _staging_time 清空前不会被采集线程改写，编码时不持有锁
+            start = time.perf_counter()
+            ok, data = cv2.imencode(".jpg", self._staging, params)
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self._staging_time = None
+                self.frames_encoded += 1
+                self.encode_time += elapsed
+                if ok:
+                    self._store(timestamp, wall_time, data.tobytes())
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                clip = self._clip
+                now = time.monotonic()
+                if clip is None and not self._running:
+                    break
+                if self._running and (clip is None or now < clip["end"]):
+                    self._cond.wait(clip["end"] - now if clip is not None else 1.0)
+                    if clip is None and self._frames:
+                        self._evict(time.monotonic())  # 摄像头停止后不再有新帧，过期的帧也要移出
+                    continue
+                frames = [frame for frame in self._frames if clip["start"] <= frame[0] <= clip["end"]]
+                self._clip = None
+                self._last_clip_end = clip["end"]
+                size = sum(len(frame[2]) for frame in frames)
+                self._writing_bytes = size
+            if frames:
+                self._write_clip(clip, frames)
+            with self._cond:
+                self._writing_bytes = 0
+
+    def _write_clip(self, clip, frames):
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(clip["wall_time"]))
+        millis = int(clip["wall_time"] * 1000) % 1000
+        base = os.path.join(self.directory, f"{self.camera_id}_{stamp}_{millis:03d}_{clip['reason']}")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(base + ".mjpeg.tmp", "wb") as f:
+                for _, _, data in frames:
+                    f.write(data)
+            os.replace(base + ".mjpeg.tmp", base + ".mjpeg")
+            with open(base + ".json", "w") as f:
+                json.dump({"camera": self.camera_id, "reason": clip["reason"], "trigger_time": clip["wall_time"],
+                           "pre_roll": clip["trigger"] - frames[0][0], "frames": len(frames),
+                           "timestamps": [wall_time for _, wall_time, _ in frames]}, f)
+        except OSError as e:
+            print(f"写入摄像头 {self.camera_id} 的视频片段失败: {e}")
+            self.write_failures += 1
+            return
+        self.clips_written += 1
+        self.last_clip = base + ".mjpeg"
+        print(f"已保存摄像头 {self.camera_id} 的视频片段 {self.last_clip}（{len(frames)}帧）")
+        for old in sorted(glob.glob(os.path.join(self.directory, f"{self.camera_id}_*.mjpeg")))[:-self.max_files]:
+            for path in (old, os.path.splitext(old)[0] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,130 @@
+import os
+import re
+import selectors
+import threading
+import time
+
+# 命令之间的分隔符：\0、换行、分号和空白
+COMMAND_DELIMITERS = re.compile(r"[\0\r\n;\s]+")
+# 已知命令前缀，没有分隔符时也据此切分粘连在一起的命令（如 leida_cam1stop_cam2）
+COMMAND_PREFIXES = ("leida_", "stop_")
+
+
+def parse_command(command):
+    """拆分命令名和可选参数：leida_cam1:az=35,zone=2 -> ("leida_cam1", {"az": "35", "zone": "2"})"""
+    name, _, arguments = command.partition(":")
+    params = {}
+    for argument in arguments.split(","):
+        key, sep, value = argument.partition("=")
+        if sep and key:
+            params[key.strip()] = value.strip()
+    return name, params
+
+
+class CommandParser:
+    """命令流分帧解析器
+
+    按分隔符和已知命令前缀切分，一次读取中的多条命令按顺序全部返回；
+    末尾不完整的命令保留到下次读取，或在输入空闲时由 flush() 取出。
+    """
+
+    def __init__(self, prefixes=COMMAND_PREFIXES, max_pending=4096):
+        self._split_prefix = re.compile("(?=" + "|".join(re.escape(p) for p in prefixes) + ")")
+        self.max_pending = max_pending
+        self.pending = ""
+
+    def _split(self, frame):
+        return [command for command in self._split_prefix.split(frame) if command]
+
+    def feed(self, data):
+        """输入新读到的字节，返回其中所有完整的命令"""
+        text = self.pending + data.decode('utf-8', 'ignore')
+        frames = COMMAND_DELIMITERS.split(text)
+        tail = frames.pop()  # 最后一段后面没有分隔符，可能还没收完
+
+        commands = []
+        for frame in frames:
+            commands.extend(self._split(frame))
+
+        # 末尾一段中，后面还跟着新命令前缀的部分已经完整
+        tail_commands = self._split(tail)
+        if tail_commands:
+            commands.extend(tail_commands[:-1])
+            self.pending = tail_commands[-1][-self.max_pending:]
+        else:
+            self.pending = ""
+        return commands
+
+    def flush(self):
+        """取出保留的不完整命令（输入空闲时视为完整）"""
+        commands = [self.pending] if self.pending else []
+        self.pending = ""
+        return commands
+
+
+class CommandReader:
+    """基于 selectors（Linux 上为 epoll）的命令FIFO读取器，只在有数据时唤醒"""
+
+    def __init__(self, fifo_path, handler, flush_timeout=0.05, metrics=None):
+        self.fifo_path = fifo_path
+        self.handler = handler  # 每条命令调用一次 handler(command)
+        self.flush_timeout = flush_timeout
+        self.metrics = metrics  # 可选的 metrics.Metrics，记录每条命令的处理耗时
+        self.parser = CommandParser()
+        self.commands_received = 0
+        self.connected = threading.Event()  # 第一次打开FIFO后置位
+
+    def _dispatch(self, commands):
+        for command in commands:
+            self.commands_received += 1
+            start = time.monotonic()
+            try:
+                self.handler(command)
+            except Exception as e:
+                print(f"处理命令 {command} 时发生错误: {e}")
+            if self.metrics is not None:
+                self.metrics.observe("command_reader", "dispatch", start)
+
+    def _serve(self, fd):
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                # 有未完成的命令时，空闲 flush_timeout 后把它当作完整命令处理
+                timeout = self.flush_timeout if self.parser.pending else None
+                if not selector.select(timeout):
+                    self._dispatch(self.parser.flush())
+                    continue
+
+                data = os.read(fd, 65536)
+                if data:
+                    print(f"Received: {data.decode('utf-8', 'ignore')}")
+                    self._dispatch(self.parser.feed(data))
+
+    def run(self):
+        """读取线程主体"""
+        while True:
+            fd = keep_fd = None
+            try:
+                # 尝试打开FIFO管道，如果管道不存在则创建
+                if not os.path.exists(self.fifo_path):
+                    os.makedirs(os.path.dirname(self.fifo_path), exist_ok=True)
+                    os.mkfifo(self.fifo_path)
+                    print(f"创建FIFO管道: {self.fifo_path}")
+
+                fd = os.open(self.fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+                # 自己持有一个写端，所有外部写者关闭后读端也不会反复读到 EOF
+                keep_fd = os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+                print("已连接到FIFO管道")
+                self.connected.set()
+                self._serve(fd)
+
+            except Exception as e:
+                print(f"读取FIFO管道时发生错误: {e}")
+            finally:
+                for opened in (fd, keep_fd):
+                    if opened is not None:
+                        os.close(opened)
+
+            # 如果出错，等待一段时间后重新尝试连接
+            print("正在重新连接FIFO管道...")
+            time.sleep(1)
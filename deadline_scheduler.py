@@ -0,0 +1,76 @@
+import heapq
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """单线程截止时间调度器：按键登记截止时间（time.monotonic()），到期时在调度线程中调用 on_expire(key)
+
+    每次登记最多触发一次；到期前再次登记即为推迟（如检测到人时刷新无人超时），取消后不再触发。
+    推迟只更新字典里的截止时间，不压入新的堆项：旧堆项到期时发现截止时间已推迟，再按新时间压回。
+    调度线程睡到堆顶的截止时间，登记更早的截止时间时被唤醒，不轮询。
+    """
+
+    def __init__(self, on_expire, metrics=None, name="deadline_scheduler"):
+        self.on_expire = on_expire
+        self.metrics = metrics
+        self.name = name
+        self._cond = threading.Condition()
+        self._deadlines = {}  # 键 -> 当前截止时间
+        self._heap = []  # (截止时间, 键)，可能包含已推迟或已取消的旧项
+        self.fired = 0
+
+    def schedule(self, key, deadline):
+        """登记或推迟 key 的截止时间"""
+        with self._cond:
+            current = self._deadlines.get(key)
+            self._deadlines[key] = deadline
+            if current is None or deadline < current:
+                heapq.heappush(self._heap, (deadline, key))
+                if self._heap[0][1] == key:
+                    self._cond.notify()
+
+    def cancel(self, key):
+        """取消 key 的截止时间，返回是否取消了尚未触发的登记"""
+        with self._cond:
+            return self._deadlines.pop(key, None) is not None
+
+    def deadline(self, key):
+        """key 当前的截止时间，未登记时返回 None"""
+        with self._cond:
+            return self._deadlines.get(key)
+
+    def _pop_expired(self, now):
+        """取出已到期的键，返回 [(键, 截止时间)]"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, key = heapq.heappop(self._heap)
+            deadline = self._deadlines.get(key)
+            if deadline is None:
+                continue  # 已取消或已触发
+            if deadline > now:
+                heapq.heappush(self._heap, (deadline, key))  # 已推迟
+                continue
+            del self._deadlines[key]
+            expired.append((key, deadline))
+        return expired
+
+    def run(self):
+        """调度线程主体：在锁外调用 on_expire，回调中可以重新登记"""
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    expired = self._pop_expired(now)
+                    if expired:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+
+            for key, deadline in expired:
+                self.fired += 1
+                if self.metrics is not None:
+                    self.metrics.observe(self.name, "lateness", deadline)
+                try:
+                    self.on_expire(key)
+                except Exception as e:
+                    print(f"处理 {key} 的超时时发生错误: {e}")
@@ -0,0 +1,300 @@
+"""检测事件日志：每次推理的结果以定长二进制记录追加写入，按大小轮转；读者用内存映射得到 NumPy 结构化数组
+
+检测线程只把事件放进有界队列（不格式化、不做I/O），写入线程每隔 flush_interval 秒（队列过半时提前）批量打包写入；
+队列满时丢弃新事件并计数，不阻塞检测线程；日志文件打不开时事件留在队列中，下次写入时重试。
+
+文件为 <prefix>.<序号>.bin：64 字节文件头（魔数、记录长度、每条记录的框数）后接 RECORD_DTYPE 记录，
+进程崩溃或写入出错留下的半条记录读取时忽略。多进程模式下各摄像头进程写 <prefix>_<摄像头>.<序号>.bin，
+读者默认合并查询。离线查询示例：
+
+    reader = DetectionLogReader("/path/to/detection_log")
+    events = reader.query(camera="cam2", since=time.time() - 3600, persons_only=True)
+"""
+import collections
+import glob
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAX_BOXES = 8  # 每条记录最多保存的人员框数（按置信度取前几个）
+
+RECORD_DTYPE = np.dtype([
+    ("monotonic", "<f8"),  # time.monotonic()，与指标、帧环时间戳可比
+    ("wall_time", "<f8"),  # time.time()，用于按日期时间查询
+    ("camera", "S8"),  # 摄像头编号（UTF-8 不超过 CAMERA_ID_SIZE 字节，见 check_camera_id）
+    ("person_count", "<u2"),
+    ("box_count", "u1"),
+    ("_pad", "u1"),
+    ("max_conf", "<f4"),
+    ("boxes", "<f4", (MAX_BOXES, 5)),  # x1, y1, x2, y2, 置信度（原图坐标），box_count 之后为 0
+], align=True)
+
+CAMERA_ID_SIZE = RECORD_DTYPE["camera"].itemsize
+
+FILE_MAGIC = b"RDETLOG1"
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+
+
+def _file_header():
+    return HEADER.pack(FILE_MAGIC, RECORD_DTYPE.itemsize, MAX_BOXES).ljust(HEADER_SIZE, b"\0")
+
+
+def check_camera_id(camera_id):
+    """摄像头编号超过记录中 camera 字段的长度时抛出 ValueError（否则会被截断，查询时对不上）"""
+    if len(camera_id.encode()) > CAMERA_ID_SIZE:
+        raise ValueError(f"摄像头编号 {camera_id!r} 超过检测日志的 {CAMERA_ID_SIZE} 字节上限")
+
+
+def log_files(directory, prefix="detections", per_camera=False):
+    """按写入顺序排列的日志文件；per_camera 为 True 时包括多进程模式下各摄像头进程的 <prefix>_<摄像头> 文件"""
+    files = glob.glob(os.path.join(directory, f"{prefix}.*.bin"))
+    if per_camera:
+        files += glob.glob(os.path.join(directory, f"{prefix}_*.*.bin"))
+    return sorted(files)
+
+
+def open_log_file(path):
+    """内存映射一个日志文件，返回 RECORD_DTYPE 的只读结构化数组（不拷贝）；文件头不符时抛出 ValueError"""
+    with open(path, "rb") as f:
+        magic, record_size, max_boxes = HEADER.unpack(f.read(HEADER.size))
+    if magic != FILE_MAGIC or record_size != RECORD_DTYPE.itemsize or max_boxes != MAX_BOXES:
+        raise ValueError(f"{path} 不是当前格式的检测日志")
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count <= 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+class DetectionLogWriter:
+    """检测事件日志的写入线程
+
+    log() 在检测线程中调用，只做一次 deque.append；写入线程批量打包成 RECORD_DTYPE 写入当前文件，
+    文件超过 max_bytes 时换下一个序号的文件，只保留最近 max_files 个文件。
+    """
+
+    def __init__(self, directory, prefix="detections", max_bytes=64 * 1024 * 1024, max_files=16,
+                 max_queue=4096, flush_interval=0.5):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self._pending = collections.deque()
+        self._batch = np.zeros(max_queue, dtype=RECORD_DTYPE)
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # 队列过半时提前唤醒写入线程
+        self._thread = None
+        self._file = None
+        self._file_bytes = 0
+        self._index = 0
+        self._open_failed = False
+        self._cameras = set()  # 已检查过长度的摄像头编号
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0  # 队列满时丢弃的事件数
+        self.rotations = 0
+
+    def start(self):
+        """启动写入线程"""
+        self._thread = threading.Thread(target=self._run, name="detection-log")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def log(self, camera_id, person_count, max_conf, boxes=None, origin=(0, 0), timestamp=None, wall_time=None):
+        """记录一次推理结果，boxes 为 (n, 5) 的人员框（如 inference_engine.person_boxes），
+        origin 为推理区域左上角在原图中的坐标（区域推理时）；队列满时丢弃并返回 False，
+        摄像头编号过长时抛出 ValueError"""
+        if camera_id not in self._cameras:
+            check_camera_id(camera_id)
+            self._cameras.add(camera_id)
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._pending.append((time.monotonic() if timestamp is None else timestamp,
+                              time.time() if wall_time is None else wall_time,
+                              camera_id, person_count, max_conf, boxes, origin))
+        self.logged += 1
+        if len(self._pending) * 2 >= self.max_queue:
+            self._wake.set()
+        return True
+
+    def close(self):
+        """停止写入线程，写完队列中剩余的事件"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._write_pending()
+        if self._pending:
+            # 日志文件打不开，剩余的事件无处可写
+            self.dropped += len(self._pending)
+            self._pending.clear()
+        self._close_file()
+
+    def stats(self):
+        return {"logged": self.logged, "written": self.written, "dropped": self.dropped,
+                "queued": len(self._pending), "rotations": self.rotations}
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                print(f"关闭检测日志失败: {e}")
+            self._file = None
+
+    def _open_next(self):
+        """打开下一个序号的日志文件，删除超出 max_files 的旧文件"""
+        if self._file is not None:
+            self._close_file()
+            self.rotations += 1
+        os.makedirs(self.directory, exist_ok=True)
+        if self._index == 0:
+            # 程序重启后接着已有的最大序号往后写
+            existing = log_files(self.directory, self.prefix)
+            self._index = int(existing[-1].rsplit(".", 2)[-2]) if existing else 0
+        path = os.path.join(self.directory, f"{self.prefix}.{self._index + 1:06d}.bin")
+        f = open(path, "wb")
+        try:
+            f.write(_file_header())
+        except OSError:
+            f.close()
+            raise
+        self._file = f
+        self._index += 1
+        self._file_bytes = HEADER_SIZE
+        for old in log_files(self.directory, self.prefix)[:-self.max_files]:
+            try:
+                os.remove(old)
+            except OSError as e:
+                print(f"删除旧的检测日志 {old} 失败: {e}")
+
+    def _pack(self):
+        """把队列中的事件打包到预分配的批缓冲，返回条数"""
+        count = min(len(self._pending), self.max_queue)
+        if count == 0:
+            return 0
+        events = [self._pending.popleft() for _ in range(count)]
+        batch = self._batch[:count]
+        batch["boxes"] = 0
+        batch["monotonic"], batch["wall_time"], batch["camera"], batch["person_count"], batch["max_conf"] = \
+            zip(*(event[:5] for event in events))
+        box_count = batch["box_count"]
+        box_count[:] = 0
+        for i, event in enumerate(events):
+            boxes = event[5]
+            if boxes is None or len(boxes) == 0:
+                continue
+            n = min(len(boxes), MAX_BOXES)
+            record_boxes = batch["boxes"][i]
+            record_boxes[:n] = boxes[:n]
+            x, y = event[6]
+            if x or y:
+                record_boxes[:n, 0:4:2] += x
+                record_boxes[:n, 1:4:2] += y
+            box_count[i] = n
+        return count
+
+    def _write_pending(self):
+        while self._pending:
+            if self._file is None or self._file_bytes >= self.max_bytes:
+                # 打不开文件时事件留在队列中，下次再试（队列满后 log() 丢弃新事件），失败只打印一次
+                try:
+                    self._open_next()
+                except OSError as e:
+                    if not self._open_failed:
+                        print(f"打开检测日志失败: {e}")
+                    self._open_failed = True
+                    return
+                self._open_failed = False
+            count = self._pack()
+            data = memoryview(self._batch[:count]).cast("B")
+            try:
+                self._file.write(data)
+                self._file.flush()
+            except OSError as e:
+                # 文件中可能留下半条记录，换一个新文件继续写，读取时半条记录被忽略
+                print(f"写入检测日志失败: {e}")
+                self.dropped += count
+                self._close_file()
+                continue
+            self._file_bytes += len(data)
+            self.written += count
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write_pending()
+
+
+class DetectionLogReader:
+    """按摄像头和时间查询检测日志；各文件内存映射后只读取满足条件的记录"""
+
+    def __init__(self, directory, prefix="detections", per_camera=True):
+        self.directory = directory
+        self.prefix = prefix
+        self.per_camera = per_camera  # 同时读取多进程模式下各摄像头进程的文件
+
+    def files(self):
+        return log_files(self.directory, self.prefix, self.per_camera)
+
+    def query(self, camera=None, since=None, until=None, persons_only=False):
+        """返回满足条件的记录（RECORD_DTYPE 结构化数组，拷贝），since/until 为 time.time() 秒数"""
+        selected = []
+        for path in self.files():
+            try:
+                records = open_log_file(path)
+            except (OSError, ValueError) as e:
+                print(f"跳过检测日志 {path}: {e}")
+                continue
+            if len(records) == 0:
+                continue
+            # 记录按写入时间递增，整个文件都在时间范围外时跳过
+            if since is not None and records[-1]["wall_time"] < since:
+                continue
+            if until is not None and records[0]["wall_time"] > until:
+                continue
+            mask = np.ones(len(records), dtype=bool)
+            if camera is not None:
+                mask &= records["camera"] == camera.encode()
+            if since is not None:
+                mask &= records["wall_time"] >= since
+            if until is not None:
+                mask &= records["wall_time"] <= until
+            if persons_only:
+                mask &= records["person_count"] > 0
+            selected.append(records[mask])
+        if not selected:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        events = np.concatenate(selected)
+        if self.per_camera and len(selected) > 1:
+            # 各进程的文件分别有序，合并后按时间重排
+            events = events[np.argsort(events["wall_time"], kind="stable")]
+        return events
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查询检测事件日志")
+    parser.add_argument("directory")
+    parser.add_argument("--prefix", default="detections", help="文件名前缀")
+    parser.add_argument("--exact-prefix", action="store_true",
+                        help="不合并多进程模式下各摄像头进程的 <prefix>_<摄像头> 文件")
+    parser.add_argument("--camera", default=None)
+    parser.add_argument("--since", type=float, default=None, help="最近多少秒")
+    parser.add_argument("--persons-only", action="store_true")
+    args = parser.parse_args()
+
+    events = DetectionLogReader(args.directory, args.prefix, per_camera=not args.exact_prefix).query(
+        args.camera, time.time() - args.since if args.since else None, persons_only=args.persons_only)
+    print(f"{len(events)} 条记录")
+    for event in events[-20:]:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["wall_time"]))
+        print(f"{when} {event['camera'].decode()} {event['person_count']}人 最高置信度 {event['max_conf']:.2f}")
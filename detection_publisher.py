@@ -0,0 +1,26 @@
+import threading
+import time
+
+
+class DetectionPublisher:
+    """检测结果发布：检测线程报告检测事件，立即交给输出写入器发送 person_camX
+
+    每个摄像头只在状态变为“有人”时发送一次 person_camX，
+    连续 rearm_interval 秒没有新的检测事件后才允许再次发送。
+    """
+
+    def __init__(self, writer, rearm_interval=0.5):
+        self.writer = writer
+        self.rearm_interval = rearm_interval
+        self._lock = threading.Lock()
+        self.last_event_time = {}  # camera_id -> 最近一次检测事件的 time.monotonic()
+
+    def publish(self, camera_id, timestamp=None):
+        """检测线程调用：报告某摄像头在 timestamp（time.monotonic()）检测到人"""
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            last = self.last_event_time.get(camera_id)
+            self.last_event_time[camera_id] = now
+            if last is not None and now - last <= self.rearm_interval:
+                return
+        self.writer.send(f"person_{camera_id}\0", now)
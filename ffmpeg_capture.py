@@ -0,0 +1,142 @@
+"""用 FFmpeg 子进程接收RTSP流：ffmpeg 以低延迟参数解码，输出固定尺寸的 BGR 原始帧，经管道直接读入预分配的缓冲
+
+cv2.VideoCapture 打开RTSP时使用 FFmpeg 的默认缓冲，网络抖动或推理跟不上时帧在缓冲里越积越多，延迟会漂移到好几秒。
+这里 ffmpeg 不做缓冲（-fflags nobuffer -flags low_delay），采集线程（LatestFrameGrabber）持续读管道、只保留最新帧，
+积压不会超过一帧；读超时（摄像头断流、ffmpeg 卡住）时结束子进程，由采集线程按指数退避重连。
+"""
+import os
+import select
+import shutil
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+RTSP_TRANSPORTS = ("tcp", "udp")
+
+
+def ffmpeg_rtsp_command(url, width, height, transport="tcp", ffmpeg="ffmpeg"):
+    """低延迟解码RTSP流、缩放为 width x height 的 BGR 原始帧写到标准输出的 ffmpeg 命令
+
+    transport 为 tcp（丢包时重传，花屏少）或 udp（局域网直连时延迟更低，丢包直接丢帧）。
+    """
+    if transport not in RTSP_TRANSPORTS:
+        raise ValueError(f"不支持的RTSP传输方式: {transport}")
+    return [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-rtsp_transport", transport,
+            # 不缓冲输入、尽快出帧，只探测最少的数据就开始解码
+            "-fflags", "nobuffer", "-flags", "low_delay", "-probesize", "32", "-analyzeduration", "0",
+            "-i", url,
+            "-an", "-vf", f"scale={width}:{height}", "-vsync", "0",
+            "-pix_fmt", "bgr24", "-f", "rawvideo", "pipe:1"]
+
+
+def ffmpeg_file_command(path, width, height, ffmpeg="ffmpeg"):
+    """按素材帧率（-re）循环解码视频文件的 ffmpeg 命令，作为本地测试时RTSP摄像头的替身"""
+    return [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-re", "-stream_loop", "-1", "-i", path,
+            "-an", "-vf", f"scale={width}:{height}", "-pix_fmt", "bgr24", "-f", "rawvideo", "pipe:1"]
+
+
+class FfmpegCapture:
+    """cv2.VideoCapture 接口的原始帧管道视频源：command 为把 BGR rawvideo 写到标准输出的命令
+
+    read(image) 传入尺寸相符的缓冲（如 FramePool 中的缓冲）时直接读入该缓冲，不另外分配；
+    打开时先读到第一帧才算打开成功，之后任何一次读取超过 read_timeout 秒没有完整的帧都视为断流。
+    """
+
+    def __init__(self, command, width, height, read_timeout=5.0):
+        self.command = command
+        self.width = width
+        self.height = height
+        self.read_timeout = read_timeout
+        self.frames_read = 0
+        self._scratch = np.empty((height, width, 3), dtype=np.uint8)  # grab() 丢弃的帧和第一帧
+        self._first_pending = False
+        self._process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, bufsize=0)
+        self._fd = self._process.stdout.fileno()
+        self._opened = self._read_into(self._scratch)
+        self._first_pending = self._opened
+        if not self._opened:
+            self.release()
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0
+
+    def _read_into(self, image):
+        """把一整帧读入 image，超时或管道关闭返回 False"""
+        view = memoryview(image).cast("B")
+        offset = 0
+        deadline = time.monotonic() + self.read_timeout
+        while offset < len(view):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self._fd], [], [], remaining)[0]:
+                print(f"{self.read_timeout}秒内没有收到完整的视频帧")
+                return False
+            count = os.readv(self._fd, [view[offset:]])
+            if count == 0:
+                return False  # 子进程已退出
+            offset += count
+        self.frames_read += 1
+        return True
+
+    def grab(self):
+        if not self._opened:
+            return False
+        if self._first_pending:
+            self._first_pending = False
+            return True
+        return self._read_into(self._scratch)
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        if image is None or image.shape != self._scratch.shape or image.dtype != np.uint8 \
+                or not image.flags.c_contiguous:
+            image = np.empty_like(self._scratch)
+        if self._first_pending:
+            self._first_pending = False
+            np.copyto(image, self._scratch)
+            return True, image
+        if not self._read_into(image):
+            return False, None
+        return True, image
+
+    def release(self):
+        self._opened = False
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._process.stdout.close()
+        self._process = None
+
+
+def open_rtsp_capture(url, width=1280, height=720, transport="tcp", read_timeout=5.0):
+    """打开RTSP流：有 ffmpeg 时用 FfmpegCapture，否则退回 cv2.VideoCapture（只保留1帧缓冲）；失败返回 None"""
+    if shutil.which("ffmpeg"):
+        cap = FfmpegCapture(ffmpeg_rtsp_command(url, width, height, transport), width, height, read_timeout)
+    else:
+        print("未找到 ffmpeg，使用 cv2.VideoCapture 打开RTSP流")
+        os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", f"rtsp_transport;{transport}")
+        cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    return cap
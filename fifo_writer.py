@@ -0,0 +1,122 @@
+import collections
+import errno
+import os
+import select
+import threading
+import time
+
+
+class FifoWriter:
+    """输出FIFO的唯一写入者
+
+    以 O_NONBLOCK 打开FIFO，所有消息先进入有界内存队列，由写入线程发送；
+    没有读端或读端断开时自动按退避间隔重连，调用 send() 的线程永远不会阻塞在FIFO上。
+    新消息与队尾的待发消息相同时被合并（只合并队尾，不改变不同消息之间的先后顺序），队列满时丢弃最旧的消息。
+    """
+
+    def __init__(self, fifo_path, max_queue=64, reconnect_delay=0.2, max_reconnect_delay=2.0, metrics=None):
+        self.fifo_path = fifo_path
+        self.max_queue = max_queue
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.metrics = metrics  # 可选的 metrics.Metrics，记录入队到写入的延迟和 write() 耗时
+        self._queue = collections.deque()  # (bytes, 入队时的 time.monotonic())
+        self._cond = threading.Condition()
+        self._fd = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.reconnects = 0
+        self.total_latency = 0.0  # 入队到写入FIFO的累计延迟
+
+    def send(self, message, timestamp=None):
+        """把消息放入发送队列，立即返回"""
+        data = message.encode('utf-8') if isinstance(message, str) else message
+        with self._cond:
+            # 只和队尾合并：person_cam1, person_NONO, person_cam1 不能合并成 person_cam1, person_NONO
+            if self._queue and self._queue[-1][0] == data:
+                self.coalesced += 1
+                return
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append((data, time.monotonic() if timestamp is None else timestamp))
+            self._cond.notify()
+
+    def stats(self):
+        """队列深度、发送/丢弃/合并计数和平均发送延迟（毫秒）"""
+        with self._cond:
+            return {
+                "connected": self._fd is not None,
+                "queue_depth": len(self._queue),
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "reconnects": self.reconnects,
+                "mean_latency_ms": 1000 * self.total_latency / self.sent if self.sent else 0.0,
+            }
+
+    def _connect(self):
+        """以非阻塞方式打开FIFO写端，没有读端时按指数退避重试"""
+        delay = self.reconnect_delay
+        while True:
+            try:
+                # 确保FIFO管道存在
+                if not os.path.exists(self.fifo_path):
+                    os.makedirs(os.path.dirname(self.fifo_path), exist_ok=True)
+                    os.mkfifo(self.fifo_path)
+                    print(f"创建FIFO管道: {self.fifo_path}")
+                fd = os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+                print("已连接到写入FIFO管道")
+                return fd
+            except OSError as e:
+                if e.errno != errno.ENXIO:  # ENXIO 表示还没有读端
+                    print(f"打开写入FIFO管道时发生错误: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _write_pending(self):
+        """发送队列中的消息，读端断开时抛出 BrokenPipeError"""
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                data, enqueue_time = self._queue[0]
+
+            write_start = time.monotonic()
+            try:
+                # 小于 PIPE_BUF 的写入是原子的，要么整条写入，要么 EAGAIN
+                os.write(self._fd, data)
+            except BlockingIOError:
+                # 管道已满，等待读端取走数据
+                select.select([], [self._fd], [], 0.5)
+                continue
+
+            with self._cond:
+                if self._queue and self._queue[0][0] is data:
+                    self._queue.popleft()
+                self.sent += 1
+                self.total_latency += time.monotonic() - enqueue_time
+            if self.metrics is not None:
+                self.metrics.observe("fifo_writer", "write", write_start)
+                self.metrics.observe("fifo_writer", "queue_to_write", enqueue_time)
+            print(f"Sent: {data.decode('utf-8', 'ignore')}")
+
+    def run(self):
+        """写入线程主体"""
+        while True:
+            fd = self._connect()
+            with self._cond:
+                self._fd = fd
+            try:
+                self._write_pending()
+            except BrokenPipeError:
+                print("写入FIFO管道连接断开")
+            except Exception as e:
+                print(f"写入FIFO管道时发生错误: {e}")
+            finally:
+                with self._cond:
+                    self._fd = None
+                    self.reconnects += 1
+                os.close(fd)
+            print("正在重新连接写入FIFO管道...")
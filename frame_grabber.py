@@ -0,0 +1,229 @@
+import threading
+import time
+
+
+class LatestFrameGrabber:
+    """采集线程：持续读取视频源，只保留最新一帧及其采集时间戳
+
+    推理循环通过 latest() 取最新帧，不再和驱动缓冲里积压的旧帧打交道；
+    没被取走就被新帧覆盖的帧计入丢帧数。
+
+    设置 decode 时（如 MJPEG 原始数据的降采样解码），采集线程只保存压缩数据，
+    latest() 取帧时才在调用线程中解码，被覆盖的帧不解码；on_frame 此时只对取走并解码后的帧调用。
+    on_capture 则总是在采集线程中对每一帧未解码的数据调用（如片段录制直接保存 MJPEG 数据）。
+
+    设置 pool（frame_pool.FramePool）时，采集线程从池中取缓冲用 read(buffer) 读入，被覆盖的帧放回池中；
+    取帧方处理完后调用 release(frame) 归还。此时只能有一个取帧方，归还后不能再使用该帧。
+
+    读取失败后每隔 reconnect_delay 秒重新打开视频源；设置 max_reconnect_delay 时为指数退避，
+    每次重连失败（或重连后一帧都没读到）间隔翻倍直到该上限，读到帧后复位，摄像头掉线时不会反复快速重连。
+    """
+
+    def __init__(self, open_source, name="", reconnect_delay=1.0, on_frame=None, decode=None, pool=None,
+                 max_reconnect_delay=None, on_capture=None):
+        self.open_source = open_source  # 返回已打开的视频捕获对象，失败返回 None
+        self.name = name
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._next_reconnect_delay = reconnect_delay
+        self.on_frame = on_frame  # 每采集到一帧在采集线程中调用 on_frame(frame, timestamp)，如写入共享内存帧环
+        self.on_capture = on_capture  # 每采集到一帧在采集线程中调用 on_capture(data, timestamp)，返回后帧缓冲可能被复用
+        self.decode = decode  # decode(data) -> 图像，解码失败返回 None
+        self.pool = pool
+        self._cap = None
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._consumed_seq = 0
+        self._rate = None  # None 表示全速读取，否则为限速取帧频率（只 grab 不解码）
+        self._flush_frames = 0
+        self._running = False
+        self._thread = None
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_consumed = 0
+        self.read_failures = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.last_frame_age = 0.0
+        self.total_frame_age = 0.0
+        self.frames_decoded = 0
+        self.decode_failures = 0
+        self.decode_time = 0.0
+
+    def start(self):
+        """打开视频源并启动采集线程，打开失败返回 False"""
+        self._cap = self.open_source()
+        if self._cap is None:
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"grabber-{self.name}")
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """停止采集线程并释放视频源"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def is_alive(self):
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def set_rate(self, fps=None, flush_frames=0):
+        """设置取帧频率，None 为全速；从限速切回全速时丢弃驱动缓冲里的 flush_frames 帧旧帧"""
+        with self._cond:
+            if self._rate is not None and fps is None:
+                self._flush_frames = flush_frames
+                self._frame = None
+            self._rate = fps
+            self._cond.notify_all()
+
+    def latest(self, newer_than=None, timeout=0):
+        """取最新帧，返回 (frame, timestamp, seq)
+
+        只返回序号大于 newer_than 的帧（None 为上一次取走的帧）；没有时最多等待 timeout 秒，
+        仍没有则返回 (None, 0, newer_than)。
+        设置 pool 时已取走的帧归调用方所有、可能已经归还给池，newer_than 更小也不会再次返回。
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if newer_than is None:
+                newer_than = self._consumed_seq
+            elif self.pool is not None:
+                newer_than = max(newer_than, self._consumed_seq)
+            while self._frame is None or self._seq <= newer_than:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return None, 0.0, newer_than
+                self._cond.wait(remaining)
+            frame, timestamp, seq = self._frame, self._timestamp, self._seq
+            self._consumed_seq = seq
+            self.frames_consumed += 1
+            self.last_frame_age = time.monotonic() - timestamp
+            self.total_frame_age += self.last_frame_age
+
+        if self.decode is not None:
+            start = time.perf_counter()
+            frame = self.decode(frame)
+            self.decode_time += time.perf_counter() - start
+            if frame is None:
+                self.decode_failures += 1
+                return None, 0.0, newer_than
+            self.frames_decoded += 1
+            self._notify_frame(frame, timestamp)
+        return frame, timestamp, seq
+
+    def stats(self):
+        """采集统计：采集/丢弃/消费帧数和帧龄（毫秒）"""
+        with self._cond:
+            consumed = self.frames_consumed
+            return {
+                "captured": self.frames_captured,
+                "dropped": self.frames_dropped,
+                "consumed": consumed,
+                "read_failures": self.read_failures,
+                "reconnects": self.reconnects,
+                "reconnect_attempts": self.reconnect_attempts,
+                "last_frame_age_ms": 1000 * self.last_frame_age,
+                "mean_frame_age_ms": 1000 * self.total_frame_age / consumed if consumed else 0.0,
+                "decoded": self.frames_decoded,
+                "decode_failures": self.decode_failures,
+                "mean_decode_ms": 1000 * self.decode_time / self.frames_decoded if self.frames_decoded else 0.0,
+            }
+
+    def release(self, frame):
+        """取帧方处理完 latest() 返回的帧后归还缓冲（没有缓冲池时什么也不做）"""
+        if self.pool is not None:
+            self.pool.release(frame)
+
+    def _notify_frame(self, frame, timestamp):
+        if self.on_frame is not None:
+            try:
+                self.on_frame(frame, timestamp)
+            except Exception as e:
+                print(f"视频源 {self.name} 帧回调出错: {e}")
+
+    def _reconnect(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        while self._running:
+            delay = self._next_reconnect_delay
+            if self.max_reconnect_delay is not None:
+                self._next_reconnect_delay = min(delay * 2, self.max_reconnect_delay)
+            with self._cond:
+                if self._running:
+                    self._cond.wait(delay)  # stop() 时立即唤醒
+            if not self._running:
+                break
+            self.reconnect_attempts += 1
+            self._cap = self.open_source()
+            if self._cap is not None:
+                self.reconnects += 1
+                return True
+        return False
+
+    def _run(self):
+        while self._running:
+            with self._cond:
+                rate = self._rate
+                flush = self._flush_frames
+                self._flush_frames = 0
+
+            for _ in range(flush):
+                self._cap.grab()
+
+            if rate is not None:
+                # 限速模式只 grab 不解码，保持设备出流、曝光收敛
+                if not self._cap.grab():
+                    self.read_failures += 1
+                    print(f"视频源 {self.name} 取帧失败，尝试重新连接")
+                    if not self._reconnect():
+                        break
+                    continue
+                self._next_reconnect_delay = self.reconnect_delay
+                with self._cond:
+                    self._cond.wait(1.0 / rate)
+                continue
+
+            buffer = self.pool.acquire() if self.pool is not None else None
+            ret, frame = self._cap.read(buffer) if buffer is not None else self._cap.read()
+            timestamp = time.monotonic()
+            if frame is not buffer:
+                # 视频源没有复用缓冲（尺寸不符或读取失败），缓冲放回池中
+                self.release(buffer)
+            if not ret:
+                self.read_failures += 1
+                print(f"无法从视频源 {self.name} 读取视频帧，尝试重新连接")
+                if not self._reconnect():
+                    break
+                continue
+
+            self._next_reconnect_delay = self.reconnect_delay
+            dropped = None
+            with self._cond:
+                if self._frame is not None and self._seq > self._consumed_seq:
+                    self.frames_dropped += 1
+                    dropped = self._frame
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self.frames_captured += 1
+                self._cond.notify_all()
+
+            if self.decode is None:
+                self._notify_frame(frame, timestamp)
+            if self.on_capture is not None:
+                try:
+                    self.on_capture(frame, timestamp)
+                except Exception as e:
+                    print(f"视频源 {self.name} 采集回调出错: {e}")
+            self.release(dropped)
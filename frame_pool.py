@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+
+
+class FramePool:
+    """预分配的帧缓冲池：采集线程从池中取缓冲，用 cap.read(buffer) 直接读入，
+    帧被新帧覆盖丢弃、或取帧方处理完归还后放回池中复用，稳定运行时不再为每帧分配内存
+
+    缓冲尺寸按第一次归还的帧确定，帧尺寸变化时清空重建；池空时临时分配（计入 allocations），
+    池满时归还的缓冲直接丢弃，常驻内存最多 size 个帧缓冲。
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self._lock = threading.Lock()
+        self._free = []
+        self._shape = None
+        self._dtype = None
+        self.allocations = 0  # 池空时新分配的次数
+        self.reused = 0
+
+    def acquire(self):
+        """取一个空闲缓冲；还不知道帧尺寸时返回 None，由视频源自行分配"""
+        with self._lock:
+            if self._free:
+                self.reused += 1
+                return self._free.pop()
+            if self._shape is None:
+                return None
+            self.allocations += 1
+            shape, dtype = self._shape, self._dtype
+        return np.empty(shape, dtype)
+
+    def release(self, buffer):
+        """归还缓冲，归还后调用方不能再使用它"""
+        if buffer is None or not buffer.flags.owndata:
+            return
+        with self._lock:
+            if buffer.shape != self._shape or buffer.dtype != self._dtype:
+                # 帧尺寸变化，旧尺寸的缓冲作废
+                self._shape, self._dtype = buffer.shape, buffer.dtype
+                self._free = []
+            if len(self._free) < self.size and not any(free is buffer for free in self._free):
+                self._free.append(buffer)
+
+    def stats(self):
+        with self._lock:
+            return {"free": len(self._free), "allocations": self.allocations, "reused": self.reused}
@@ -0,0 +1,289 @@
+"""共享内存帧环：采集进程把每一帧写入 multiprocessing.shared_memory，
+本机其他进程（雷达融合、录像等）按名称映射为 NumPy 数组读取，无需拷贝和序列化。
+
+内存布局（小端）：
+    全局头 64 字节：magic、槽位数、高、宽、通道数、dtype、槽位步长、最新帧序号、读者最近一次读取的 time.monotonic()、
+    代数、写者进程号
+    每个槽位：64 字节槽位头（seqlock 计数、time.monotonic() 时间戳）+ 帧数据
+
+无锁读协议（seqlock）：写入第 n 帧时先把槽位计数置为奇数 2n-1，写完帧数据后置为 2n，
+再把全局最新序号置为 n。读者取最新序号 n 对应的槽位，计数等于 2n 时数据完整；
+零拷贝读取到的视图在写者绕回覆盖该槽位（slots-1 帧之后）前有效，可以用 is_valid(n) 复核。
+
+读者每次读取时刷新头部的读取时间，写者据此判断有没有读者（has_readers），发布需要额外开销的帧（如 MJPEG 全尺寸解码）
+时可以在没有读者时跳过。
+
+写者按新的帧尺寸重建共享内存、关闭或接管上次异常退出残留的共享内存时，先把旧共享内存头部的代数加一再删除，
+读者发现代数变化后按名称重新映射；帧序号跨重建连续，读者的 newer_than 仍然有效。
+"""
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = b"FRAMERNG"
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 64
+
+
+def _align(size, alignment=64):
+    return (size + alignment - 1) // alignment * alignment
+
+
+class _FrameRing:
+    """在共享内存块上建立头部字段和各槽位的 NumPy 视图"""
+
+    def _map(self, shm, slots, shape, dtype):
+        self._shm = shm
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_stride = _align(SLOT_HEADER_SIZE + int(np.prod(self.shape)) * self.dtype.itemsize)
+        buf = shm.buf
+        self._latest = np.ndarray((), dtype="<u8", buffer=buf, offset=40)
+        self._reader_time = np.ndarray((), dtype="<f8", buffer=buf, offset=48)
+        self._generation = np.ndarray((), dtype="<u4", buffer=buf, offset=56)
+        self._locks = np.ndarray((slots,), dtype="<u8", buffer=buf, offset=HEADER_SIZE,
+                                 strides=(self.slot_stride,))
+        self._timestamps = np.ndarray((slots,), dtype="<f8", buffer=buf, offset=HEADER_SIZE + 8,
+                                      strides=(self.slot_stride,))
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        slots_bytes = np.ndarray((slots, self.slot_stride), dtype=np.uint8, buffer=buf, offset=HEADER_SIZE)
+        self._frames = slots_bytes[:, SLOT_HEADER_SIZE:SLOT_HEADER_SIZE + frame_bytes] \
+            .view(self.dtype).reshape((slots,) + self.shape)
+
+    def _unmap(self):
+        self._latest = self._reader_time = self._generation = self._locks = self._timestamps = self._frames = None
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # 调用方仍持有零拷贝视图，映射随进程退出释放
+                pass
+            self._shm = None
+
+
+def _header_fields(shm):
+    """读取头部的 (代数, 写者进程号, 最新帧序号)，不是帧环共享内存时返回 None"""
+    if shm.size < HEADER_SIZE or bytes(shm.buf[:8]) != MAGIC:
+        return None
+    latest = int(np.frombuffer(shm.buf, dtype="<u8", count=1, offset=40)[0])
+    generation, pid = (int(v) for v in np.frombuffer(shm.buf, dtype="<u4", count=2, offset=56))
+    return generation, pid, latest
+
+
+def _process_alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class FrameRingWriter(_FrameRing):
+    """帧环写者（采集端）：第一帧到来时按其尺寸创建共享内存，尺寸变化时重新创建
+
+    同名共享内存已存在时只接管上次异常退出残留的帧环（写者进程已不存在）；仍有写者在运行或不是帧环时不删除，
+    publish 不发布并每隔 retry_interval 秒重试一次。
+    """
+
+    def __init__(self, name, slots=4, retry_interval=5.0):
+        self.name = name
+        self.slots = slots
+        self.retry_interval = retry_interval
+        self._shm = None
+        self._seq = 0
+        self._next_retry = 0.0
+        self.generation = 0
+        self.frames_published = 0
+
+    def _create(self, shape, dtype):
+        self.close()
+        dtype = np.dtype(dtype)
+        stride = _align(SLOT_HEADER_SIZE + int(np.prod(shape)) * dtype.itemsize)
+        size = HEADER_SIZE + stride * self.slots
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            self._remove_stale()
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+
+        self.generation += 1
+        channels = shape[2] if len(shape) == 3 else 1
+        shm.buf[:40] = MAGIC + np.array([self.slots, shape[0], shape[1], channels], dtype="<u4").tobytes() + \
+            dtype.str.encode().ljust(8, b"\0") + np.array([stride], dtype="<u8").tobytes()
+        shm.buf[56:64] = np.array([self.generation, os.getpid()], dtype="<u4").tobytes()
+        self._map(shm, self.slots, shape, dtype)
+        self._latest[...] = self._seq
+        self._reader_time[...] = 0.0
+        self._locks[:] = 0
+        print(f"已创建共享内存帧环 {self.name}：{self.slots} 个槽位，帧尺寸 {tuple(shape)}")
+
+    def _remove_stale(self):
+        """删除上次异常退出残留的同名帧环；仍有写者在运行或不是帧环时抛出 FileExistsError"""
+        stale = _attach_untracked(self.name)
+        try:
+            fields = _header_fields(stale)
+            if fields is None:
+                raise FileExistsError(f"共享内存 {self.name} 已存在且不是帧环")
+            generation, pid, latest = fields
+            if _process_alive(pid):
+                raise FileExistsError(f"帧环 {self.name} 正由进程 {pid} 写入")
+            # 代数加一通知仍映射着旧帧环的读者重新映射，帧序号接着旧帧环继续
+            self.generation = max(self.generation, generation + 1)
+            self._seq = max(self._seq, latest)
+            stale.buf[56:60] = np.array([self.generation], dtype="<u4").tobytes()
+        finally:
+            stale.close()
+        print(f"删除上次残留的共享内存帧环 {self.name}（写者进程 {pid} 已退出）")
+        try:
+            shared_memory.SharedMemory(name=self.name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def has_readers(self, timeout=2.0):
+        """最近 timeout 秒内是否有读者读取；还没有创建共享内存时返回 True（先发布一帧，读者才能映射）"""
+        if self._shm is None:
+            return time.monotonic() >= self._next_retry
+        return time.monotonic() - float(self._reader_time) < timeout
+
+    def publish(self, frame, timestamp=None):
+        """写入一帧，timestamp 为采集时的 time.monotonic()"""
+        if self._shm is None or frame.shape != self.shape or frame.dtype != self.dtype:
+            if time.monotonic() < self._next_retry:
+                return
+            try:
+                self._create(frame.shape, frame.dtype)
+            except FileExistsError as e:
+                print(f"无法创建共享内存帧环: {e}，{self.retry_interval:g}秒后重试")
+                self._next_retry = time.monotonic() + self.retry_interval
+                return
+
+        seq = self._seq + 1
+        slot = seq % self.slots
+        self._locks[slot] = 2 * seq - 1  # 奇数：正在写入
+        self._timestamps[slot] = time.monotonic() if timestamp is None else timestamp
+        self._frames[slot] = frame
+        self._locks[slot] = 2 * seq
+        self._latest[...] = seq
+        self._seq = seq
+        self.frames_published += 1
+
+    def close(self):
+        """释放并删除共享内存，代数加一通知读者"""
+        if self._shm is not None:
+            shm = self._shm
+            self._generation[...] = self.generation + 1
+            self.generation += 1
+            self._unmap()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _attach_untracked(name):
+    """映射已有的共享内存，不留在 resource_tracker 的登记中，读者退出时不会删除写者的共享内存
+
+    Python 3.13 起用 track=False。之前的版本 attach 也会登记，映射后注销本次映射的名称；
+    但本进程与写者共用 resource_tracker 时（读者就是写者进程，或由写者进程派生），登记只是写者已有的那一条，
+    注销会把写者的登记一起去掉（再次注销时 resource_tracker 报 KeyError），这时不注销。
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    fields = _header_fields(shm)
+    tracker = resource_tracker._resource_tracker
+    inherited = getattr(tracker, "_pid", None) is None  # 共用父进程启动的 resource_tracker
+    if not inherited and (fields is None or fields[1] != os.getpid()):
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class FrameRingReader(_FrameRing):
+    """帧环读者（其他进程）：按名称映射共享内存，不加锁读取最新帧"""
+
+    def __init__(self, name):
+        self.name = name
+        self._shm = None
+        self.torn_reads = 0  # 读取过程中槽位被覆盖而重试的次数
+        self.reattaches = 0  # 写者重建帧环后重新映射的次数
+        self._attach()
+
+    def _attach(self):
+        shm = _attach_untracked(self.name)
+        fields = _header_fields(shm)
+        if fields is None:
+            shm.close()
+            raise ValueError(f"{self.name} 不是帧环共享内存")
+        header = bytes(shm.buf[:40])
+        slots, height, width, channels = np.frombuffer(header, dtype="<u4", count=4, offset=8)
+        dtype = header[24:32].rstrip(b"\0").decode()
+        shape = (int(height), int(width), int(channels)) if channels > 1 else (int(height), int(width))
+        self._map(shm, int(slots), shape, dtype)
+        self.generation = fields[0]
+
+    def _check_generation(self):
+        """写者重建或关闭帧环后重新映射，还没有新的帧环时返回 False"""
+        if self._shm is not None and int(self._generation) == self.generation:
+            return True
+        self._unmap()
+        try:
+            self._attach()
+        except (FileNotFoundError, ValueError):
+            return False
+        self.reattaches += 1
+        return True
+
+    def latest_seq(self):
+        """最新已写完的帧序号，0 表示还没有帧"""
+        if not self._check_generation():
+            return 0
+        return int(self._latest)
+
+    def is_valid(self, seq):
+        """序号为 seq 的帧所在槽位是否仍未被覆盖"""
+        return self._shm is not None and int(self._generation) == self.generation and \
+            int(self._locks[seq % self.slots]) == 2 * seq
+
+    def latest(self, newer_than=0, copy=False):
+        """取最新帧，返回 (frame, timestamp, seq)；没有比 newer_than 更新的帧时返回 (None, 0.0, newer_than)
+
+        copy=False 返回共享内存上的零拷贝视图，在写者绕回覆盖前有效；
+        copy=True 返回拷贝，并保证拷贝期间槽位没有被改写。写者重建帧环后自动重新映射，之前取得的零拷贝视图不再更新。
+        """
+        while True:
+            if not self._check_generation():
+                return None, 0.0, newer_than
+            self._reader_time[...] = time.monotonic()
+            seq = int(self._latest)
+            if seq <= newer_than:
+                return None, 0.0, newer_than
+            slot = seq % self.slots
+            if int(self._locks[slot]) != 2 * seq:
+                self.torn_reads += 1
+                continue
+            timestamp = float(self._timestamps[slot])
+            frame = self._frames[slot].copy() if copy else self._frames[slot]
+            if self.is_valid(seq):
+                return frame, timestamp, seq
+            self.torn_reads += 1
+
+    def wait(self, newer_than=0, timeout=1.0, copy=False, poll_interval=0.001):
+        """轮询等待比 newer_than 更新的帧，超时返回 (None, 0.0, newer_than)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = self.latest(newer_than, copy)
+            if result[0] is not None or time.monotonic() >= deadline:
+                return result
+            time.sleep(poll_interval)
+
+    def close(self):
+        """解除映射（不删除共享内存）"""
+        self._unmap()
@@ -0,0 +1,68 @@
+"""共享内存帧环的示例读者：映射 yolo_fifo_2cam.py 发布的摄像头帧，统计帧率和帧龄
+
+用法:
+    python3 frame_ring_consumer.py --name radar_cam1
+    python3 frame_ring_consumer.py --name radar_cam1 --save-every 30 --output /tmp/frames
+"""
+import argparse
+import os
+import time
+
+import cv2
+
+from frame_ring import FrameRingReader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享内存帧环示例读者")
+    parser.add_argument("--name", default="radar_cam1", help="帧环名称（见 yolo_fifo_2cam.py 中的 frame_ring_names）")
+    parser.add_argument("--save-every", type=int, default=0, help="每隔多少帧保存一张JPEG，0 为不保存")
+    parser.add_argument("--output", default=".", help="JPEG 保存目录")
+    args = parser.parse_args()
+
+    # 等待采集端创建帧环（摄像头打开后第一帧到来时创建）
+    while True:
+        try:
+            reader = FrameRingReader(args.name)
+            break
+        except FileNotFoundError:
+            print(f"帧环 {args.name} 尚未创建，等待中...")
+            time.sleep(1)
+    print(f"已映射帧环 {args.name}：帧尺寸 {reader.shape}，{reader.slots} 个槽位")
+
+    seq = reader.latest_seq()
+    frame = None
+    frames = missed = 0
+    total_age = 0.0
+    report_time = time.monotonic()
+    try:
+        while True:
+            frame, timestamp, new_seq = reader.wait(newer_than=seq, timeout=1.0)
+            if frame is None:
+                continue
+            # frame 是共享内存上的零拷贝视图，在写者绕回覆盖前处理完
+            missed += new_seq - seq - 1 if seq else 0
+            seq = new_seq
+            frames += 1
+            total_age += time.monotonic() - timestamp
+            if args.save_every and frames % args.save_every == 0:
+                cv2.imwrite(os.path.join(args.output, f"{args.name}_{seq}.jpg"), frame)
+                if not reader.is_valid(seq):
+                    print(f"第 {seq} 帧在保存期间被覆盖")
+
+            now = time.monotonic()
+            if now - report_time >= 1.0:
+                print(f"{args.name}: {frames / (now - report_time):.1f} FPS，跳过 {missed} 帧，"
+                      f"平均帧龄 {1000 * total_age / max(frames, 1):.2f} ms，重试 {reader.torn_reads} 次")
+                frames = missed = 0
+                total_age = 0.0
+                report_time = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        frame = None  # 先释放零拷贝视图，才能解除映射
+        reader.close()
+
+
+if __name__ == '__main__':
+    main()
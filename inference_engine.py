@@ -0,0 +1,206 @@
+import threading
+import time
+
+import numpy as np
+
+PERSON_CLASS = 0  # COCO 中 person 的类别编号
+
+# 推理模式
+PRESENCE_MODE = "presence"  # 只检测 person 类别，不跑跟踪器，只关心有没有人
+TRACK_MODE = "track"  # 全类别检测加跟踪器，需要跟踪ID时使用
+
+
+def _to_numpy(values):
+    """把 torch 张量或数组转换为 numpy 数组"""
+    if hasattr(values, "cpu"):
+        values = values.cpu()
+    if hasattr(values, "numpy"):
+        return values.numpy()
+    return values
+
+
+def person_presence(result, person_class=PERSON_CLASS):
+    """汇总单帧结果中的人员：返回 (是否有人, 人数, 最高置信度)"""
+    if result is None or len(result.boxes) == 0:
+        return False, 0, 0.0
+    cls = _to_numpy(result.boxes.cls)
+    conf = _to_numpy(result.boxes.conf)
+    person_conf = conf[cls == person_class]
+    if len(person_conf) == 0:
+        return False, 0, 0.0
+    return True, len(person_conf), float(person_conf.max())
+
+
+def person_boxes(result, limit=8, person_class=PERSON_CLASS):
+    """单帧结果中置信度最高的 limit 个人员框，返回 (n, 5) 的 x1, y1, x2, y2, 置信度"""
+    detections = getattr(result, "detections", None)
+    if detections is not None:
+        return detections[:limit]  # raw_model.RawResult：只有人员、已按置信度降序
+    if result is None or len(result.boxes) == 0:
+        return np.empty((0, 5), dtype=np.float32)
+    keep = _to_numpy(result.boxes.cls) == person_class
+    xyxy = _to_numpy(result.boxes.xyxy)[keep]
+    conf = _to_numpy(result.boxes.conf)[keep]
+    order = np.argsort(-conf, kind="stable")[:limit]
+    return np.concatenate((xyxy[order], conf[order, None]), axis=1).astype(np.float32, copy=False)
+
+
+class _InferenceRequest:
+    """一次等待推理的请求（某个摄像头的一帧）"""
+
+    def __init__(self, camera_id, frame, imgsz, conf):
+        self.camera_id = camera_id
+        self.frame = frame
+        self.imgsz = imgsz
+        self.conf = conf
+        self.submit_time = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class InferenceEngine:
+    """共享单模型的推理引擎
+
+    各摄像头线程通过 infer() 提交最新帧，引擎线程在 max_wait 窗口内
+    尽量凑齐所有活跃摄像头的帧，做一次批量推理，再把结果分别交还。
+    """
+
+    def __init__(self, model, max_batch=2, max_wait=0.02, mode=PRESENCE_MODE, metrics=None):
+        self.model = model
+        self.mode = mode
+        self.metrics = metrics  # 可选的 metrics.Metrics，记录每批的凑批等待和模型调用耗时
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._pending = {}  # camera_id -> _InferenceRequest
+        self._active = set()
+        self._thread = None
+        self.stats = {
+            "batches": 0,
+            "frames": 0,
+            "inference_time": 0.0,
+            "wait_time": 0.0,
+        }
+
+    def start(self):
+        """启动推理线程"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="inference-engine")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def activate(self, camera_id):
+        """登记一个正在检测的摄像头，凑批时会等待它的帧"""
+        with self._cond:
+            self._active.add(camera_id)
+
+    def deactivate(self, camera_id):
+        """注销摄像头，不再等待它的帧"""
+        with self._cond:
+            self._active.discard(camera_id)
+            self._cond.notify_all()
+
+    def infer(self, camera_id, frame, imgsz=None, conf=None, timeout=None):
+        """提交一帧并等待该摄像头自己的推理结果，imgsz/conf 为 None 时使用模型默认输入尺寸和置信度阈值"""
+        request = _InferenceRequest(camera_id, frame, imgsz, conf)
+        with self._cond:
+            # 同一摄像头只保留最新一帧
+            stale = self._pending.get(camera_id)
+            if stale is not None:
+                stale.error = RuntimeError("被更新的帧取代")
+                stale.done.set()
+            self._pending[camera_id] = request
+            self._cond.notify_all()
+
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"摄像头 {camera_id} 推理超时")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def warmup(self, frame, runs=1):
+        """用假帧预热模型（单帧和整批各 runs 次），须在启动推理线程前调用；返回每次调用的耗时（秒）
+
+        第一次调用承担后端的一次性初始化，批量推理不支持时在这里就退回逐帧推理，而不是在第一次真实触发时。
+        """
+        batches = [[frame]] + ([[frame] * self.max_batch] if self.max_batch > 1 else [])
+        durations = []
+        for _ in range(runs):
+            for frames in batches:
+                start = time.monotonic()
+                self._predict(frames[:self.max_batch], None, None)
+                durations.append(time.monotonic() - start)
+        return durations
+
+    def _collect_batch(self):
+        """等待并取出一批请求，批大小受 max_batch 和 max_wait 约束"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            first_submit = min(r.submit_time for r in self._pending.values())
+            deadline = first_submit + self.max_wait
+            while True:
+                expected = min(max(len(self._active), 1), self.max_batch)
+                if len(self._pending) >= expected:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # 一批只能使用同一输入尺寸和阈值，以最早提交的请求为准
+            ordered = sorted(self._pending.values(), key=lambda r: r.submit_time)
+            first = ordered[0]
+            batch = [r for r in ordered if (r.imgsz, r.conf) == (first.imgsz, first.conf)][:self.max_batch]
+            for request in batch:
+                del self._pending[request.camera_id]
+        self.stats["wait_time"] += sum(time.monotonic() - r.submit_time for r in batch)
+        if self.metrics is not None:
+            self.metrics.observe("inference_engine", "batch_wait", batch[0].submit_time)
+        return batch
+
+    def _call_model(self, source, imgsz, conf):
+        kwargs = {}
+        if imgsz is not None:
+            kwargs["imgsz"] = imgsz
+        if conf is not None:
+            kwargs["conf"] = conf
+        if self.mode == TRACK_MODE:
+            return self.model.track(source, stream=False, **kwargs)
+        # 只保留 person 类别参与NMS，不跑跟踪器
+        return self.model.predict(source, classes=[PERSON_CLASS], verbose=False, **kwargs)
+
+    def _predict(self, frames, imgsz, conf):
+        """调用模型推理，返回与 frames 一一对应的结果"""
+        if len(frames) == 1:
+            return list(self._call_model(frames[0], imgsz, conf))
+        try:
+            return list(self._call_model(frames, imgsz, conf))
+        except Exception as e:
+            # 部分后端（如 batch=1 导出的 RKNN 模型）不支持批量输入，退回逐帧推理
+            print(f"批量推理失败，退回逐帧推理: {e}")
+            self.max_batch = 1
+            return [self._call_model(frame, imgsz, conf)[0] for frame in frames]
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            start = time.monotonic()
+            try:
+                results = self._predict([r.frame for r in batch], batch[0].imgsz, batch[0].conf)
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                self.stats["batches"] += 1
+                self.stats["frames"] += len(batch)
+                self.stats["inference_time"] += time.monotonic() - start
+                if self.metrics is not None:
+                    self.metrics.observe("inference_engine", "model", start)
+                    self.metrics.increment("inference_engine", "batches")
+                for request in batch:
+                    request.done.set()
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+
+class RollingHistogram:
+    """保留最近 window 个样本的滚动直方图，读取时再排序计算分位数
+
+    observe() 只做一次列表赋值，不加锁：多个线程同时写入时最多覆盖掉一个样本。
+    """
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._samples = [0.0] * window
+        self._index = 0
+        self.count = 0  # 累计样本数
+        self.total = 0.0  # 累计耗时（秒）
+
+    def observe(self, value):
+        self._samples[self._index % self.window] = value
+        self._index += 1
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)):
+        """最近 window 个样本的分位数（秒）"""
+        samples = sorted(self._samples[:min(self._index, self.window)])
+        if not samples:
+            return {q: 0.0 for q in qs}
+        return {q: samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))] for q in qs}
+
+
+class Metrics:
+    """按 (组件, 阶段) 汇总的耗时直方图和计数器
+
+    组件一般是摄像头编号，也可以是 fifo_writer、command_reader 等线程。
+    热路径上用 start = time.monotonic() ... metrics.observe(组件, 阶段, start) 计时。
+    """
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms = {}  # (组件, 阶段) -> RollingHistogram
+        self._counters = {}  # (组件, 事件) -> 计数
+
+    def _histogram(self, component, stage):
+        key = (component, stage)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, RollingHistogram(self.window))
+        return histogram
+
+    def observe(self, component, stage, start, end=None):
+        """记录一次阶段耗时，start/end 为 time.monotonic()，end 缺省为当前时间"""
+        self._histogram(component, stage).observe((time.monotonic() if end is None else end) - start)
+
+    def increment(self, component, event, count=1):
+        """计数器加 count"""
+        key = (component, event)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + count
+
+    def snapshot(self):
+        """当前统计：{组件: {"stages": {阶段: 分位数（毫秒）}, "counters": {事件: 计数}}}"""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        report = {}
+        for (component, stage), histogram in sorted(histograms):
+            q = histogram.quantiles()
+            report.setdefault(component, {"stages": {}, "counters": {}})["stages"][stage] = {
+                "count": histogram.count,
+                "mean_ms": 1000 * histogram.total / histogram.count if histogram.count else 0.0,
+                "p50_ms": 1000 * q[0.5],
+                "p95_ms": 1000 * q[0.95],
+                "p99_ms": 1000 * q[0.99],
+            }
+        for (component, event), count in sorted(counters):
+            report.setdefault(component, {"stages": {}, "counters": {}})["counters"][event] = count
+        return report
+
+    def prometheus_text(self, prefix="radar_cam"):
+        """Prometheus 文本格式：阶段耗时为 summary（秒），计数器为 counter"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = [f"# HELP {prefix}_stage_seconds 各阶段耗时（最近样本的分位数）",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        for (component, stage), histogram in histograms:
+            labels = f'component="{component}",stage="{stage}"'
+            for q, value in histogram.quantiles().items():
+                lines.append(f'{prefix}_stage_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {histogram.count}")
+        lines += [f"# HELP {prefix}_events_total 事件计数",
+                  f"# TYPE {prefix}_events_total counter"]
+        for (component, event), count in counters:
+            lines.append(f'{prefix}_events_total{{component="{component}",event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """写入 node_exporter textfile collector 使用的 .prom 文件（先写临时文件再改名，避免读到半个文件）"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def run_exporter(self, path, interval=10.0):
+        """导出线程主体：每隔 interval 秒写一次 Prometheus 文本文件"""
+        while True:
+            time.sleep(interval)
+            try:
+                self.write_textfile(path)
+            except OSError as e:
+                print(f"写入指标文件 {path} 失败: {e}")
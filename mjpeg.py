@@ -0,0 +1,83 @@
+"""MJPEG 采集：USB摄像头以 MJPG 格式出流，采集线程只保存压缩数据，取帧时才按模型需要的尺寸降采样解码
+
+两个摄像头共用一个USB控制器时，640x480@30 的 YUYV 每路约 18 MB/s，常常只能降帧率或第二个摄像头打不开；
+MJPEG 每帧一般只有几十KB。libjpeg 的缩小解码（IMREAD_REDUCED_COLOR_2/4/8）在 IDCT 阶段直接输出
+1/2、1/4、1/8 尺寸，比全尺寸解码再缩放省得多。
+"""
+import cv2
+import numpy as np
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+# 缩小倍数 -> cv2.imdecode 标志
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def decode_scale(width, height, imgsz):
+    """不低于模型输入尺寸 imgsz 的最大缩小倍数（1、2、4、8），imgsz 为 None 时不缩小"""
+    if not imgsz:
+        return 1
+    scale = 1
+    for candidate in (2, 4, 8):
+        if max(width, height) / candidate >= imgsz:
+            scale = candidate
+    return scale
+
+
+def is_jpeg(data):
+    """是否为未解码的JPEG数据（V4L2 原始模式返回的一维/单行 uint8 缓冲）"""
+    return data.dtype == np.uint8 and (data.ndim == 1 or data.shape[0] == 1) and data.size > 2 \
+        and data.flat[0] == 0xFF and data.flat[1] == 0xD8
+
+
+def decode_jpeg(data, scale=1):
+    """按缩小倍数解码JPEG，数据已经是解码后的图像时原样返回；数据损坏时返回 None"""
+    if not is_jpeg(data):
+        return data
+    return cv2.imdecode(data.reshape(-1), REDUCED_DECODE_FLAGS[scale])
+
+
+def open_mjpeg_capture(source, width=640, height=480, fps=30):
+    """以 MJPG 格式打开V4L2摄像头，并切换为原始模式（read() 返回压缩数据）
+
+    返回 (cap, raw)：摄像头不支持 MJPG 时 cap 照常返回解码后的图像，raw 为 False；
+    打开失败时 cap 为 None。
+    """
+    cap = cv2.VideoCapture(source, cv2.CAP_V4L2)
+    if not cap.isOpened():
+        return None, False
+
+    # 先设置格式再设置分辨率和帧率，部分驱动在格式切换时会重置分辨率
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, "little").decode("ascii", "replace")
+    if fourcc != "MJPG":
+        print(f"摄像头 {source} 不支持 MJPG（当前格式 {fourcc}），使用驱动解码后的图像")
+        return cap, False
+
+    # V4L2 后端：CAP_PROP_FORMAT=-1 为原始模式，关闭 CONVERT_RGB 后 MJPEG 帧不再由 OpenCV 解码
+    raw = cap.set(cv2.CAP_PROP_FORMAT, -1)
+    raw = cap.set(cv2.CAP_PROP_CONVERT_RGB, 0) or raw
+    return cap, raw
+
+
+def split_jpeg_stream(data):
+    """把录制的 MJPEG 流（首尾相接的JPEG，如 ffmpeg -c copy -f mjpeg 录制的文件）拆分为单帧，返回字节串列表
+
+    按“EOI 紧跟 SOI”切分，帧内缩略图的 EOI 后面不会紧跟 SOI。
+    """
+    start = data.find(JPEG_SOI)
+    if start < 0:
+        return []
+    frames = data[start:].split(JPEG_EOI + JPEG_SOI)
+    if len(frames) == 1:
+        return frames
+    return [frames[0] + JPEG_EOI] + [JPEG_SOI + f + JPEG_EOI for f in frames[1:-1]] + [JPEG_SOI + frames[-1]]
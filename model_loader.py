@@ -0,0 +1,71 @@
+import threading
+import time
+
+
+class ModelLoader:
+    """在后台线程加载并预热模型，加载期间命令FIFO照常收发，检测命令排队等待
+
+    load_fn() 返回模型；warmup_fn(model) 用假帧做几次推理，返回每次调用的耗时（秒），
+    第一次调用包含后端的一次性初始化，预热完成后才算就绪。
+    start_time 为进程启动时的 time.monotonic()，各阶段耗时记入 metrics 的 startup 组件。
+    """
+
+    def __init__(self, load_fn, warmup_fn=None, metrics=None, start_time=None):
+        self.load_fn = load_fn
+        self.warmup_fn = warmup_fn
+        self.metrics = metrics
+        self.start_time = time.monotonic() if start_time is None else start_time
+        self._done = threading.Event()  # 加载成功或失败后置位
+        self._thread = None
+        self.model = None
+        self.error = None  # 加载或预热失败时的异常
+        self.timings = {}  # 阶段 -> 秒
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    def start(self):
+        """启动加载线程"""
+        self._thread = threading.Thread(target=self._run, name="model-loader")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """等待加载结束，返回模型是否就绪（加载失败时返回 False）"""
+        self._done.wait(timeout)
+        return self.ready
+
+    def _record(self, stage, start, end):
+        self.timings[stage] = end - start
+        if self.metrics is not None:
+            self.metrics.observe("startup", stage, start, end)
+
+    def _run(self):
+        try:
+            start = time.monotonic()
+            model = self.load_fn()
+            loaded = time.monotonic()
+            self._record("model_load", start, loaded)
+            print(f"模型加载完成，耗时 {(loaded - start) * 1000:.0f} ms")
+
+            if self.warmup_fn is not None:
+                durations = self.warmup_fn(model)
+                warmed = time.monotonic()
+                if durations:
+                    self._record("first_inference", loaded, loaded + durations[0])
+                self._record("warmup", loaded, warmed)
+                print(f"模型预热完成：{len(durations)} 次推理，首次 {durations[0] * 1000:.0f} ms，"
+                      f"共 {(warmed - loaded) * 1000:.0f} ms" if durations else "模型预热完成")
+
+            self.model = model
+        except Exception as e:
+            self.error = e
+            print(f"加载模型失败: {e}")
+            self._done.set()
+            return
+
+        ready = time.monotonic()
+        self._record("import_to_ready", self.start_time, ready)
+        self._done.set()
+        print(f"检测就绪：启动后 {(ready - self.start_time) * 1000:.0f} ms")
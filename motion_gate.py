@@ -0,0 +1,59 @@
+import time
+
+import cv2
+
+
+class MotionGate:
+    """推理前的运动门限：在缩小的灰度图上与上次推理时的画面做帧差
+
+    画面变化的像素占比低于 area_threshold 时跳过推理，沿用上一次的检测结果；
+    距上次推理超过 force_interval 秒时强制推理，保证静止的人也能刷新检测时间。
+    """
+
+    def __init__(self, scale_width=160, pixel_threshold=25, area_threshold=0.002, force_interval=1.0):
+        self.scale_width = scale_width
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.force_interval = force_interval
+        self._reference = None  # 上次推理时画面的缩小灰度图
+        self._last_inference = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+    def reset(self):
+        """清空参考画面，下一帧必定推理"""
+        self._reference = None
+
+    def _preprocess(self, frame):
+        height, width = frame.shape[:2]
+        scale_height = max(1, int(height * self.scale_width / width))
+        small = cv2.resize(frame, (self.scale_width, scale_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame, now=None):
+        """判断这一帧是否需要推理"""
+        now = time.monotonic() if now is None else now
+        gray = self._preprocess(frame)
+        self.frames += 1
+
+        run = self._reference is None or now - self._last_inference >= self.force_interval
+        if not run:
+            diff = cv2.absdiff(gray, self._reference)
+            changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+            run = changed >= self.area_threshold * diff.size
+
+        if run:
+            self._reference = gray
+            self._last_inference = now
+        else:
+            self.skipped += 1
+        return run
+
+    def stats(self):
+        """门限统计：处理帧数、跳过帧数和跳过比例"""
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / self.frames if self.frames else 0.0,
+        }
@@ -0,0 +1,33 @@
+import threading
+
+
+class PresenceAggregator:
+    """全局在场汇总：记录哪些摄像头的有人窗口还没有超时，维护其数量
+
+    摄像头被触发或检测到人时进入，超时或停止检测时离开；
+    是否所有摄像头都无人只需看计数，不再逐个摄像头加锁扫描。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._present = set()
+
+    def enter(self, camera_id):
+        """摄像头进入（或保持）有人状态"""
+        with self._lock:
+            self._present.add(camera_id)
+
+    def leave(self, camera_id):
+        """摄像头离开有人状态，返回仍处于有人状态的摄像头数量"""
+        with self._lock:
+            self._present.discard(camera_id)
+            return len(self._present)
+
+    def count(self):
+        with self._lock:
+            return len(self._present)
+
+    def present(self):
+        """当前处于有人状态的摄像头编号"""
+        with self._lock:
+            return sorted(self._present)
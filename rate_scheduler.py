@@ -0,0 +1,38 @@
+import time
+
+
+class InferenceRateScheduler:
+    """按检测状态调整单个摄像头的推理频率
+
+    - 雷达触发后搜索阶段：search_fps 全速推理
+    - 已确认有人且检测结果新鲜：降到 keepalive_fps 保活
+    - 距离无人超时还剩 ramp_window 秒内：线性升回 search_fps，避免漏掉最后的检测机会
+    休眠时间按目标周期扣除本帧实际耗时计算。
+    """
+
+    def __init__(self, search_fps=30, keepalive_fps=2, timeout=3, ramp_window=1.0):
+        self.search_fps = search_fps
+        self.keepalive_fps = keepalive_fps
+        self.timeout = timeout
+        self.ramp_window = ramp_window
+
+    def target_fps(self, now, last_detection_time, person_confirmed):
+        """当前状态下的目标推理帧率"""
+        if not person_confirmed or last_detection_time <= 0:
+            return self.search_fps
+
+        remaining = last_detection_time + self.timeout - now
+        if remaining >= self.ramp_window:
+            return self.keepalive_fps
+
+        # 临近超时，线性升回搜索帧率
+        progress = 1.0 - max(remaining, 0.0) / self.ramp_window if self.ramp_window > 0 else 1.0
+        return self.keepalive_fps + (self.search_fps - self.keepalive_fps) * progress
+
+    def next_delay(self, frame_start, last_detection_time, person_confirmed):
+        """本帧处理完后应休眠的秒数，frame_start 为本帧开始时的 time.monotonic()"""
+        fps = self.target_fps(time.time(), last_detection_time, person_confirmed)
+        if fps <= 0:
+            return 0.0
+        elapsed = time.monotonic() - frame_start
+        return max(0.0, 1.0 / fps - elapsed)
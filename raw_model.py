@@ -0,0 +1,238 @@
+"""直接处理模型原始输出的人员检测：跳过 Ultralytics 的 Results/Boxes 对象构造，
+用 NumPy 数组运算完成置信度过滤和 NMS，结果为紧凑的检测数组
+
+原始输出为 YOLOv8/YOLO11 检测头的 (batch, 4 + 类别数, 锚点数) 张量（如 yolo11n 640 输入为 (1, 84, 8400)），
+前4行为输入图像上的 cx, cy, w, h，其余为各类别置信度（已过 sigmoid）。
+后端只需返回该张量：ONNX 模型用 OpenCV DNN 运行，RKNN 模型用 rknn-toolkit-lite2 运行（可选依赖，使用时才导入）。
+"""
+import cv2
+import numpy as np
+
+from inference_engine import PERSON_CLASS
+
+
+def letterbox(frame, imgsz, pad_value=114, out=None):
+    """等比缩放并填充到 imgsz x imgsz（与 Ultralytics LetterBox 的取整一致），返回 (图像, 缩放比, (左填充, 上填充))
+
+    out 为预分配的 (imgsz, imgsz, 3) uint8 画布时，缩放结果直接写入画布中间、四周填充，不分配新数组。
+    """
+    height, width = frame.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (imgsz - new_width) / 2, (imgsz - new_height) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    if out is None:
+        if (new_width, new_height) != (width, height):
+            frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        image = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                                   value=(pad_value, pad_value, pad_value))
+        return image, ratio, (left, top)
+
+    out[:top] = pad_value
+    out[top + new_height:] = pad_value
+    out[top:top + new_height, :left] = pad_value
+    out[top:top + new_height, left + new_width:] = pad_value
+    region = out[top:top + new_height, left:left + new_width]
+    if (new_width, new_height) != (width, height):
+        cv2.resize(frame, (new_width, new_height), dst=region, interpolation=cv2.INTER_LINEAR)
+    else:
+        np.copyto(region, frame)
+    return out, ratio, (left, top)
+
+
+def nms(boxes, scores, iou_threshold):
+    """贪心NMS，boxes 为 (n, 4) 的 x1y1x2y2、已按置信度降序排列；返回保留的下标
+
+    与 torchvision.ops.nms 一致：与已保留框的 IoU 大于阈值的框被抑制。
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.arange(len(scores))
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.intp)
+
+
+class PersonDecoder:
+    """把原始输出解码为人员检测数组 (n, 5)：原图坐标的 x1, y1, x2, y2 和置信度，按置信度降序
+
+    与 Ultralytics 的 predict(classes=[0]) 结果一致：只保留 person 是最高分类别、且置信度超过阈值的锚点，
+    再做 NMS。先用 person 一行过滤出少量候选，再只对候选检查是否为最高分类别，不对全部锚点求 argmax。
+    掩码和输出缓冲按锚点数和 max_det 预先分配，逐帧复用。
+    """
+
+    def __init__(self, num_anchors=8400, iou=0.7, max_det=300, person_class=PERSON_CLASS):
+        self.iou = iou
+        self.max_det = max_det
+        self.person_class = person_class
+        self._mask = np.empty(num_anchors, dtype=bool)
+        self._detections = np.empty((max_det, 5), dtype=np.float32)
+
+    def decode(self, output, conf=0.25, ratio=1.0, pad=(0, 0), orig_shape=None):
+        """output 为单张图的 (4 + 类别数, 锚点数) 原始输出；返回的数组是内部缓冲的视图，下次 decode 前有效"""
+        scores = output[4 + self.person_class]
+        if self._mask.shape[0] != scores.shape[0]:
+            self._mask = np.empty(scores.shape[0], dtype=bool)
+        np.greater(scores, conf, out=self._mask)
+        candidates = np.flatnonzero(self._mask)
+        if candidates.size == 0:
+            return self._detections[:0]
+
+        # 候选中 person 必须是最高分类别（Ultralytics 默认每个锚点只取最高分类别）
+        candidate_scores = scores[candidates]
+        class_max = output[4:, candidates].max(axis=0)
+        best = candidate_scores >= class_max
+        candidates, candidate_scores = candidates[best], candidate_scores[best]
+        if candidates.size == 0:
+            return self._detections[:0]
+
+        order = np.argsort(-candidate_scores, kind="stable")
+        candidates, candidate_scores = candidates[order], candidate_scores[order]
+        cx, cy, w, h = output[:4, candidates]
+        boxes = np.stack((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2), axis=1)
+        keep = nms(boxes, candidate_scores, self.iou)[:self.max_det]
+
+        count = keep.size
+        detections = self._detections[:count]
+        detections[:, :4] = boxes[keep]
+        detections[:, 4] = candidate_scores[keep]
+        # 映射回原图坐标（步长切片是视图，原地修改）
+        xs, ys = detections[:, 0:4:2], detections[:, 1:4:2]
+        xs -= pad[0]
+        ys -= pad[1]
+        detections[:, :4] /= ratio
+        if orig_shape is not None:
+            np.clip(xs, 0, orig_shape[1], out=xs)
+            np.clip(ys, 0, orig_shape[0], out=ys)
+        return detections
+
+
+class RawBoxes:
+    """检测数组上的 Boxes 兼容视图（person_presence 等只用到 cls/conf/xyxy）"""
+
+    def __init__(self, detections, person_class=PERSON_CLASS):
+        self.data = detections
+        self.xyxy = detections[:, :4]
+        self.conf = detections[:, 4]
+        self.cls = np.full(len(detections), person_class, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class RawResult:
+    """单帧结果：boxes 为 RawBoxes，detections 为 (n, 5) 检测数组"""
+
+    names = {PERSON_CLASS: "person"}
+
+    def __init__(self, detections, orig_shape):
+        self.detections = detections
+        self.boxes = RawBoxes(detections)
+        self.orig_shape = orig_shape
+
+
+class TensorBackend:
+    """输入为 NCHW、RGB、0~1 浮点张量的后端：把 letterbox 后的图像写入按批大小预分配的张量，再交给 infer(tensor)"""
+
+    def __init__(self, reuse_buffers=True):
+        self.reuse_buffers = reuse_buffers
+        self._tensors = {}  # 批大小 -> 预分配的输入张量
+
+    def infer(self, tensor):
+        raise NotImplementedError
+
+    def __call__(self, images):
+        if not self.reuse_buffers:
+            return self.infer(cv2.dnn.blobFromImages(images, scalefactor=1 / 255.0, swapRB=True))
+        height, width = images[0].shape[:2]
+        tensor = self._tensors.get(len(images))
+        if tensor is None or tensor.shape[2:] != (height, width):
+            tensor = self._tensors[len(images)] = np.empty((len(images), 3, height, width), dtype=np.float32)
+        for image, plane in zip(images, tensor):
+            # HWC BGR -> CHW RGB 的转置视图，归一化结果直接写入张量
+            np.multiply(image.transpose(2, 0, 1)[::-1], np.float32(1 / 255.0), out=plane)
+        return self.infer(tensor)
+
+
+class OnnxBackend(TensorBackend):
+    """用 OpenCV DNN 运行 ONNX 模型，返回原始输出"""
+
+    def __init__(self, path, reuse_buffers=True):
+        super().__init__(reuse_buffers)
+        self.net = cv2.dnn.readNetFromONNX(path)
+
+    def infer(self, tensor):
+        self.net.setInput(tensor)
+        return self.net.forward()
+
+
+class RknnBackend:
+    """用 rknn-toolkit-lite2 在 NPU 上运行 RKNN 模型（输入为 NHWC 的 RGB uint8），返回原始输出"""
+
+    def __init__(self, path):
+        from rknnlite.api import RKNNLite
+        self.rknn = RKNNLite()
+        if self.rknn.load_rknn(path) != 0:
+            raise RuntimeError(f"加载RKNN模型 {path} 失败")
+        if self.rknn.init_runtime(core_mask=RKNNLite.NPU_CORE_AUTO) != 0:
+            raise RuntimeError("初始化RKNN运行时失败")
+        self._rgb = None  # 预分配的 RGB 输入
+
+    def __call__(self, images):
+        if self._rgb is None or self._rgb.shape != images[0].shape:
+            self._rgb = np.empty_like(images[0])
+        outputs = []
+        for image in images:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            outputs.append(self.rknn.inference(inputs=[self._rgb[np.newaxis]])[0])
+        return outputs[0] if len(outputs) == 1 else np.concatenate(outputs, axis=0)
+
+
+class RawPersonModel:
+    """固定输入尺寸的人员检测模型：letterbox 预处理、后端推理、PersonDecoder 解码
+
+    接口与 Ultralytics 模型的 predict() 兼容，可直接交给 InferenceEngine；
+    导出的模型输入尺寸固定，imgsz 参数不改变实际输入尺寸。
+    reuse_buffers 时 letterbox 写入按批内位置预分配的画布（推理只在推理引擎线程中进行，画布不会被并发使用）。
+    """
+
+    def __init__(self, backend, imgsz=640, iou=0.7, max_det=300, reuse_buffers=True):
+        self.backend = backend
+        self.imgsz = imgsz
+        self.reuse_buffers = reuse_buffers
+        self.decoder = PersonDecoder(iou=iou, max_det=max_det)
+        self._canvases = []
+
+    @classmethod
+    def load(cls, path, imgsz=640):
+        """按扩展名选择后端：.onnx 用 OpenCV DNN，.rknn 用 rknn-toolkit-lite2"""
+        backend = RknnBackend(path) if path.endswith(".rknn") else OnnxBackend(path)
+        return cls(backend, imgsz)
+
+    def predict(self, source, imgsz=None, conf=0.25, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        if self.reuse_buffers:
+            while len(self._canvases) < len(frames):
+                self._canvases.append(np.empty((self.imgsz, self.imgsz, 3), dtype=np.uint8))
+            boxed = [letterbox(frame, self.imgsz, out=canvas) for frame, canvas in zip(frames, self._canvases)]
+        else:
+            boxed = [letterbox(frame, self.imgsz) for frame in frames]
+        outputs = self.backend([image for image, _, _ in boxed])
+        conf = 0.25 if conf is None else conf
+        results = []
+        for output, frame, (_, ratio, pad) in zip(outputs, frames, boxed):
+            # 解码结果在内部缓冲上，拷贝后再交给调用方
+            detections = self.decoder.decode(output, conf, ratio, pad, frame.shape[:2]).copy()
+            results.append(RawResult(detections, frame.shape[:2]))
+        return results
+
+    __call__ = predict
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def radar_roi(calibration, params, frame_width, frame_height):
+    """按摄像头标定表把雷达给出的方位角或区域换算为画面中的感兴趣区域
+
+    params 来自扩展的 leida_ 命令（如 leida_cam1:az=35 或 leida_cam1:zone=2），
+    返回裁剪到画面范围内的 (x1, y1, x2, y2)；没有位置信息、标定缺失、方位角超出视场或区域面积为零时返回 None。
+    """
+    if not calibration or not params:
+        return None
+
+    zone = params.get("zone")
+    if zone is not None:
+        box = calibration.get("zones", {}).get(zone)
+        if box is None:
+            return None
+        try:
+            x1, y1, x2, y2 = (int(round(float(v))) for v in box)
+        except (TypeError, ValueError):
+            return None
+        return _clamp_box(x1, y1, x2, y2, frame_width, frame_height)
+
+    az = params.get("az")
+    if az is None or "az_range" not in calibration:
+        return None
+    try:
+        az = float(az)
+    except ValueError:
+        return None
+
+    az_left, az_right = calibration["az_range"]
+    if az_right == az_left:
+        return None
+    ratio = (az - az_left) / (az_right - az_left)
+    if not 0.0 <= ratio <= 1.0:
+        return None
+
+    # 以方位角对应的列为中心，取固定宽度、整幅高度的竖条
+    roi_width = min(int(calibration.get("roi_width", frame_width // 2)), frame_width)
+    x1 = int(round(ratio * frame_width - roi_width / 2))
+    x1 = min(max(x1, 0), frame_width - roi_width)
+    return _clamp_box(x1, 0, x1 + roi_width, frame_height, frame_width, frame_height)
+
+
+def _clamp_box(x1, y1, x2, y2, frame_width, frame_height):
+    """把区域裁剪到画面范围内，面积为零时返回 None"""
+    x1, x2 = min(max(x1, 0), frame_width), min(max(x2, 0), frame_width)
+    y1, y2 = min(max(y1, 0), frame_height), min(max(y2, 0), frame_height)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def crop_roi(frame, roi):
+    """裁剪感兴趣区域，返回连续内存的数组"""
+    x1, y1, x2, y2 = roi
+    return np.ascontiguousarray(frame[y1:y2, x1:x2])
@@ -0,0 +1,367 @@
+"""合成视频源和桩模型，用于在没有摄像头和NPU的机器上测试与基准测试"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from mjpeg import split_jpeg_stream
+
+COCO_NAMES = {0: "person"}
+
+
+class StubBoxes:
+    """与 Ultralytics Boxes 接口兼容的检测框集合"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls, dtype=np.float32).reshape(-1)
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, index):
+        index = slice(index, index + 1) if isinstance(index, int) else index
+        return StubBoxes(self.xyxy[index], self.conf[index], self.cls[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class StubResult:
+    """与 Ultralytics Results 接口兼容的单帧结果"""
+
+    def __init__(self, boxes, orig_shape):
+        self.boxes = boxes
+        self.names = COCO_NAMES
+        self.orig_shape = orig_shape
+
+
+class StubModel:
+    """桩模型：按固定开销加逐帧开销模拟推理耗时，把画面中的亮块当作人
+
+    置信度随亮块在模型输入中的高度下降（小于 min_height 像素时线性衰减），
+    用来模拟小输入尺寸下远处目标的漏检。默认所有实例共用一把锁，模拟多个模型实例争用同一个NPU；
+    传入独立的 device_lock 可以模拟多核NPU上各自独占一个核。
+    load_delay 模拟加载模型的耗时，init_latency 模拟后端在第一次推理时的一次性初始化。
+    """
+
+    _device_lock = threading.Lock()
+
+    def __init__(self, base_latency=0.02, per_frame_latency=0.01, threshold=200, min_height=32, device_lock=None,
+                 load_delay=0.0, init_latency=0.0):
+        time.sleep(load_delay)
+        if device_lock is not None:
+            self._device_lock = device_lock
+        self.init_latency = init_latency
+        self.base_latency = base_latency
+        self.per_frame_latency = per_frame_latency
+        self.threshold = threshold
+        self.min_height = min_height
+        self.calls = 0
+
+    def _detect(self, frame, imgsz, conf):
+        mask = frame[..., 2] > self.threshold if frame.ndim == 3 else frame > self.threshold
+        ys, xs = np.nonzero(mask)
+        if len(xs) == 0:
+            return StubResult(StubBoxes([], [], []), frame.shape[:2])
+        box = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+        # 亮块在模型输入（长边缩放到 imgsz）中的高度
+        height = (box[3] - box[1]) * imgsz / max(frame.shape[:2])
+        score = 0.9 * min(1.0, height / self.min_height)
+        if score < conf:
+            return StubResult(StubBoxes([], [], []), frame.shape[:2])
+        return StubResult(StubBoxes([box], [score], [0]), frame.shape[:2])
+
+    def predict(self, source, imgsz=640, conf=0.25, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        # 逐帧开销按输入尺寸的像素数缩放
+        per_frame = self.per_frame_latency * (imgsz / 640) ** 2
+        with self._device_lock:
+            self.calls += 1
+            time.sleep(self.base_latency + per_frame * len(frames) + (self.init_latency if self.calls == 1 else 0.0))
+        return [self._detect(frame, imgsz, conf) for frame in frames]
+
+    def track(self, source, **kwargs):
+        return self.predict(source, **kwargs)
+
+    __call__ = predict
+
+
+class SyntheticCamera:
+    """模拟 cv2.VideoCapture 的合成视频源
+
+    按设定帧率出帧，画面中有一个左右移动的亮块代表人；
+    person_period 为 (有人秒数, 无人秒数) 的循环，None 表示一直有人。
+    realtime=False 时不按帧率阻塞，画面时间按帧号推算，用于快速生成“录制素材”。
+    """
+
+    def __init__(self, width=640, height=480, fps=30, person_period=None, open_delay=0.0,
+                 dark_frames=0, realtime=True):
+        time.sleep(open_delay)
+        self.realtime = realtime
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.person_period = person_period
+        self.dark_frames = dark_frames
+        self.frame_count = 0
+        self._opened = True
+        self._start = time.monotonic()
+        self._next_frame_time = self._start
+        self._background = np.full((height, width, 3), 60, dtype=np.uint8)
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return 0
+
+    def release(self):
+        self._opened = False
+
+    def person_visible(self, t=None):
+        """t 时刻（相对打开时间）画面中是否有人"""
+        if self.person_period is None:
+            return True
+        if t is None:
+            t = self._elapsed()
+        on, off = self.person_period
+        return (t % (on + off)) < on
+
+    def _elapsed(self):
+        """当前画面对应的时间（秒）"""
+        if self.realtime:
+            return time.monotonic() - self._start
+        return self.frame_count / self.fps
+
+    def grab(self):
+        if not self._opened:
+            return False
+        if not self.realtime:
+            self.frame_count += 1
+            return True
+        # 和真实摄像头一样，按帧率阻塞等待下一帧
+        now = time.monotonic()
+        if self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+        self._next_frame_time = max(self._next_frame_time + 1.0 / self.fps, time.monotonic())
+        self.frame_count += 1
+        return True
+
+    def retrieve(self, image=None):
+        if image is None or image.shape != self._background.shape:
+            image = np.empty_like(self._background)
+        if self.frame_count <= self.dark_frames:
+            # 模拟自动曝光尚未收敛时的暗帧
+            image.fill(0)
+            return True, image
+        image[...] = self._background
+        t = self._elapsed()
+        if self.person_visible(t):
+            x = int((t * 80) % (self.width - 80))
+            image[150:400, x:x + 80] = 255
+        return True, image
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+
+class SceneCamera(SyntheticCamera):
+    """由场景目录控制的合成摄像头，供端到端基准测试的雷达模拟端编排场景
+
+    场景目录中存在 person 文件时画面中有人；打开和释放时分别写入 opened、released 文件，
+    内容为当时的 time.monotonic()（系统范围单调时钟，其他进程可以直接比较）。
+    """
+
+    def __init__(self, scene_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.scene_dir = scene_dir
+        self._person_path = os.path.join(scene_dir, "person")
+        self._write_marker("opened")
+
+    def _write_marker(self, name):
+        path = os.path.join(self.scene_dir, name)
+        with open(path + ".tmp", "w") as f:
+            f.write(repr(time.monotonic()))
+        os.replace(path + ".tmp", path)
+
+    def person_visible(self, t=None):
+        return os.path.exists(self._person_path)
+
+    def release(self):
+        if self._opened:
+            self._write_marker("released")
+        super().release()
+
+
+class VideoFileCamera:
+    """按录制素材自身帧率出帧、播完从头循环的视频文件源，模拟实时摄像头"""
+
+    def __init__(self, path, fps=None):
+        self.path = path
+        self._cap = cv2.VideoCapture(path)
+        self.fps = fps or self._cap.get(cv2.CAP_PROP_FPS) or 30
+        self._next_frame_time = time.monotonic()
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def release(self):
+        self._cap.release()
+
+    def grab(self):
+        now = time.monotonic()
+        if self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+        self._next_frame_time = max(self._next_frame_time + 1.0 / self.fps, time.monotonic())
+        if self._cap.grab():
+            return True
+        # 播完后从头循环
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self._cap.grab()
+
+    def retrieve(self, image=None):
+        return self._cap.retrieve(image)
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+
+class MjpegFileCamera:
+    """循环播放录制的 MJPEG 流（首尾相接的JPEG），read() 像V4L2原始模式一样返回未解码的压缩数据"""
+
+    def __init__(self, path, fps=30):
+        with open(path, "rb") as f:
+            self._frames = [np.frombuffer(frame, dtype=np.uint8) for frame in split_jpeg_stream(f.read())]
+        self.fps = fps
+        self._index = 0
+        self._next_frame_time = time.monotonic()
+
+    def isOpened(self):
+        return bool(self._frames)
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FOURCC:
+            return cv2.VideoWriter_fourcc(*"MJPG")
+        return 0
+
+    def release(self):
+        pass
+
+    def grab(self):
+        now = time.monotonic()
+        if self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+        self._next_frame_time = max(self._next_frame_time + 1.0 / self.fps, time.monotonic())
+        self._index = (self._index + 1) % len(self._frames)
+        return True
+
+    def retrieve(self, image=None):
+        return True, self._frames[self._index]
+
+    def read(self, image=None):
+        self.grab()
+        return self.retrieve()
+
+
+def load_stub_model(name):
+    """按名称创建桩模型，不是桩模型时返回 None
+
+    stub                 桩模型
+    stub:3,0.5           加载耗时3秒、第一次推理额外耗时0.5秒的桩模型（模拟模型加载和后端初始化）
+    """
+    kind, _, arg = name.partition(":")
+    if kind != "stub":
+        return None
+    delays = [float(v) for v in arg.split(",")] if arg else []
+    return StubModel(**dict(zip(("load_delay", "init_latency"), delays)))
+
+
+def open_test_source(spec):
+    """按测试视频源描述打开视频源，不是测试源时返回 None
+
+    synthetic         合成画面，一直有人
+    synthetic:4,6     合成画面，有人4秒、无人6秒循环
+    scene:<目录>      由场景目录控制有没有人（见 SceneCamera）
+    file:<路径>       按素材帧率循环播放的录制视频
+    mjpeg:<路径>      循环播放录制的 MJPEG 流，输出未解码的JPEG数据（30 FPS）
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "synthetic":
+        period = tuple(float(v) for v in arg.split(",")) if arg else None
+        return SyntheticCamera(person_period=period)
+    if kind == "scene":
+        return SceneCamera(arg)
+    if kind == "file":
+        return VideoFileCamera(arg)
+    if kind == "mjpeg":
+        return MjpegFileCamera(arg)
+    return None
+
+
+def raw_frame_timestamp(frame):
+    """读取 write_raw_stream 写在帧开头8个字节里的采集时间（time.monotonic()）"""
+    return float(frame.reshape(-1)[:8].view(np.float64)[0])
+
+
+def write_raw_stream(fd, width=640, height=480, fps=30, frames=None, down_file=None):
+    """RTSP摄像头的替身：按帧率把合成画面以 BGR rawvideo 写入 fd（与 ffmpeg -f rawvideo -pix_fmt bgr24 输出相同）
+
+    每帧开头8个字节是该帧的计划采集时间（time.monotonic()，跨进程可比），读者据此计算帧龄；
+    读者跟不上、写入阻塞时帧仍按时间表采集并排队发送（相当于网络和解码器里的缓冲），读者看到的帧龄会持续增长。
+    写完 frames 帧后退出（模拟断流）；down_file 存在时不输出任何帧直接退出（模拟摄像头离线、连接失败）。
+    """
+    if down_file is not None and os.path.exists(down_file):
+        return 1
+    camera = SyntheticCamera(width, height, fps=fps, realtime=False)
+    start = time.monotonic()
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    count = 0
+    while frames is None or count < frames:
+        scheduled = start + count / fps
+        now = time.monotonic()
+        if scheduled > now:
+            time.sleep(scheduled - now)
+        camera.read(image)
+        image.reshape(-1)[:8].view(np.float64)[0] = scheduled
+        try:
+            os.write(fd, image.data)
+        except BrokenPipeError:
+            return 0
+        count += 1
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把合成画面以 BGR rawvideo 写到标准输出，作为RTSP摄像头（ffmpeg 管道）的替身")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--frames", type=int, default=None, help="写完多少帧后退出（模拟断流）")
+    parser.add_argument("--down-file", default=None, help="该文件存在时直接退出（模拟摄像头离线）")
+    args = parser.parse_args()
+    raise SystemExit(write_raw_stream(1, args.width, args.height, args.fps, args.frames, args.down_file))
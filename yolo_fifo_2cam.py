@@ -1,79 +1,320 @@
+import time
+process_start_time = time.monotonic()  # 启动耗时的起点，在导入其他模块之前记录
+import json
 import os
-import fcntl
 import threading
-import time
 import cv2
-from ultralytics import YOLO
+import numpy as np
+from inference_engine import InferenceEngine, person_boxes, person_presence
+from frame_grabber import LatestFrameGrabber
+from rate_scheduler import InferenceRateScheduler
+from detection_publisher import DetectionPublisher
+from fifo_writer import FifoWriter
+from command_reader import CommandReader, parse_command
+from camera_worker import CameraWorker, START, STOP, TIMEOUT
+from motion_gate import MotionGate
+from roi import radar_roi, crop_roi
+from cascade import ResolutionCascade
+from frame_ring import FrameRingWriter
+from camera_process import CameraProcess, supervise
+from synthetic import load_stub_model, open_test_source
+from metrics import Metrics
+from camera_config import load_camera_config
+from presence import PresenceAggregator
+from deadline_scheduler import DeadlineScheduler
+from mjpeg import decode_jpeg, decode_scale, open_mjpeg_capture
+from raw_model import RawPersonModel
+from frame_pool import FramePool
+from model_loader import ModelLoader
+from detection_log import DetectionLogWriter, check_camera_id
+from clip_recorder import ClipRecorder
+
+# 运行环境覆盖（端到端基准测试、调试用），未设置时使用下面的默认值：
+#   RADAR_CAM_CONFIG        摄像头配置文件路径，默认为本目录下的 cameras.json
+#   RADAR_CAM_SEND_FIFO / RADAR_CAM_RECE_FIFO  命令FIFO和输出FIFO路径
+#   RADAR_CAM_SOURCES       视频源（可以新增摄像头），如 cam1=scene:/tmp/cam1,cam2=file:clip.mp4（测试源格式见 synthetic.open_test_source）
+#   RADAR_CAM_MODEL         模型路径，stub 为桩模型（stub:3,0.5 模拟加载3秒、首次推理多0.5秒）
+#   RADAR_CAM_PROCESS_MODE  为 1 时启用多进程模式
+#   RADAR_CAM_SESSION_LOG   每轮检测结束时追加一行JSON会话统计的文件
+#   RADAR_CAM_STATS_JSON / RADAR_CAM_METRICS_TEXTFILE  stats 命令的JSON输出和Prometheus文本文件路径
+#   RADAR_CAM_DETECTION_LOG 检测事件日志目录
+#   RADAR_CAM_CLIP_DIR      触发前后视频片段的保存目录
 
 # FIFO 文件路径
-fifo_path = '/home/cat/leida_test/Z_pavo2__test/send_PYTHON'
-fifo1_path = '/home/cat/leida_test/Z_pavo2__test/rece_PYTHON'
+fifo_path = os.environ.get("RADAR_CAM_SEND_FIFO", '/home/cat/leida_test/Z_pavo2__test/send_PYTHON')
+fifo1_path = os.environ.get("RADAR_CAM_RECE_FIFO", '/home/cat/leida_test/Z_pavo2__test/rece_PYTHON')
+
+# 摄像头配置：每个摄像头的视频源、雷达区域标定等，见 cameras.json
+camera_config_path = os.environ.get("RADAR_CAM_CONFIG",
+                                    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cameras.json"))
+camera_config = load_camera_config(camera_config_path)
+for source_override in filter(None, os.environ.get("RADAR_CAM_SOURCES", "").split(",")):
+    cam_id, _, source = source_override.partition("=")
+    camera_config.setdefault(cam_id.strip(), {})["source"] = source.strip()
 
 # USB摄像头源
-camera_sources = {
-    "cam1": "/dev/video1",  # 第一个USB摄像头
-    "cam2": "/dev/video3"   # 第二个USB摄像头
-}
+camera_sources = {cam_id: settings["source"] for cam_id, settings in camera_config.items()}
 
-# 加载预训练的 YOLO 模型
-models = {
-    "cam1": YOLO("yolo11n_rknn_model"),
-    "cam2": YOLO("yolo11n_rknn_model")
-}
+def load_model(name):
+    """加载模型，stub 为不依赖NPU的桩模型（见 synthetic.load_stub_model）；
+    .onnx/.rknn 为直接处理原始输出的人员检测模型（不构造 Results 对象），只支持 presence 模式"""
+    stub = load_stub_model(name)
+    if stub is not None:
+        return stub
+    if name.endswith((".onnx", ".rknn")):
+        if detection_mode == "track":
+            raise ValueError(f"原始输出模型 {name} 只支持 presence 模式，track 模式需要 Ultralytics 模型")
+        return RawPersonModel.load(name)
+    from ultralytics import YOLO
+    return YOLO(name)
+
+# 预训练的 YOLO 模型（所有摄像头共享同一个模型实例），启动后在后台加载，见下文 model_loader
+model_name = os.environ.get("RADAR_CAM_MODEL", "yolo11n_rknn_model")
+
+# 分阶段耗时指标：检测循环各阶段和FIFO线程的滚动分位数（p50/p95/p99）与计数器；
+# stats 命令打印当前统计并写入JSON文件，导出线程定期写入 node_exporter 的 Prometheus 文本文件
+metrics = Metrics(window=1024)
+metrics_json_path = os.environ.get("RADAR_CAM_STATS_JSON", '/home/cat/leida_test/Z_pavo2__test/yolo_stats.json')
+metrics_textfile_path = os.environ.get("RADAR_CAM_METRICS_TEXTFILE", '/home/cat/leida_test/Z_pavo2__test/yolo_fifo.prom')
+metrics_export_interval = 10.0  # 写入Prometheus文本文件的间隔（秒）
+
+# 检测事件日志：每次推理的结果（时间、摄像头、人数、最高置信度、人员框）由写入线程以定长二进制记录追加写入，
+# 按大小轮转；用 detection_log.DetectionLogReader 内存映射查询，见 detection_log.py
+detection_log_enabled = True
+detection_log_dir = os.environ.get("RADAR_CAM_DETECTION_LOG", '/home/cat/leida_test/Z_pavo2__test/detection_log')
+detection_log_max_mb = 64  # 单个文件的大小上限（每条记录192字节，约35万条）
+detection_log_max_files = 16  # 保留的文件数
+detection_log = DetectionLogWriter(detection_log_dir, max_bytes=detection_log_max_mb * 1024 * 1024,
+                                   max_files=detection_log_max_files) if detection_log_enabled else None
+if detection_log_enabled:
+    # 记录中的摄像头编号最长8字节，启动时检查，不要等到检测中才出错
+    for cam_id in camera_sources:
+        check_camera_id(cam_id)
+
+# 推理引擎：把各摄像头的最新帧合并成一批推理
+inference_max_batch = 2  # 单批最多帧数，后端不支持批量时会自动退回逐帧推理
+inference_max_wait = 0.02  # 凑批最长等待时间（秒）
+# 推理模式："presence" 只检测 person 类别且不跑跟踪器；"track" 全类别检测加跟踪器（需要跟踪ID时使用）
+detection_mode = "presence"
+inference_engine = InferenceEngine(None, max_batch=inference_max_batch, max_wait=inference_max_wait,
+                                   mode=detection_mode, metrics=metrics)
 
 # 全局变量，用于控制YOLO识别
 yolo_status = {
-    "cam1": {
-        "running": False,
-        "person_detected": False,
-        "last_detection_time": 0
-    },
-    "cam2": {
+    cam_id: {
         "running": False,
-        "person_detected": False,
-        "last_detection_time": 0
+        "last_detection_time": 0,
+        "trigger_time": 0,
+        "radar_target": None  # 最近一次 leida_ 命令携带的位置参数 (params, time.monotonic())
     }
+    for cam_id in camera_sources
 }
 person_detection_timeout = 3  # 3秒无人检测则自动关闭YOLO
 
-# 创建锁，用于线程间同步
-yolo_locks = {
-    "cam1": threading.Lock(),
-    "cam2": threading.Lock()
-}
-# 视频流资源锁
-stream_locks = {
-    "cam1": threading.Lock(),
-    "cam2": threading.Lock()
+# 全局在场汇总：有人窗口未超时的摄像头计数，计数为0时才发送无人检测信号
+presence = PresenceAggregator()
+
+# 输出FIFO的唯一写入者：非阻塞打开、有界队列、自动重连，检测和计时代码只往队列里放消息
+output_queue_size = 64  # 发送队列上限，满了丢弃最旧的消息
+fifo_writer = FifoWriter(fifo1_path, max_queue=output_queue_size, metrics=metrics)
+
+# 检测结果发布：检测线程报告检测事件，立即交给写入线程发送
+# 连续多少秒没有检测到人后允许再次发送person消息；必须大于持续有人时两次推理的最长间隔
+# （运动门限的强制推理间隔加一个保活帧周期），否则静止的人会被每次推理重新发送一遍，见下方运动门限之后的检查
+publish_rearm_interval = 2.0
+detection_publisher = DetectionPublisher(fifo_writer, rearm_interval=publish_rearm_interval)
+
+# 推理频率调度：触发后全速搜索，确认有人后降频保活，临近超时再升回全速
+search_fps = 30  # 搜索阶段目标帧率
+keepalive_fps = 2  # 确认有人后的保活帧率
+ramp_window = 1.0  # 距离超时还剩多少秒开始升频
+rate_schedulers = {
+    cam_id: InferenceRateScheduler(search_fps, keepalive_fps, person_detection_timeout, ramp_window)
+    for cam_id in camera_sources
 }
 
-# 视频流对象
-cameras = {
-    "cam1": None,
-    "cam2": None
+# 雷达引导的感兴趣区域：leida_camX:az=方位角 或 leida_camX:zone=区域编号
+# 标定表（摄像头配置中的 calibration）把雷达位置映射到画面区域，只在该区域上以较小的输入尺寸推理：
+#   az_range 画面左边缘、右边缘对应的雷达方位角（度），roi_width 方位角对应的裁剪宽度（像素），
+#   zones 区域编号 -> [x1, y1, x2, y2]
+camera_calibration = {cam_id: settings.get("calibration") for cam_id, settings in camera_config.items()}
+# 区域推理的输入尺寸，None 为模型默认尺寸；RKNN等固定输入尺寸的后端需要按该尺寸另行导出模型后再改小
+roi_imgsz = None
+roi_max_misses = 10  # 区域内连续多少次推理未检测到人后回退到全画面搜索
+
+# 分辨率级联：先以小输入尺寸、低阈值粗筛，有候选人员时再以全分辨率复核后才发送 person_camX
+# 固定输入尺寸的后端（如RKNN）需要按 cascade_screen_imgsz 另行导出模型后再启用
+cascade_enabled = False
+cascade_screen_imgsz = 320  # 粗筛输入尺寸
+cascade_screen_conf = 0.1  # 粗筛置信度阈值（偏低，尽量不漏掉候选）
+cascade_confirm_conf = 0.25  # 复核置信度阈值，复核输入尺寸为全画面默认尺寸或 roi_imgsz
+
+# 运动门限：画面相对上次推理无明显变化时跳过推理，沿用上一次的检测结果
+motion_gate_enabled = True
+motion_pixel_threshold = 25  # 缩小灰度图上差值超过该值的像素视为变化
+motion_area_threshold = 0.002  # 变化像素占比超过该值才推理
+motion_force_interval = 1.0  # 最长多少秒强制推理一次（需小于无人超时时间）
+
+# 持续有人时两次推理的最长间隔：保活帧率下取帧，画面静止时强制推理间隔到了之后的下一帧才推理，
+# person_camX 的重新发送间隔必须比它长
+max_inference_gap = 1.0 / keepalive_fps + (motion_force_interval if motion_gate_enabled else 0.0)
+if publish_rearm_interval <= max_inference_gap:
+    raise ValueError(f"publish_rearm_interval（{publish_rearm_interval}秒）必须大于两次推理的最长间隔"
+                     f"（{max_inference_gap}秒），否则持续有人时会重复发送 person_camX")
+
+# 采集格式（摄像头配置中的 format/width/height 可按摄像头覆盖）：
+# MJPG 时摄像头输出压缩帧，采集线程只保存压缩数据，检测循环取帧时才按模型输入尺寸降采样解码，
+# 没被取走就被覆盖的帧不解码；两个摄像头共用一个USB控制器时，未压缩的 YUYV 常常带宽不足
+capture_format = "MJPG"
+capture_width = 640
+capture_height = 480
+capture_fps = 30
+decode_imgsz = 640  # 降采样解码后的长边不低于该尺寸（模型输入尺寸）
+
+# 帧缓冲池：未压缩采集时（YUYV、测试源）采集线程读入池中的缓冲，检测循环推理完归还，稳定运行时不再逐帧分配
+# （MJPEG 的解码结果由 cv2.imdecode 分配，不经过缓冲池）
+# 帧缓冲池只用于未压缩采集（YUYV、RTSP/测试视频源等 cap.read 直接出图像的视频源）；
+# MJPEG 采集（默认）由 cv2.imdecode 新建解码结果（不支持写入已有缓冲），不经过缓冲池
+frame_pool_size = 4  # 每个摄像头常驻的帧缓冲数：采集中、最新帧、检测中各一个，再留一个余量
+frame_pools = {cam_id: FramePool(frame_pool_size) for cam_id in camera_sources}
+
+# 热备模式：YOLO空闲时保持摄像头打开并低频取帧，雷达触发后直接进入推理
+standby_enabled = False
+standby_fps = 2  # 热备时的取帧频率
+standby_flush_frames = 4  # 从热备切换到检测时丢弃的驱动缓冲帧数
+
+# 共享内存帧环：采集线程把每一帧写入 /dev/shm，雷达融合、录像等本机进程按名称零拷贝读取
+# （V4L2 不允许同一摄像头被打开两次）；只在摄像头全速采集时发布，见 frame_ring_consumer.py
+# MJPEG 采集时检测循环只解码取走的帧（且为缩小解码），有读者时采集线程另外把每一帧全尺寸解码后发布
+frame_ring_enabled = True
+frame_ring_slots = 4  # 每个摄像头的槽位数，读者的零拷贝视图在 slots-1 帧之后被覆盖
+frame_ring_names = {
+    cam_id: settings.get("frame_ring", f"radar_{cam_id}") for cam_id, settings in camera_config.items()
 }
+frame_rings = {
+    cam_id: FrameRingWriter(name, slots=frame_ring_slots) for cam_id, name in frame_ring_names.items()
+} if frame_ring_enabled else {}
+
+# 触发前后的视频片段：采集线程把帧（MJPEG 采集时直接用摄像头的JPEG数据，否则由编码线程压缩）放进内存环，
+# 检测到人（person_camX）或发送 person_NONO 时，写入线程把触发前后各几秒的帧保存为 .mjpeg 片段，见 clip_recorder.py
+# 只有摄像头在采集时才有帧，停止检测后的录制时长受 camera_cooldown 限制
+clip_recorder_enabled = True
+clip_dir = os.environ.get("RADAR_CAM_CLIP_DIR", '/home/cat/leida_test/Z_pavo2__test/clips')
+clip_pre_seconds = 5.0  # 触发前保留的秒数
+clip_post_seconds = 5.0  # 最后一次触发后继续录制的秒数
+clip_fps = 10  # 片段帧率（从采集帧中抽取）
+clip_jpeg_quality = 80  # 非 MJPEG 采集时的编码质量
+clip_max_mb = 16  # 每个摄像头内存中的帧和正在写盘的片段合计上限
+clip_max_seconds = 30.0  # 单个片段最长秒数
+clip_max_files = 200  # 每个摄像头保留的片段数
+clip_recorders = {
+    cam_id: ClipRecorder(cam_id, clip_dir, pre_seconds=clip_pre_seconds, post_seconds=clip_post_seconds,
+                         fps=clip_fps, max_bytes=clip_max_mb * 1024 * 1024, quality=clip_jpeg_quality,
+                         max_clip_seconds=clip_max_seconds, max_files=clip_max_files)
+    for cam_id in camera_sources
+} if clip_recorder_enabled else {}
+
+# 每轮检测结束时追加写入帧率、CPU等统计的JSON行文件，None 为不记录
+session_log_path = os.environ.get("RADAR_CAM_SESSION_LOG")
 
-def init_video_stream(camera_id):
-    """初始化视频流，返回视频捕获对象"""
+# 创建锁，用于线程间同步
+yolo_locks = {cam_id: threading.Lock() for cam_id in camera_sources}
+# 视频流资源锁
+stream_locks = {cam_id: threading.Lock() for cam_id in camera_sources}
+
+# 每个摄像头本轮检测的会话状态（是否首次推理、运动门限、雷达区域等）
+detection_sessions = {cam_id: None for cam_id in camera_sources}
+
+# 视频采集器（每个摄像头一个采集线程，只保留最新帧）
+cameras = {cam_id: None for cam_id in camera_sources}
+
+def capture_settings(camera_id):
+    """摄像头的采集格式和分辨率 (format, width, height)"""
+    settings = camera_config[camera_id]
+    return (settings.get("format", capture_format), settings.get("width", capture_width),
+            settings.get("height", capture_height))
+
+def uses_mjpeg(camera_id):
+    """是否以 MJPEG 原始数据采集：V4L2 设备配置为 MJPG，或录制的 MJPEG 测试流"""
+    source = camera_sources[camera_id]
+    return source.startswith("mjpeg:") or (source.startswith("/dev/") and capture_settings(camera_id)[0] == "MJPG")
+
+def open_usb_camera(camera_id):
+    """打开USB摄像头，返回视频捕获对象"""
     try:
-        if cameras[camera_id] is not None:
-            cameras[camera_id].release()
-        
         # 使用OpenCV打开USB摄像头
         source = camera_sources[camera_id]
-        cap = cv2.VideoCapture(source)
-        if not cap.isOpened():
-            print(f"无法打开USB摄像头 {source}")
-            return None
-        
-        # 设置摄像头参数（根据需要调整）
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        cap.set(cv2.CAP_PROP_FPS, 30)
+        fourcc, width, height = capture_settings(camera_id)
+        # 测试视频源（合成画面、场景目录、循环播放的录制视频），否则按设备路径打开
+        cap = open_test_source(source)
+        if cap is None and uses_mjpeg(camera_id):
+            cap, raw = open_mjpeg_capture(source, width, height, capture_fps)
+            if cap is None:
+                print(f"无法打开USB摄像头 {source}")
+                return None
+            if raw:
+                print(f"摄像头 {camera_id} 以 MJPEG 原始模式采集")
+        else:
+            if cap is None:
+                cap = cv2.VideoCapture(source)
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            if not cap.isOpened():
+                print(f"无法打开USB摄像头 {source}")
+                return None
+            
+            # 设置摄像头参数（根据需要调整）
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            cap.set(cv2.CAP_PROP_FPS, capture_fps)
         
         print(f"成功连接到USB摄像头 {source}")
-        cameras[camera_id] = cap
         return cap
+    except Exception as e:
+        print(f"打开摄像头 {camera_id} 时发生错误: {e}")
+        return None
+
+def capture_callback(camera_id, mjpeg):
+    """采集线程中对每一帧未解码数据调用的回调（片段录制），没有需要做的事时返回 None
+
+    MJPEG 采集时检测循环只解码取走的帧，帧环的读者要的是摄像头帧率的完整画面：有读者时在采集线程中全尺寸解码后发布。
+    """
+    recorder = clip_recorders.get(camera_id)
+    ring = frame_rings.get(camera_id) if mjpeg else None
+    if recorder is None and ring is None:
+        return None
+    
+    def on_capture(data, timestamp):
+        if recorder is not None:
+            recorder.push(data, timestamp)
+        if ring is not None and ring.has_readers():
+            image = decode_jpeg(data)
+            if image is not None:
+                ring.publish(image, timestamp)
+    return on_capture
+
+def init_video_stream(camera_id, rate=None):
+    """初始化视频流并启动采集线程，返回采集器；rate 为限速取帧频率，None 为全速"""
+    try:
+        if cameras[camera_id] is not None:
+            cameras[camera_id].stop()
+            cameras[camera_id] = None
+        
+        decode = None
+        if uses_mjpeg(camera_id):
+            # 检测循环取帧时才解码，按模型输入尺寸选择 1/2、1/4、1/8 的缩小解码
+            scale = decode_scale(*capture_settings(camera_id)[1:], decode_imgsz)
+            decode = lambda data: decode_jpeg(data, scale)
+        ring = frame_rings.get(camera_id)
+        grabber = LatestFrameGrabber(lambda: open_usb_camera(camera_id), name=camera_id,
+                                     on_frame=ring.publish if ring is not None and decode is None else None,
+                                     decode=decode, pool=frame_pools[camera_id] if decode is None else None,
+                                     on_capture=capture_callback(camera_id, decode is not None))
+        grabber.set_rate(rate)
+        if not grabber.start():
+            return None
+        
+        cameras[camera_id] = grabber
+        return grabber
     except Exception as e:
         print(f"初始化视频流 {camera_id} 时发生错误: {e}")
         return None
@@ -82,395 +323,602 @@ def release_video_stream(camera_id):
     """释放视频流资源"""
     try:
         if cameras[camera_id] is not None:
-            cameras[camera_id].release()
+            cameras[camera_id].stop()
+            print(f"摄像头 {camera_id} 采集统计: {cameras[camera_id].stats()}")
             cameras[camera_id] = None
             print(f"已释放摄像头 {camera_id} 资源")
     except Exception as e:
         print(f"释放摄像头 {camera_id} 资源时发生错误: {e}")
 
-def is_other_camera_detecting_person(current_camera_id):
-    """检查另一个摄像头是否检测到人"""
-    other_camera_id = "cam2" if current_camera_id == "cam1" else "cam1"
-    
-    # 检查另一个摄像头是否在运行
-    with yolo_locks[other_camera_id]:
-        if not yolo_status[other_camera_id]["running"]:
-            return False  # 如果另一个摄像头没有运行，则视为没有检测到人
+def standby_camera(camera_id):
+    """热备线程：YOLO空闲时保持摄像头以低频取帧运行，使自动曝光保持收敛"""
+    while True:
+        with yolo_locks[camera_id]:
+            running = yolo_status[camera_id]["running"]
         
-        # 检查另一个摄像头最后检测到人的时间是否在超时范围内
-        current_time = time.time()
-        last_detection = yolo_status[other_camera_id]["last_detection_time"]
-        if last_detection == 0:  # 如果从未检测到人
-            return False
+        if not running:
+            with stream_locks[camera_id]:
+                grabber = cameras[camera_id]
+                if grabber is None or not grabber.is_alive():
+                    init_video_stream(camera_id, rate=standby_fps)
         
-        time_since_last_detection = current_time - last_detection
-        return time_since_last_detection <= person_detection_timeout  # 如果在超时范围内，则认为检测到人
-
-def should_send_no_person_signal(camera_id):
-    """判断是否应该发送无人检测信号"""
-    # 如果另一个摄像头检测到了人，则不发送无人检测信号
-    if is_other_camera_detecting_person(camera_id):
-        return False
-    return True
+        time.sleep(1)
 
-def run_yolo_detection(camera_id):
-    """为指定摄像头运行YOLO检测"""
+def send_camera_event(kind, camera_id):
+    """摄像头进程中：把检测事件 (类型, 摄像头, time.time()) 回报给协调者进程"""
+    camera_events.send((kind, camera_id, time.time()))
+
+def report_person_timeout(camera_id):
+    """某摄像头超时未检测到人：只有当所有摄像头都没检测到人时才发送无人检测信号"""
+    if camera_events is not None:
+        # 多进程模式下由持有全局在场汇总的协调者判断
+        send_camera_event("timeout", camera_id)
+        return
+    
+    print(f"摄像头 {camera_id} 已超过{person_detection_timeout}秒未检测到人")
+    remaining = presence.leave(camera_id)
+    if remaining == 0:
+        print(f"所有摄像头都未检测到人，发送无人检测信号")
+        # 发送无人检测信号（只入队，不在本线程做FIFO I/O）
+        fifo_writer.send("person_NONO\0")
+        # 各摄像头保存人员离开前后的片段（多进程模式下帧在摄像头进程中）
+        for cam_id in camera_sources:
+            if process_mode:
+                camera_processes[cam_id].send(("clip", "nono"))
+            elif cam_id in clip_recorders:
+                clip_recorders[cam_id].trigger("nono")
+    else:
+        print(f"仍有 {remaining} 个摄像头检测到人，不发送无人检测信号")
+
+def begin_detection(camera_id, trigger_time):
+    """进入检测：打开视频流（或从热备/冷却中恢复）并登记到推理引擎"""
+    if not model_loader.ready:
+        # 模型还在加载：本命令等到就绪后再处理，之后到达的命令在工作线程的消息队列里排队
+        print(f"模型加载中，摄像头 {camera_id} 的YOLO识别在模型就绪后启动")
+        if not model_loader.wait():
+            return False
     print(f"启动摄像头 {camera_id} 的YOLO识别...")
+    with yolo_locks[camera_id]:
+        yolo_status[camera_id]["running"] = True
+        yolo_status[camera_id]["last_detection_time"] = time.time()
+        yolo_status[camera_id]["trigger_time"] = trigger_time
+    # 触发后 person_detection_timeout 秒内没有检测到人同样超时
+    timeout_scheduler.schedule(camera_id, time.monotonic() + person_detection_timeout)
     
-    try:
-        with stream_locks[camera_id]:
-            # 初始化视频流
-            if cameras[camera_id] is None or not cameras[camera_id].isOpened():
-                cap = init_video_stream(camera_id)
-                if cap is None:
-                    print(f"无法初始化摄像头 {camera_id}，YOLO识别终止")
-                    with yolo_locks[camera_id]:
-                        yolo_status[camera_id]["running"] = False
-                    return
-        
-        # 获取对应摄像头的YOLO模型
-        model = models[camera_id]
-        
-        # 设置初始时间
-        last_activity_time = time.time()
-        
-        while True:
-            try:
-                with stream_locks[camera_id]:
-                    cap = cameras[camera_id]
-                    if cap is None or not cap.isOpened():
-                        print(f"摄像头 {camera_id} 视频流已关闭，重新初始化")
-                        cap = init_video_stream(camera_id)
-                        if cap is None:
-                            break
-                    
-                    # 读取一帧
-                    ret, frame = cap.read()
-                    if not ret:
-                        print(f"无法从摄像头 {camera_id} 读取视频帧，尝试重新初始化")
-                        cap = init_video_stream(camera_id)
-                        continue
+    with stream_locks[camera_id]:
+        # 初始化视频流
+        grabber = cameras[camera_id]
+        if grabber is None or not grabber.is_alive():
+            grabber = init_video_stream(camera_id)
+            if grabber is None:
+                with yolo_locks[camera_id]:
+                    yolo_status[camera_id]["running"] = False
+                return False
+        else:
+            # 从热备或冷却中恢复全速，驱动缓冲里积压的旧帧先丢弃
+            grabber.set_rate(None, flush_frames=standby_flush_frames)
     
-    # 使用YOLO模型进行目标检测
-                results = model.track(frame, stream=False)  # 单帧处理，不使用流模式
-                
-                person_found = False
+    detection_sessions[camera_id] = {
+        "first_inference": True,
+        "person_found": False,  # 上一次推理的结果，运动门限跳过推理时沿用
+        "roi_target_time": None,  # 当前使用的雷达位置对应的命令时间
+        "roi_misses": 0,  # 区域内连续未检测到人的次数
+        "motion_gate": MotionGate(pixel_threshold=motion_pixel_threshold,
+                                  area_threshold=motion_area_threshold,
+                                  force_interval=motion_force_interval) if motion_gate_enabled else None,
+        "cascade": ResolutionCascade(cascade_screen_imgsz, cascade_screen_conf,
+                                     cascade_confirm_conf) if cascade_enabled else None,
+        "start_time": time.monotonic(),
+        "thread_time": time.thread_time(),  # 检测线程（工作线程）的CPU时间
+        "frames": 0,  # 取到的帧数
+        "inferences": 0  # 实际推理的帧数（运动门限跳过的不计）
+    }
     
-        # 检查是否识别到人
-                if len(results) > 0 and len(results[0].boxes) > 0:
-                    for box in results[0].boxes:
-                        if hasattr(box, 'cls'):
-                            cls = int(box.cls[0])
-                            cls_name = results[0].names[cls]
-                            if cls_name == "person":
-                                print(f"摄像头 {camera_id} 检测到人！")
-                                person_found = True
-                                with yolo_locks[camera_id]:
-                                    yolo_status[camera_id]["person_detected"] = True
-                                    yolo_status[camera_id]["last_detection_time"] = time.time()
-                                break
-                
-                # 如果没有检测到人，检查是否超时
-                if not person_found:
-                    current_time = time.time()
-                    last_detection = yolo_status[camera_id]["last_detection_time"]
-                    time_since_last_detection = current_time - last_detection
-                    
-                    if last_detection > 0 and time_since_last_detection > person_detection_timeout:
-                        print(f"摄像头 {camera_id} 已超过{person_detection_timeout}秒未检测到人")
-                        
-                        # 检查是否应该发送无人检测信号（只有当两个摄像头都没检测到人时）
-                        if should_send_no_person_signal(camera_id):
-                            print(f"两个摄像头都未检测到人，发送无人检测信号")
-                            # 发送无人检测信号
-                            try:
-                                if os.path.exists(fifo1_path):
-                                    with open(fifo1_path, 'wb') as no_person_fifo:
-                                        message = f"person_NONO\0"
-                                        no_person_fifo.write(message.encode('utf-8'))
-                                        no_person_fifo.flush()
-                                        print(f"Sent: {message}")
-                            except Exception as e:
-                                print(f"发送无人检测信号时发生错误: {e}")
-                        else:
-                            print(f"另一个摄像头仍在检测到人，不发送无人检测信号")
-                        
-                        with yolo_locks[camera_id]:
-                            yolo_status[camera_id]["running"] = False
-                
-                # 如果不再运行，退出循环
-                with yolo_locks[camera_id]:
-                    if not yolo_status[camera_id]["running"]:
-                        break
-        
-                # 控制处理速度，避免CPU过载
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"摄像头 {camera_id} YOLO检测过程中发生错误: {e}")
-                time.sleep(1)  # 出错后等待一段时间再继续
+    # 登记到共享推理引擎
+    inference_engine.activate(camera_id)
+    if camera_events is not None:
+        send_camera_event("started", camera_id)
+    else:
+        presence.enter(camera_id)
+    return True
+
+def current_roi(camera_id, session, frame):
+    """按最近一次雷达命令的位置计算本帧的感兴趣区域，连续多次未命中后返回 None 回退全画面"""
+    with yolo_locks[camera_id]:
+        target = yolo_status[camera_id]["radar_target"]
+    if target is None:
+        return None
     
-    finally:
-        # 确保在退出时释放资源
-        with stream_locks[camera_id]:
-            release_video_stream(camera_id)
-        
-        print(f"摄像头 {camera_id} YOLO识别已停止")
+    params, target_time = target
+    if target_time != session["roi_target_time"]:
+        # 新的雷达位置，重新计算未命中次数
+        session["roi_target_time"] = target_time
+        session["roi_misses"] = 0
+    if session["roi_misses"] >= roi_max_misses:
+        return None
+    
+    height, width = frame.shape[:2]
+    return radar_roi(camera_calibration.get(camera_id), params, width, height)
 
-def check_yolo_timeout():
-    """检查所有摄像头的YOLO是否需要超时关闭"""
-    while True:
-        time.sleep(1)  # 每秒检查一次
+def count_roi_result(camera_id, session, person_found):
+    """记录一次区域推理的结果，推理失败也按未命中计"""
+    session["roi_misses"] = 0 if person_found else session["roi_misses"] + 1
+    if session["roi_misses"] == roi_max_misses:
+        print(f"摄像头 {camera_id} 雷达区域内连续{roi_max_misses}次未检测到人，回退到全画面搜索")
+
+def detect_once(camera_id, person_confirmed):
+    """执行一帧检测，返回 (是否检测到人, 距离下一帧的秒数, 是否继续检测)"""
+    session = detection_sessions[camera_id]
+    roi = None  # 尚未记录结果的区域推理
+    try:
+        frame_start = time.monotonic()
+        
+        with stream_locks[camera_id]:
+            grabber = cameras[camera_id]
+            if grabber is None or not grabber.is_alive():
+                print(f"摄像头 {camera_id} 视频流已关闭，重新初始化")
+                grabber = init_video_stream(camera_id)
+                if grabber is None:
+                    return False, 0, False
         
-        for camera_id in yolo_status:
+        # 取采集线程比上次取走的更新的一帧（按采集器记录，冷却期间重新触发复用采集器时也不会重复取到已归还的帧），
+        # 只有推理比摄像头快时才会等待新帧
+        stage_start = time.monotonic()
+        frame, _, _ = grabber.latest(timeout=1.0)
+        metrics.observe(camera_id, "capture", stage_start)
+        if frame is None:
+            print(f"摄像头 {camera_id} 等待视频帧超时")
+            metrics.increment(camera_id, "capture_timeouts")
             with yolo_locks[camera_id]:
-                if (yolo_status[camera_id]["running"] and 
-                    yolo_status[camera_id]["last_detection_time"] > 0):
-                    current_time = time.time()
-                    last_detection = yolo_status[camera_id]["last_detection_time"]
-                    time_since_last_detection = current_time - last_detection
-                    
-                    if time_since_last_detection > person_detection_timeout:
-                        print(f"摄像头 {camera_id} 已超过{person_detection_timeout}秒未检测到人")
-                        
-                        # 检查是否应该发送无人检测信号（只有当两个摄像头都没检测到人时）
-                        if should_send_no_person_signal(camera_id):
-                            print(f"两个摄像头都未检测到人，发送无人检测信号")
-                            # 发送无人检测信号
-                            try:
-                                if os.path.exists(fifo1_path):
-                                    with open(fifo1_path, 'wb') as no_person_fifo:
-                                        message = f"person_NONO\0"
-                                        no_person_fifo.write(message.encode('utf-8'))
-                                        no_person_fifo.flush()
-                                        print(f"Sent: {message}")
-                            except Exception as e:
-                                print(f"发送无人检测信号时发生错误: {e}")
-                        else:
-                            print(f"另一个摄像头仍在检测到人，不发送无人检测信号")
-                            
-                        yolo_status[camera_id]["running"] = False
-
-def read_from_fifo():
-    """读取FIFO管道内容并根据命令启动相应的YOLO检测"""
-    # 存储YOLO线程
-    yolo_threads = {
-        "cam1": None,
-        "cam2": None
-    }
-    
-    while True:
-        try:
-            # 尝试打开FIFO管道，如果管道不存在则创建
-            if not os.path.exists(fifo_path):
-                os.makedirs(os.path.dirname(fifo_path), exist_ok=True)
-                os.mkfifo(fifo_path)
-                print(f"创建FIFO管道: {fifo_path}")
+                return False, 0, yolo_status[camera_id]["running"]
+        session["frames"] += 1
+        metrics.increment(camera_id, "frames")
+        
+        gate = session["motion_gate"]
+        stage_start = time.monotonic()
+        run_inference = gate is None or gate.check(frame)
+        if gate is not None:
+            metrics.observe(camera_id, "motion_gate", stage_start)
+        if not run_inference:
+            # 画面无明显变化，沿用上一次推理的结果，不刷新检测时间
+            person_found = session["person_found"]
+            metrics.increment(camera_id, "motion_skipped")
+        else:
+            # 有雷达位置时只在对应区域上以较小的输入尺寸推理
+            stage_start = time.monotonic()
+            roi = current_roi(camera_id, session, frame)
+            
+            if roi is not None:
+                source, imgsz = crop_roi(frame, roi), roi_imgsz
+            else:
+                source, imgsz = frame, None
+            metrics.observe(camera_id, "preprocess", stage_start)
             
-            print("等待连接到FIFO管道...")
-            with open(fifo_path, 'rb') as fifo:
-                print("已连接到FIFO管道")
-                fd = fifo.fileno()
-
-                # 设置 FIFO 为非阻塞模式
-                flags = fcntl.fcntl(fd, fcntl.F_GETFL)
-                fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
-                
-                # 持续读取FIFO管道内容
-                while True:
-                    try:
-                        # 尝试读取数据
-                        data = fifo.read()
-                        if data:
-                            data_str = data.decode('utf-8', 'ignore')
-                            print(f"Received: {data_str}")
-                            
-                            # 处理摄像头1命令
-                            if "leida_cam1" in data_str:
-                                with yolo_locks["cam1"]:
-                                    if not yolo_status["cam1"]["running"]:
-                                        yolo_status["cam1"]["running"] = True
-                                        yolo_status["cam1"]["last_detection_time"] = time.time()
-                                        
-                                        # 启动摄像头1的YOLO识别线程
-                                        if yolo_threads["cam1"] is not None and yolo_threads["cam1"].is_alive():
-                                            print("等待摄像头1旧的YOLO线程结束...")
-                                            yolo_threads["cam1"].join(timeout=2)
-                                        
-                                        yolo_threads["cam1"] = threading.Thread(target=run_yolo_detection, args=("cam1",))
-                                        yolo_threads["cam1"].daemon = True
-                                        yolo_threads["cam1"].start()
-                                    else:
-                                        print("摄像头1的YOLO识别已在运行中")
-                            
-                            # 处理摄像头2命令
-                            elif "leida_cam2" in data_str:
-                                with yolo_locks["cam2"]:
-                                    if not yolo_status["cam2"]["running"]:
-                                        yolo_status["cam2"]["running"] = True
-                                        yolo_status["cam2"]["last_detection_time"] = time.time()
-                                        
-                                        # 启动摄像头2的YOLO识别线程
-                                        if yolo_threads["cam2"] is not None and yolo_threads["cam2"].is_alive():
-                                            print("等待摄像头2旧的YOLO线程结束...")
-                                            yolo_threads["cam2"].join(timeout=2)
-                                        
-                                        yolo_threads["cam2"] = threading.Thread(target=run_yolo_detection, args=("cam2",))
-                                        yolo_threads["cam2"].daemon = True
-                                        yolo_threads["cam2"].start()
-                                    else:
-                                        print("摄像头2的YOLO识别已在运行中")
-                            
-                            # 处理同时启动两个摄像头的命令
-                            elif "leida_" in data_str:
-                                for cam_id in ["cam1", "cam2"]:
-                                    with yolo_locks[cam_id]:
-                                        if not yolo_status[cam_id]["running"]:
-                                            yolo_status[cam_id]["running"] = True
-                                            yolo_status[cam_id]["last_detection_time"] = time.time()
-                                            
-                                            # 启动对应摄像头的YOLO识别线程
-                                            if yolo_threads[cam_id] is not None and yolo_threads[cam_id].is_alive():
-                                                print(f"等待摄像头{cam_id}旧的YOLO线程结束...")
-                                                yolo_threads[cam_id].join(timeout=2)
-                                            
-                                            yolo_threads[cam_id] = threading.Thread(target=run_yolo_detection, args=(cam_id,))
-                                            yolo_threads[cam_id].daemon = True
-                                            yolo_threads[cam_id].start()
-                                        else:
-                                            print(f"摄像头{cam_id}的YOLO识别已在运行中")
-                            
-                            # 处理普通的leida_命令（默认启动摄像头1）
-                            elif "leida_" in data_str and not any(x in data_str for x in ["cam1", "cam2", "all"]):
-                                with yolo_locks["cam1"]:
-                                    if not yolo_status["cam1"]["running"]:
-                                        yolo_status["cam1"]["running"] = True
-                                        yolo_status["cam1"]["last_detection_time"] = time.time()
-                                        
-                                        # 启动摄像头1的YOLO识别线程
-                                        if yolo_threads["cam1"] is not None and yolo_threads["cam1"].is_alive():
-                                            print("等待摄像头1旧的YOLO线程结束...")
-                                            yolo_threads["cam1"].join(timeout=2)
-                                        
-                                        yolo_threads["cam1"] = threading.Thread(target=run_yolo_detection, args=("cam1",))
-                                        yolo_threads["cam1"].daemon = True
-                                        yolo_threads["cam1"].start()
-                                    else:
-                                        print("摄像头1的YOLO识别已在运行中")
-                            
-                            # 处理停止命令
-                            elif "stop_cam1" in data_str:
-                                with yolo_locks["cam1"]:
-                                    if yolo_status["cam1"]["running"]:
-                                        yolo_status["cam1"]["running"] = False
-                                        print("手动停止摄像头1的YOLO识别")
-                            
-                            elif "stop_cam2" in data_str:
-                                with yolo_locks["cam2"]:
-                                    if yolo_status["cam2"]["running"]:
-                                        yolo_status["cam2"]["running"] = False
-                                        print("手动停止摄像头2的YOLO识别")
-                            
-                            elif "stop_all" in data_str or "stop_yolo" in data_str:
-                                for cam_id in ["cam1", "cam2"]:
-                                    with yolo_locks[cam_id]:
-                                        if yolo_status[cam_id]["running"]:
-                                            yolo_status[cam_id]["running"] = False
-                                            print(f"手动停止摄像头{cam_id}的YOLO识别")
-                        
-                    except IOError:
-                        # 如果没有数据，捕获异常并跳过
-                        pass
-                    
-                    except BrokenPipeError:
-                        print("FIFO管道连接断开")
-                        break
-                    
-                    time.sleep(0.1)  # 给 CPU 一些休息时间
+            # 提交到共享推理引擎，与其他摄像头的帧一起批量推理（包含凑批等待）
+            stage_start = time.monotonic()
+            cascade = session["cascade"]
+            if cascade is not None:
+                # 小尺寸粗筛，有候选人员时再以 imgsz 复核
+                result = cascade.detect(
+                    lambda image, size, conf: inference_engine.infer(camera_id, image, imgsz=size, conf=conf),
+                    source, imgsz)
+            else:
+                result = inference_engine.infer(camera_id, source, imgsz=imgsz)
+            metrics.observe(camera_id, "inference", stage_start)
+            session["inferences"] += 1
+            metrics.increment(camera_id, "inferences")
+            
+            # 报告雷达触发到首次推理完成的延迟
+            if session["first_inference"]:
+                session["first_inference"] = False
+                with yolo_locks[camera_id]:
+                    trigger_time = yolo_status[camera_id]["trigger_time"]
+                if trigger_time > 0:
+                    mode = "热备" if standby_enabled else "冷启动"
+                    print(f"摄像头 {camera_id} 触发到首次推理耗时 {(time.monotonic() - trigger_time) * 1000:.1f} ms（{mode}）")
+            
+            # 检查是否识别到人（按类别数组整体汇总，不逐框遍历）
+            stage_start = time.monotonic()
+            person_found, person_count, max_conf = person_presence(result)
+            metrics.observe(camera_id, "postprocess", stage_start)
+            if detection_log is not None:
+                stage_start = time.monotonic()
+                detection_log.log(camera_id, person_count, max_conf, person_boxes(result),
+                                  origin=roi[:2] if roi is not None else (0, 0))
+                metrics.observe(camera_id, "event_log", stage_start)
+            session["person_found"] = person_found
+            if roi is not None:
+                count_roi_result(camera_id, session, person_found)
+                roi = None
+            if person_found:
+                print(f"摄像头 {camera_id} 检测到人！（{person_count}人，最高置信度 {max_conf:.2f}）")
+                person_confirmed = True
+                with yolo_locks[camera_id]:
+                    yolo_status[camera_id]["last_detection_time"] = time.time()
+                # 推迟本摄像头的无人超时
+                timeout_scheduler.schedule(camera_id, time.monotonic() + person_detection_timeout)
+                # 立即推送检测事件，由写入线程写入FIFO（多进程模式下先回报给协调者）
+                stage_start = time.monotonic()
+                if camera_events is not None:
+                    send_camera_event("person", camera_id)
+                else:
+                    presence.enter(camera_id)
+                    detection_publisher.publish(camera_id)
+                metrics.observe(camera_id, "publish", stage_start)
+                metrics.increment(camera_id, "detections")
+                if camera_id in clip_recorders:
+                    clip_recorders[camera_id].trigger("person")
         
-        except Exception as e:
-            print(f"读取FIFO管道时发生错误: {e}")
+        # 推理已完成（运动门限只保留缩小后的副本），帧缓冲归还给采集线程复用
+        grabber.release(frame)
         
-        # 如果连接断开，等待一段时间后重新尝试连接
-        print("正在重新连接FIFO管道...")
-        time.sleep(1)
+        # 如果不再运行（手动停止或超时调度器已判定超时），结束检测
+        with yolo_locks[camera_id]:
+            if not yolo_status[camera_id]["running"]:
+                return person_found, 0, False
+            last_detection = yolo_status[camera_id]["last_detection_time"]
+        
+        # 按检测状态计算目标帧率，扣除本帧实际耗时后再休眠
+        delay = rate_schedulers[camera_id].next_delay(frame_start, last_detection, person_confirmed)
+        metrics.observe(camera_id, "frame", frame_start)
+        return person_found, delay, True
+    
+    except Exception as e:
+        print(f"摄像头 {camera_id} YOLO检测过程中发生错误: {e}")
+        metrics.increment(camera_id, "errors")
+        if roi is not None:
+            # 区域推理失败（如区域尺寸不被后端接受）时同样计为未命中，避免一直重试同一区域
+            count_roi_result(camera_id, session, False)
+        return False, 1, True  # 出错后等待一段时间再继续
 
-def write_to_fifo1():
-    """将检测结果写入FIFO管道"""
-    # 记录上次是否发送了person消息
-    last_sent = {
-        "cam1": False,
-        "cam2": False
+def log_session(camera_id, session):
+    """把本轮检测的帧率和CPU占用追加写入会话日志（每轮一行JSON）"""
+    duration = time.monotonic() - session["start_time"]
+    cpu = time.thread_time() - session["thread_time"]
+    record = {
+        "camera": camera_id,
+        "end_time": time.monotonic(),
+        "duration_s": duration,
+        "frames": session["frames"],
+        "inferences": session["inferences"],
+        "fps": session["frames"] / duration if duration > 0 else 0.0,
+        "inference_fps": session["inferences"] / duration if duration > 0 else 0.0,
+        "thread_cpu_s": cpu,
+        "thread_cpu_ratio": cpu / duration if duration > 0 else 0.0,
+        "pid": os.getpid()
     }
+    try:
+        with open(session_log_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"写入会话统计失败: {e}")
+
+def end_detection(camera_id):
+    """结束检测：注销推理引擎，摄像头在冷却结束后再释放"""
+    with yolo_locks[camera_id]:
+        yolo_status[camera_id]["running"] = False
+    timeout_scheduler.cancel(camera_id)
+    inference_engine.deactivate(camera_id)
+    if camera_events is not None:
+        send_camera_event("stopped", camera_id)
+    else:
+        presence.leave(camera_id)
+    if session_log_path:
+        log_session(camera_id, detection_sessions[camera_id])
+    
+    gate = detection_sessions[camera_id]["motion_gate"]
+    if gate is not None:
+        stats = gate.stats()
+        engine_stats = inference_engine.stats
+        frame_cost = engine_stats["inference_time"] / max(engine_stats["frames"], 1)
+        print(f"摄像头 {camera_id} 运动门限跳过 {stats['skipped']}/{stats['frames']} 帧"
+              f"（{stats['skip_ratio']:.0%}），约节省推理时间 {stats['skipped'] * frame_cost * 1000:.0f} ms")
+    cascade = detection_sessions[camera_id]["cascade"]
+    if cascade is not None:
+        stats = cascade.stats()
+        print(f"摄像头 {camera_id} 分辨率级联粗筛排除 {stats['screened_out']}/{stats['frames']} 帧"
+              f"（{stats['screened_out_ratio']:.0%}），复核确认 {stats['confirmed']} 次、否决 {stats['rejected']} 次")
+    print(f"摄像头 {camera_id} YOLO识别已停止")
+
+def release_camera(camera_id):
+    """冷却结束：释放摄像头资源，热备模式下保持摄像头打开"""
+    with stream_locks[camera_id]:
+        if standby_enabled and cameras[camera_id] is not None:
+            cameras[camera_id].set_rate(standby_fps)
+            print(f"摄像头 {camera_id} 采集统计: {cameras[camera_id].stats()}")
+            print(f"摄像头 {camera_id} 进入热备状态")
+        else:
+            release_video_stream(camera_id)
+
+def expire_detection(camera_id):
+    """超时调度器回调：摄像头超过 person_detection_timeout 秒未检测到人，停止检测并判断是否发送无人检测信号"""
+    with yolo_locks[camera_id]:
+        if not yolo_status[camera_id]["running"]:
+            return
+        yolo_status[camera_id]["running"] = False
+    report_person_timeout(camera_id)
+    metrics.increment(camera_id, "timeouts")
+    # 工作线程可能正在保活间隔中休眠，投递消息使其立即进入冷却
+    camera_workers[camera_id].post(TIMEOUT)
+
+# 无人超时调度：每个摄像头一个截止时间，检测到人时推迟，到期时由调度线程调用一次 expire_detection
+timeout_scheduler = DeadlineScheduler(expire_detection, metrics=metrics, name="timeout_scheduler")
+
+def trigger_camera(cam_id, params):
+    """记录雷达给出的目标位置（没有时清除），再通知工作线程（或摄像头进程）启动检测"""
+    with yolo_locks[cam_id]:
+        yolo_status[cam_id]["radar_target"] = (params, time.monotonic()) if params else None
+    if process_mode:
+        camera_processes[cam_id].send((START, params))
+    else:
+        camera_workers[cam_id].post(START)
+
+def stop_camera(cam_id):
+    """通知工作线程（或摄像头进程）停止检测"""
+    if process_mode:
+        camera_processes[cam_id].send((STOP, None))
+    else:
+        camera_workers[cam_id].post(STOP)
+
+def write_stats():
+    """打印当前指标，并写入JSON文件和Prometheus文本文件"""
+    snapshot = metrics.snapshot()
+    snapshot.setdefault("fifo_writer", {})["state"] = fifo_writer.stats()
+    if detection_log is not None:
+        snapshot.setdefault("detection_log", {})["state"] = detection_log.stats()
+    for cam_id, recorder in clip_recorders.items():
+        if recorder.is_alive():  # 多进程模式下只在持有该摄像头的进程中运行
+            snapshot.setdefault(cam_id, {})["clip_recorder"] = recorder.stats()
+    for cam_id, grabber in list(cameras.items()):
+        if grabber is not None:
+            snapshot.setdefault(cam_id, {})["grabber"] = grabber.stats()
+            if grabber.pool is not None:
+                snapshot[cam_id]["frame_pool"] = grabber.pool.stats()
+    text = json.dumps(snapshot, indent=2, ensure_ascii=False)
+    print(f"运行统计:\n{text}")
+    try:
+        tmp_path = f"{metrics_json_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, metrics_json_path)
+        metrics.write_textfile(metrics_textfile_path)
+    except OSError as e:
+        print(f"写入统计文件失败: {e}")
+
+def handle_command(command):
+    """处理一条完整的控制命令"""
+    # 可选参数跟在冒号后面，如 leida_cam1:az=35
+    command, params = parse_command(command)
+    
+    # leida_camN / stop_camN 只向对应摄像头的工作线程投递消息，由其状态机处理；
+    # leida_、leida_all、stop_all、stop_yolo 作用于所有摄像头
+    action, _, target = command.partition("_")
+    if action in ("leida", "stop") and target in camera_sources:
+        targets = [target]
+    elif command in ("leida_", "leida_all", "stop_all", "stop_yolo"):
+        targets = list(camera_sources)
+    else:
+        targets = None
+    
+    if targets is not None:
+        if not process_mode and not model_loader.ready:
+            metrics.increment("startup", "queued_commands")
+        for cam_id in targets:
+            if action == "leida":
+                trigger_camera(cam_id, params)
+            else:
+                stop_camera(cam_id)
+    elif command == "stats":
+        write_stats()
+        if process_mode:
+            # 各摄像头进程写各自的统计文件
+            for camera_process in camera_processes.values():
+                camera_process.send(("stats", None))
+    else:
+        print(f"未知命令: {command}")
+
+# 模型在后台线程加载并用假帧预热，命令FIFO不等模型、启动后立即可用；
+# 加载期间收到的检测命令在工作线程里排队，就绪后按到达顺序处理（触发到首次推理的耗时包含排队时间）。
+# 启动到就绪、模型加载、首次推理等耗时记入 startup 组件的指标（stats 命令可查看）
+model_warmup_runs = 2  # 预热轮数，每轮单帧和整批各推理一次
+
+def warmup_model(model):
+    """把加载好的模型交给推理引擎，并用全黑假帧预热，返回每次推理的耗时"""
+    inference_engine.model = model
+    frame = np.zeros((capture_height, capture_width, 3), dtype=np.uint8)
+    return inference_engine.warmup(frame, runs=model_warmup_runs)
+
+model_loader = ModelLoader(lambda: load_model(model_name), warmup_model, metrics=metrics,
+                           start_time=process_start_time)
+
+# 每个摄像头一个常驻工作线程（IDLE → SEARCHING → CONFIRMED → COOLDOWN）
+camera_cooldown = 2.0  # 停止检测后摄像头保持打开的秒数，期间再次触发无需重新打开
+camera_workers = {
+    cam_id: CameraWorker(cam_id, begin_detection, detect_once, end_detection, release_camera,
+                         cooldown=camera_cooldown)
+    for cam_id in camera_sources
+}
+
+def camera_process_main(camera_id, conn):
+    """摄像头进程入口：运行本摄像头的工作线程，转发协调者的控制消息，检测事件经 conn 回报"""
+    global camera_events, metrics_json_path, metrics_textfile_path
+    camera_events = conn
+    # 各摄像头进程的指标写入带摄像头编号的文件，避免互相覆盖
+    metrics_json_path = "{0}_{2}{1}".format(*os.path.splitext(metrics_json_path), camera_id)
+    metrics_textfile_path = "{0}_{2}{1}".format(*os.path.splitext(metrics_textfile_path), camera_id)
+    if detection_log is not None:
+        detection_log.prefix = f"detections_{camera_id}"
+        detection_log.start()
+    if camera_id in clip_recorders:
+        clip_recorders[camera_id].start()
+    exporter_thread = threading.Thread(target=metrics.run_exporter,
+                                       args=(metrics_textfile_path, metrics_export_interval))
+    exporter_thread.daemon = True
+    exporter_thread.start()
+    model_loader.start()
+    inference_engine.start()
+    timeout_thread = threading.Thread(target=timeout_scheduler.run)
+    timeout_thread.daemon = True
+    timeout_thread.start()
+    camera_workers[camera_id].start()
+    if standby_enabled:
+        standby_thread = threading.Thread(target=standby_camera, args=(camera_id,))
+        standby_thread.daemon = True
+        standby_thread.start()
     
     while True:
         try:
-            # 确保FIFO管道存在
-            if not os.path.exists(fifo1_path):
-                os.makedirs(os.path.dirname(fifo1_path), exist_ok=True)
-                os.mkfifo(fifo1_path)
-                print(f"创建FIFO管道: {fifo1_path}")
-            
-            print("准备写入FIFO管道...")
-            with open(fifo1_path, 'wb') as fifo1:
-                print("已连接到写入FIFO管道")
-                
-                while True:
-                    try:
-                        # 检查每个摄像头是否检测到人
-                        for cam_id in yolo_status:
-                            with yolo_locks[cam_id]:
-                                local_person_detected = yolo_status[cam_id]["person_detected"]
-                                if local_person_detected:
-                                    yolo_status[cam_id]["person_detected"] = False  # 重置检测标志
-                            
-                            if local_person_detected:
-                                if not last_sent[cam_id]:  # 只有当状态改变时才发送
-                                    message = f"person_{cam_id}\0"
-                                    fifo1.write(message.encode('utf-8'))
-                                    fifo1.flush()  # 确保数据被写入
-                                    print(f"Sent: {message}")
-                                    last_sent[cam_id] = True
-                        else:
-                                if last_sent[cam_id]:  # 状态改变，重置标志
-                                    last_sent[cam_id] = False
-                        
-                        time.sleep(0.5)  # 每0.5秒检查一次
-                    
-                    except BrokenPipeError:
-                        print("写入FIFO管道连接断开")
-                        break
-        
-        except Exception as e:
-            print(f"写入FIFO管道时发生错误: {e}")
-        
-        # 如果连接断开，等待一段时间后重新尝试连接
-        print("正在重新连接写入FIFO管道...")
-        time.sleep(1)
+            command, params = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            break  # 协调者已退出
+        if command == "stats":
+            write_stats()
+            continue
+        if command == "clip":
+            if camera_id in clip_recorders:
+                clip_recorders[camera_id].trigger(params)
+            continue
+        if command in (START, STOP) and not model_loader.ready:
+            metrics.increment("startup", "queued_commands")
+        if command == START:
+            with yolo_locks[camera_id]:
+                yolo_status[camera_id]["radar_target"] = (params, time.monotonic()) if params else None
+        camera_workers[camera_id].post(command)
+    
+    with stream_locks[camera_id]:
+        release_video_stream(camera_id)
+    if camera_id in frame_rings:
+        frame_rings[camera_id].close()
+    if detection_log is not None:
+        detection_log.close()
+    if camera_id in clip_recorders:
+        clip_recorders[camera_id].close()
+
+def handle_camera_event(event):
+    """协调者进程：按摄像头进程回报的事件更新检测状态、发送 person_camX 和无人检测信号"""
+    kind, camera_id, timestamp = event
+    with yolo_locks[camera_id]:
+        if kind == "started":
+            yolo_status[camera_id]["running"] = True
+            yolo_status[camera_id]["last_detection_time"] = timestamp
+        elif kind == "person":
+            yolo_status[camera_id]["last_detection_time"] = timestamp
+        elif kind in ("stopped", "timeout"):
+            yolo_status[camera_id]["running"] = False
+    
+    if kind in ("started", "person"):
+        presence.enter(camera_id)
+    if kind == "person":
+        detection_publisher.publish(camera_id)
+    elif kind == "timeout":
+        report_person_timeout(camera_id)
+    elif kind == "stopped":
+        presence.leave(camera_id)
+
+def restart_camera(camera_id):
+    """摄像头进程崩溃重启后：崩溃时正在检测的摄像头恢复检测"""
+    with yolo_locks[camera_id]:
+        was_running = yolo_status[camera_id]["running"]
+        yolo_status[camera_id]["running"] = False
+        target = yolo_status[camera_id]["radar_target"]
+    presence.leave(camera_id)
+    if was_running:
+        print(f"摄像头 {camera_id} 崩溃时正在检测，重启后恢复检测")
+        camera_processes[camera_id].send((START, target[0] if target else None))
+
+# 多进程模式：每个摄像头的采集和推理循环在独立进程中运行，避开GIL；
+# 本进程作为协调者持有FIFO、发布和无人检测逻辑，摄像头进程崩溃后自动重启
+process_mode = os.environ.get("RADAR_CAM_PROCESS_MODE", "0") == "1"
+camera_restart_delay = 1.0  # 摄像头进程退出后多少秒重启
+camera_events = None  # 摄像头进程中为回报事件的管道，协调者和单进程模式下为 None
+camera_processes = {
+    cam_id: CameraProcess(cam_id, camera_process_main, restart_delay=camera_restart_delay)
+    for cam_id in camera_sources
+}
+
+# 命令读取器：epoll 等待数据，按分隔符和命令前缀分帧，逐条处理
+command_reader = CommandReader(fifo_path, handle_command, metrics=metrics)
 
 if __name__ == '__main__':
+    if process_mode:
+        # 每个摄像头一个进程，本进程只接收事件并监控重启
+        for camera_process in camera_processes.values():
+            camera_process.start()
+        supervise_thread = threading.Thread(target=supervise,
+                                            args=(camera_processes, handle_camera_event, restart_camera))
+        supervise_thread.daemon = True
+        supervise_thread.start()
+    else:
+        # 启动共享推理引擎
+        inference_engine.start()
+
+        # 启动各摄像头的工作线程
+        for worker in camera_workers.values():
+            worker.start()
+
+        # 热备模式下为每个摄像头启动热备线程
+        if standby_enabled:
+            for cam_id in camera_sources:
+                standby_thread = threading.Thread(target=standby_camera, args=(cam_id,))
+                standby_thread.daemon = True
+                standby_thread.start()
+
     # 创建线程
-    read_thread = threading.Thread(target=read_from_fifo)
-    write_thread = threading.Thread(target=write_to_fifo1)
-    timeout_thread = threading.Thread(target=check_yolo_timeout)
+    read_thread = threading.Thread(target=command_reader.run)
+    write_thread = threading.Thread(target=fifo_writer.run)
+    timeout_thread = threading.Thread(target=timeout_scheduler.run)
+    metrics_thread = threading.Thread(target=metrics.run_exporter,
+                                      args=(metrics_textfile_path, metrics_export_interval))
 
     # 设置为守护线程，这样主程序退出时线程也会退出
     read_thread.daemon = True
     write_thread.daemon = True
     timeout_thread.daemon = True
+    metrics_thread.daemon = True
 
     # 启动线程
     read_thread.start()
     write_thread.start()
-    timeout_thread.start()
+    metrics_thread.start()
+    if not process_mode:
+        # 多进程模式下超时由各摄像头进程的调度器判断，协调者不再单独计时
+        timeout_thread.start()
+        # 多进程模式下检测事件日志由各摄像头进程写入各自的文件
+        if detection_log is not None:
+            detection_log.start()
+        for recorder in clip_recorders.values():
+            recorder.start()
+        # 命令FIFO已经可用，模型在后台加载（多进程模式下由各摄像头进程加载，协调者不加载模型）
+        model_loader.start()
+    if command_reader.connected.wait(5.0):
+        metrics.observe("startup", "fifo_ready", process_start_time)
+        print(f"命令FIFO就绪：启动后 {(time.monotonic() - process_start_time) * 1000:.0f} ms")
 
+    exit_code = 0
     try:
-        # 主线程保持运行
-        while True:
+        # 主线程保持运行；模型加载失败时退出，由外部的进程管理重启
+        while model_loader.error is None:
             time.sleep(1)
+        print("模型加载失败，程序退出")
+        exit_code = 1
     except KeyboardInterrupt:
         print("程序被用户中断")
-        # 确保在退出时释放所有资源
-        for cam_id in cameras:
-            with stream_locks[cam_id]:
-                release_video_stream(cam_id)
\ No newline at end of file
+    
+    # 确保在退出时释放所有资源
+    for camera_process in camera_processes.values():
+        if camera_process.process is not None:
+            camera_process.stop()
+    for cam_id in cameras:
+        with stream_locks[cam_id]:
+            release_video_stream(cam_id)
+    # 删除共享内存帧环
+    for ring in frame_rings.values():
+        ring.close()
+    # 写完检测事件日志队列中剩余的事件
+    if detection_log is not None and not process_mode:
+        detection_log.close()
+    # 写完已打开的视频片段
+    if not process_mode:
+        for recorder in clip_recorders.values():
+            recorder.close()
+    raise SystemExit(exit_code)
\ No newline at end of file